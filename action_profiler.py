@@ -0,0 +1,301 @@
+"""
+Opt-in per-action profiler for the portal menus.
+
+Set PESU_PROFILE=1 and every portal action decorated with @profiled records
+where its wall time went:
+
+    db_execute   cursor.execute / executemany (server work + round trip)
+    db_fetch     fetchone / fetchmany / fetchall (result transfer + decoding)
+    db_commit    conn.commit / rollback
+    output       writes to stdout (the print calls of the result tables)
+    python       everything else: row formatting, loops, validation
+
+Time spent waiting at an input() prompt is the user thinking, not the
+action, and is left out. Actions that call other actions (a listing printed
+before a prompt) nest, and each keeps its own self time.
+
+With PESU_PROFILE=cprofile each top-level action also runs under cProfile;
+the raw stats are saved per action (<dir>/<action>-<n>.prof) and folded
+into stacks.
+
+On exit report() prints a summary table and writes, under PESU_PROFILE_DIR
+(default "profiles"):
+
+    actions.folded    phase stacks, e.g. "list_all_participants;db_fetch 8123"
+    cprofile.folded   function stacks from cProfile (cprofile mode only)
+    summary.txt       the summary table
+
+.folded files are in the collapsed-stack format that flamegraph.pl,
+speedscope and inferno read; values are microseconds.
+
+When PESU_PROFILE is unset, @profiled returns the function unchanged, so
+there is no overhead at all.
+"""
+import builtins
+import collections
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import time
+
+MODE = os.environ.get("PESU_PROFILE", "").lower()
+ENABLED = MODE not in ("", "0", "off", "false")
+CPROFILE = MODE == "cprofile"
+PROFILE_DIR = os.environ.get("PESU_PROFILE_DIR", "profiles")
+
+PHASES = ("db_execute", "db_fetch", "db_commit", "output")
+
+_stack = []                                  # active frames, innermost last
+_folded = collections.Counter()              # "a;b;phase" -> seconds
+_cprofile_folded = collections.Counter()     # "action;fn;fn" -> seconds
+_summary = {}                                # action -> {"calls", "wall", "python", phases..., "queries", "rows"}
+_saved_stdout = None
+_saved_input = None
+_cprofile_runs = 0
+
+
+class _Frame:
+    __slots__ = ("name", "path", "started", "phases", "input", "child_python", "queries", "rows")
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.input = 0.0
+        self.child_python = 0.0
+        self.queries = 0
+        self.rows = 0
+
+
+def _charge(phase, seconds):
+    """Adds `seconds` of `phase` to every active frame (inclusive) and to the innermost stack (self)."""
+    for frame in _stack:
+        frame.phases[phase] += seconds
+    _folded[f"{_stack[-1].path};{phase}"] += seconds
+
+
+class _ProfiledCursor:
+    """Cursor proxy that charges execute and fetch time to the running action."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(*args, **kwargs)
+        finally:
+            _charge("db_execute", time.perf_counter() - start)
+            for frame in _stack:
+                frame.queries += 1
+
+    def executemany(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(*args, **kwargs)
+        finally:
+            _charge("db_execute", time.perf_counter() - start)
+            for frame in _stack:
+                frame.queries += 1
+
+    def _fetch(self, method, *args):
+        start = time.perf_counter()
+        result = None
+        try:
+            result = method(*args)
+            return result
+        finally:
+            _charge("db_fetch", time.perf_counter() - start)
+            count = len(result) if isinstance(result, list) else int(result is not None)
+            for frame in _stack:
+                frame.rows += count
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._fetch(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _ProfiledConnection:
+    """Connection proxy that charges commit/rollback time to the running action."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return self._conn.commit()
+        finally:
+            _charge("db_commit", time.perf_counter() - start)
+
+    def rollback(self):
+        start = time.perf_counter()
+        try:
+            return self._conn.rollback()
+        finally:
+            _charge("db_commit", time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class _TimedStdout:
+    """stdout proxy that charges write time to the running action."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, text):
+        start = time.perf_counter()
+        try:
+            return self._stream.write(text)
+        finally:
+            if _stack:
+                _charge("output", time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _timed_input(prompt=""):
+    start = time.perf_counter()
+    try:
+        return _saved_input(prompt)
+    finally:
+        waited = time.perf_counter() - start
+        for frame in _stack:
+            frame.input += waited
+
+
+def _wrap(value):
+    if isinstance(value, (_ProfiledCursor, _ProfiledConnection)):
+        return value
+    if hasattr(value, "fetchall"):
+        return _ProfiledCursor(value)
+    if hasattr(value, "commit"):
+        return _ProfiledConnection(value)
+    return value
+
+
+def _enter(name):
+    global _saved_stdout, _saved_input
+    if not _stack:
+        _saved_stdout, sys.stdout = sys.stdout, _TimedStdout(sys.stdout)
+        _saved_input, builtins.input = builtins.input, _timed_input
+    path = f"{_stack[-1].path};{name}" if _stack else name
+    frame = _Frame(name, path)
+    _stack.append(frame)
+    return frame
+
+
+def _leave(frame):
+    global _saved_stdout, _saved_input
+    _stack.pop()
+    wall = time.perf_counter() - frame.started - frame.input
+    python = max(wall - sum(frame.phases.values()), 0.0)
+    _folded[f"{frame.path};python"] += max(python - frame.child_python, 0.0)
+    if _stack:
+        _stack[-1].child_python += python
+    else:
+        sys.stdout, builtins.input = _saved_stdout, _saved_input
+
+    entry = _summary.setdefault(frame.name, dict(calls=0, wall=0.0, python=0.0, queries=0, rows=0,
+                                                 **dict.fromkeys(PHASES, 0.0)))
+    entry["calls"] += 1
+    entry["wall"] += wall
+    entry["python"] += python
+    entry["queries"] += frame.queries
+    entry["rows"] += frame.rows
+    for phase in PHASES:
+        entry[phase] += frame.phases[phase]
+
+
+def _fold_cprofile(name, profiler):
+    """Folds cProfile stats into stacks by following each function's heaviest caller."""
+    stats = pstats.Stats(profiler).stats
+    for func, (_, _, tottime, _, _) in stats.items():
+        chain, seen, current = [], set(), func
+        while current and current not in seen:
+            seen.add(current)
+            filename, line, fn = current
+            chain.append(f"{os.path.basename(filename)}:{fn}" if filename != "~" else fn)
+            callers_of = stats.get(current, (0, 0, 0, 0, {}))[4]
+            current = max(callers_of, key=lambda c: callers_of[c][3], default=None)
+        _cprofile_folded[";".join([name] + chain[::-1])] += tottime
+
+
+def profiled(func):
+    """Decorator for portal actions taking (cursor, ...); a no-op unless profiling is enabled."""
+    if not ENABLED:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _cprofile_runs
+        args = tuple(_wrap(arg) for arg in args[:2]) + args[2:]
+        outermost = not _stack
+        frame = _enter(func.__name__)
+        profiler = cProfile.Profile() if CPROFILE and outermost else None
+        try:
+            if profiler is None:
+                return func(*args, **kwargs)
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            _leave(frame)
+            if profiler is not None:
+                _cprofile_runs += 1
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                profiler.dump_stats(os.path.join(PROFILE_DIR, f"{func.__name__}-{_cprofile_runs}.prof"))
+                _fold_cprofile(func.__name__, profiler)
+    return wrapper
+
+
+def _write_folded(path, counter):
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, seconds in sorted(counter.items()):
+            micros = int(seconds * 1_000_000)
+            if micros:
+                f.write(f"{stack.replace(' ', '_')} {micros}\n")
+
+
+def summary_lines():
+    header = (f"{'Action':<28} | {'Calls':<5} | {'Wall ms':<9} | {'Exec ms':<8} | {'Fetch ms':<8} | "
+              f"{'Commit ms':<9} | {'Output ms':<9} | {'Python ms':<9} | {'Queries':<7} | {'Rows':<7}")
+    lines = [header, "-" * len(header)]
+    for name, entry in sorted(_summary.items(), key=lambda item: -item[1]["wall"]):
+        ms = {key: entry[key] * 1000 for key in ("wall", "python") + PHASES}
+        lines.append(f"{name:<28} | {entry['calls']:<5} | {ms['wall']:<9.1f} | {ms['db_execute']:<8.1f} | "
+                     f"{ms['db_fetch']:<8.1f} | {ms['db_commit']:<9.1f} | {ms['output']:<9.1f} | "
+                     f"{ms['python']:<9.1f} | {entry['queries']:<7} | {entry['rows']:<7}")
+    return lines
+
+
+def report():
+    """Prints the summary table and writes the folded stacks. Does nothing unless profiling ran."""
+    if not ENABLED or not _summary:
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    lines = summary_lines()
+    with open(os.path.join(PROFILE_DIR, "summary.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    _write_folded(os.path.join(PROFILE_DIR, "actions.folded"), _folded)
+    if _cprofile_folded:
+        _write_folded(os.path.join(PROFILE_DIR, "cprofile.folded"), _cprofile_folded)
+    print("\n--- Action profile (inclusive; input() waits excluded) ---")
+    print("\n".join(lines))
+    print(f"Stacks written to {os.path.join(PROFILE_DIR, 'actions.folded')}"
+          + (" and cprofile.folded" if _cprofile_folded else ""))
@@ -0,0 +1,294 @@
+"""
+Admission control for registration bursts.
+
+Three layers sit in front of the booking transaction:
+
+  * a per-user token bucket, so one client hammering the menu cannot take
+    more than its share (PESU_USER_RATE requests/second, PESU_USER_BURST burst);
+  * a limit on concurrent booking transactions (PESU_BOOKING_CONCURRENCY),
+    so the database works on a few transactions at a time instead of thrashing
+    on locks for all of them;
+  * a fair FIFO queue in front of that limit, which reports each waiter's
+    position and an estimated wait, and turns away callers once it is full
+    or after PESU_BOOKING_MAX_WAIT seconds.
+
+Every console is its own process, so the queue and the rate limits are per
+process, but the concurrency limit is shared: a caller admitted by its
+process's queue must also take one of BOOKING_CONCURRENCY machine-wide
+slots (MachineSlots). The slots are byte-range locks on one file
+(PESU_BOOKING_LOCK_PATH, by default in the user's private cache
+directory), so every console on the machine sharing that file shares the
+limit, and a console that dies gives its slot back with its file handle.
+Consoles on other machines need the same file on shared storage, or get
+their own limit. If the file cannot be opened the limit falls back to per
+process.
+
+Lock-wait timeouts (errno 1205) that still happen are shed: the transaction
+is rolled back and the user gets BUSY_MESSAGE instead of a driver error.
+"""
+import bisect
+import collections
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import shared_cache
+
+BOOKING_CONCURRENCY = int(os.environ.get("PESU_BOOKING_CONCURRENCY", "8"))
+BOOKING_MAX_QUEUE = int(os.environ.get("PESU_BOOKING_MAX_QUEUE", "10000"))
+BOOKING_MAX_WAIT = float(os.environ.get("PESU_BOOKING_MAX_WAIT", "30"))
+USER_RATE = float(os.environ.get("PESU_USER_RATE", "1"))
+USER_BURST = int(os.environ.get("PESU_USER_BURST", "5"))
+BOOKING_LOCK_PATH = os.environ.get("PESU_BOOKING_LOCK_PATH", os.path.join(shared_cache.CACHE_DIR, "booking_slots.lock"))
+WAIT_REPORT_INTERVAL = 1.0   # seconds between position updates for a queued caller
+SLOT_POLL_INTERVAL = 0.02    # seconds between attempts at a machine-wide slot
+
+LOCK_WAIT_TIMEOUT_ERRNO = 1205
+BUSY_MESSAGE = "The booking system is busy right now and nothing was booked. Please try again in a moment."
+
+
+class Rejected(Exception):
+    """Raised when a request is turned away; `retry_after` is a hint in seconds."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def take(self, now):
+        """Takes one token. Returns 0 on success, else the seconds until one is available."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """One token bucket per key, created on first use and dropped once idle and full."""
+
+    def __init__(self, rate=USER_RATE, burst=USER_BURST, max_keys=100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def check(self, key):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._prune(now)
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            retry_after = bucket.take(now)
+        if retry_after:
+            raise Rejected(f"Too many requests. Please wait {retry_after:.1f}s and try again.", retry_after)
+
+    def _prune(self, now):
+        refill_time = self.burst / self.rate
+        for key in [k for k, b in self._buckets.items() if now - b.updated > refill_time]:
+            del self._buckets[key]
+
+
+class FairGate:
+    """
+    Lets at most `limit` callers hold the gate at once and admits the rest in
+    arrival order. Each waiter blocks on its own Event, so a release wakes
+    exactly the caller it admits.
+    """
+
+    def __init__(self, limit=BOOKING_CONCURRENCY, max_queue=BOOKING_MAX_QUEUE, max_wait=BOOKING_MAX_WAIT):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._waiters = collections.deque()
+        self._abandoned = []        # sorted tickets that timed out while still queued
+        self._in_flight = 0
+        self._next_ticket = 0
+        self._service_time = 0.05   # moving average of seconds a holder keeps the gate
+
+    def _admit_waiting(self):
+        while self._waiters and self._in_flight < self.limit:
+            _, admitted = self._waiters.popleft()
+            self._in_flight += 1
+            admitted.set()
+        # Timed-out tickets ahead of the new head no longer affect anyone's position
+        head = self._waiters[0][0] if self._waiters else self._next_ticket
+        del self._abandoned[:bisect.bisect_left(self._abandoned, head)]
+
+    def _position(self, ticket):
+        """1 + the callers still queued ahead of `ticket`."""
+        if not self._waiters:
+            return 1
+        head = self._waiters[0][0]
+        left = bisect.bisect_left(self._abandoned, ticket) - bisect.bisect_left(self._abandoned, head)
+        return ticket - head + 1 - left
+
+    def estimated_wait(self, position):
+        return position * self._service_time / self.limit
+
+    def acquire(self, on_wait=None):
+        """Blocks until admitted. `on_wait(position, eta_seconds)` is called whenever the queue position changes."""
+        with self._lock:
+            if self._in_flight < self.limit and not self._waiters:
+                self._in_flight += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                raise Rejected(f"The booking queue is full ({len(self._waiters)} waiting). Please try again shortly.",
+                               self.estimated_wait(len(self._waiters)))
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            admitted = threading.Event()
+            self._waiters.append((ticket, admitted))
+
+        deadline = time.monotonic() + self.max_wait
+        last_position = None
+        while True:
+            if on_wait is not None:
+                with self._lock:
+                    position = self._position(ticket)
+                if position != last_position and not admitted.is_set():
+                    on_wait(position, self.estimated_wait(position))
+                    last_position = position
+            remaining = max(0.0, deadline - time.monotonic())
+            if admitted.wait(min(remaining, WAIT_REPORT_INTERVAL) if on_wait else remaining):
+                return
+            if time.monotonic() >= deadline:
+                with self._lock:
+                    if admitted.is_set():
+                        return
+                    self._waiters.remove((ticket, admitted))
+                    bisect.insort(self._abandoned, ticket)
+                raise Rejected(f"Still queued after {self.max_wait:.0f}s. Please try again later.")
+
+    def release(self, held_for=None):
+        with self._lock:
+            self._in_flight -= 1
+            if held_for is not None:
+                self._service_time = 0.9 * self._service_time + 0.1 * held_for
+            self._admit_waiting()
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": self._in_flight, "queued": len(self._waiters), "service_time": self._service_time}
+
+
+class MachineSlots:
+    """
+    `slots` booking slots shared by every process that opens the same file:
+    slot n is an exclusive lock on byte n. The OS drops a dead process's
+    locks, so no slot can leak.
+    """
+
+    def __init__(self, path=BOOKING_LOCK_PATH, slots=BOOKING_CONCURRENCY):
+        if path == BOOKING_LOCK_PATH and "PESU_BOOKING_LOCK_PATH" not in os.environ:
+            shared_cache.private_dir(os.path.dirname(path))
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+        self._file = os.fdopen(fd, "r+b")
+        self.slots = slots
+        self._held = set()          # record locks are per process: never hand out a slot this process holds
+        self._lock = threading.Lock()
+
+    def _try_lock(self, slot):
+        if fcntl:
+            fcntl.lockf(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB, 1, slot)
+        else:
+            self._file.seek(slot)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def try_acquire(self):
+        """Takes a free slot without waiting. Returns its number, or None if all are taken."""
+        with self._lock:
+            for slot in range(self.slots):
+                if slot in self._held:
+                    continue
+                try:
+                    self._try_lock(slot)
+                except OSError:
+                    continue
+                self._held.add(slot)
+                return slot
+        return None
+
+    def release(self, slot):
+        with self._lock:
+            if fcntl:
+                fcntl.lockf(self._file.fileno(), fcntl.LOCK_UN, 1, slot)
+            else:
+                self._file.seek(slot)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._held.discard(slot)
+
+
+user_limiter = RateLimiter()
+booking_gate = FairGate()
+_machine_slots = None
+_machine_slots_failed = False
+
+
+def _get_machine_slots():
+    global _machine_slots, _machine_slots_failed
+    if _machine_slots is None and not _machine_slots_failed:
+        try:
+            _machine_slots = MachineSlots()
+        except OSError:
+            _machine_slots_failed = True  # keep the per-process limit rather than fail the portal
+    return _machine_slots
+
+
+def check_rate(user_id):
+    """Raises Rejected if `user_id` is over its request rate."""
+    user_limiter.check(user_id)
+
+
+def enter_booking(on_wait=None):
+    """
+    Waits for this process's queue, then for a machine-wide slot. Pass the
+    returned value to leave_booking().
+    """
+    booking_gate.acquire(on_wait)
+    slots = _get_machine_slots()
+    slot = None
+    if slots is not None:
+        deadline = time.monotonic() + booking_gate.max_wait
+        slot = slots.try_acquire()
+        while slot is None:
+            if time.monotonic() >= deadline:
+                booking_gate.release()
+                raise Rejected(f"Still waiting for a booking slot after {booking_gate.max_wait:.0f}s. "
+                               "Please try again later.")
+            time.sleep(SLOT_POLL_INTERVAL)
+            slot = slots.try_acquire()
+    return time.perf_counter(), slot
+
+
+def leave_booking(entered):
+    entered_at, slot = entered
+    if slot is not None:
+        _machine_slots.release(slot)
+    booking_gate.release(time.perf_counter() - entered_at)
+
+
+def is_lock_timeout(err):
+    return getattr(err, "errno", None) == LOCK_WAIT_TIMEOUT_ERRNO
+
+
+def print_queue_position(position, eta):
+    print(f"⏳ High demand: you are #{position} in the booking queue (about {eta:.0f}s).")
@@ -0,0 +1,178 @@
+"""
+Hot/cold archival of completed events.
+
+Events that ended before a cutoff move, together with everything hanging
+off them (tickets, orders, participants, feedback, resource bookings), from
+the hot tables into *_archive tables with the same columns. Ticket slots,
+holds and registration-view rows are derived data and are dropped.
+
+The mover works online in small batches: each batch is one short
+transaction over at most `batch_events` events, selected by the
+(date, id) index, so row locks on the hot tables are held for milliseconds
+and the portal keeps running. It pauses between batches to leave the
+database room for foreground work. Re-running is safe; a batch is either
+fully moved or not at all.
+
+Reads that should include history (list_completed_events with
+include_archive, feedback reports) UNION the archive tables in.
+
+    python archival.py --older-than-days 365
+    python archival.py --status
+"""
+import argparse
+import datetime
+import sys
+import time
+
+import mysql.connector
+
+import audit_log
+import db_profiles
+import event_search
+import shared_cache
+
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_EVENTS = 50
+ARCHIVE_PAUSE_SECONDS = 0.05
+
+# (hot table, archive table, columns, which rows belong to the batch's events)
+ARCHIVED_TABLES = [
+    ("tbl_events", "tbl_events_archive",
+     "id, name, description, date, start_time, end_time, location_id, organizer_id, max_participants, status",
+     "id IN ({ids})"),
+    ("tbl_tickets", "tbl_tickets_archive", "id, event_id, ticket_type, price, quantity", "event_id IN ({ids})"),
+    ("tbl_orders", "tbl_orders_archive", "id, ticket_id, user_id, order_time, payment_status",
+     "ticket_id IN (SELECT id FROM tbl_tickets WHERE event_id IN ({ids}))"),
+    ("tbl_event_participants", "tbl_event_participants_archive",
+     "event_id, user_id, registration_time, attendance_status", "event_id IN ({ids})"),
+    ("tbl_event_feedback", "tbl_event_feedback_archive", "id, event_id, user_id, rating, comments, submitted_at",
+     "event_id IN ({ids})"),
+    ("tbl_event_resources", "tbl_event_resources_archive",
+     "id, event_id, resource_id, quantity_booked, booking_start, booking_end", "event_id IN ({ids})"),
+]
+
+# Children first, so no foreign key ever points at a deleted row
+_DELETE_ORDER = [
+    ("tbl_orders", "ticket_id IN (SELECT id FROM tbl_tickets WHERE event_id IN ({ids}))"),
+    ("tbl_ticket_holds", "ticket_id IN (SELECT id FROM tbl_tickets WHERE event_id IN ({ids}))"),
+    ("tbl_ticket_slots", "ticket_id IN (SELECT id FROM tbl_tickets WHERE event_id IN ({ids}))"),
+    ("tbl_tickets", "event_id IN ({ids})"),
+    ("tbl_event_participants", "event_id IN ({ids})"),
+    ("tbl_event_feedback", "event_id IN ({ids})"),
+    ("tbl_event_resources", "event_id IN ({ids})"),
+    ("tbl_student_registrations", "event_id IN ({ids})"),
+    ("tbl_events", "id IN ({ids})"),
+]
+
+COMPLETED_EVENTS_QUERY = """
+    SELECT e.id, e.name, e.date, e.end_time, v.name AS venue_name, h.name AS host_name
+    FROM tbl_events e
+    LEFT JOIN tbl_venues v ON e.location_id = v.id
+    JOIN tbl_hosts h ON e.organizer_id = h.id
+    WHERE e.date <= CURDATE()
+    AND CONCAT(e.date, ' ', e.end_time) <= NOW()
+    UNION ALL
+    SELECT a.id, a.name, a.date, a.end_time, v.name AS venue_name, h.name AS host_name
+    FROM tbl_events_archive a
+    LEFT JOIN tbl_venues v ON a.location_id = v.id
+    JOIN tbl_hosts h ON a.organizer_id = h.id
+    ORDER BY 3 DESC, 4 DESC
+"""
+
+
+def next_batch(cursor, cutoff, batch_events):
+    """Ids of the oldest events that ended before `cutoff`."""
+    cursor.execute("""
+        SELECT id FROM tbl_events
+        WHERE date < %s
+        ORDER BY date, id
+        LIMIT %s
+    """, (cutoff, batch_events))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def move_events(cursor, conn, event_ids):
+    """Copies the events and their rows into the archive tables and deletes them, in one transaction."""
+    placeholders = ", ".join(["%s"] * len(event_ids))
+    params = tuple(event_ids)
+    moved = {}
+    try:
+        for hot, archive, columns, where in ARCHIVED_TABLES:
+            cursor.execute(f"INSERT IGNORE INTO {archive} ({columns}) SELECT {columns} FROM {hot} "
+                           f"WHERE {where.format(ids=placeholders)}", params)
+            moved[hot] = cursor.rowcount
+        for table, where in _DELETE_ORDER:
+            cursor.execute(f"DELETE FROM {table} WHERE {where.format(ids=placeholders)}", params)
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    return moved
+
+
+def archive_before(cursor, conn, cutoff, batch_events=ARCHIVE_BATCH_EVENTS, pause=ARCHIVE_PAUSE_SECONDS,
+                   verbose=False):
+    """Moves every event dated before `cutoff` to the archive, batch by batch. Returns row counts per table."""
+    totals = {hot: 0 for hot, _, _, _ in ARCHIVED_TABLES}
+    started = time.perf_counter()
+    while True:
+        event_ids = next_batch(cursor, cutoff, batch_events)
+        if not event_ids:
+            break
+        for table, count in move_events(cursor, conn, event_ids).items():
+            totals[table] += count
+        for event_id in event_ids:
+            event_search.drop(event_id)
+        if verbose:
+            print(f"Archived {totals['tbl_events']} events so far...")
+        time.sleep(pause)
+    if totals["tbl_events"]:
+        shared_cache.invalidate()
+        audit_log.record("archive_events", {"cutoff": str(cutoff), "batch_events": batch_events},
+                         after=totals, started=started, actor="system:archiver")
+    return totals
+
+
+def tier_counts(cursor):
+    counts = {}
+    for hot, archive, _, _ in ARCHIVED_TABLES:
+        cursor.execute(f"SELECT COUNT(*) FROM {hot}")
+        hot_rows = cursor.fetchone()[0]
+        cursor.execute(f"SELECT COUNT(*) FROM {archive}")
+        counts[hot] = (hot_rows, cursor.fetchone()[0])
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="archive events dated more than this many days ago")
+    parser.add_argument("--batch-events", type=int, default=ARCHIVE_BATCH_EVENTS)
+    parser.add_argument("--pause", type=float, default=ARCHIVE_PAUSE_SECONDS, help="seconds between batches")
+    parser.add_argument("--status", action="store_true", help="only print hot/archive row counts")
+    args = parser.parse_args(argv)
+
+    conn = db_profiles.connect("batch")
+    cursor = conn.cursor()
+    try:
+        if not args.status:
+            audit_log.start()
+            cutoff = datetime.date.today() - datetime.timedelta(days=args.older_than_days)
+            totals = archive_before(cursor, conn, cutoff, args.batch_events, args.pause, verbose=True)
+            print(f"Archived events dated before {cutoff}: " + ", ".join(f"{t} {n}" for t, n in totals.items()))
+        print(f"\n{'Table':<25} | {'Hot rows':<10} | {'Archived rows':<13}")
+        print("-" * 55)
+        for table, (hot_rows, archived_rows) in tier_counts(cursor).items():
+            print(f"{table:<25} | {hot_rows:<10} | {archived_rows:<13}")
+    except mysql.connector.Error as err:
+        print(f"Archival failed: {err}")
+        return 1
+    finally:
+        audit_log.shutdown()
+        cursor.close()
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Append-only audit log for every mutating portal operation.
+
+The log is written *after* commit: callers record() an operation once its
+transaction has committed (or rolled back), and record() only queues the
+entry. A background writer thread appends queued entries to a JSON-lines file
+in batches and fsyncs each batch, so logging adds neither a database round
+trip nor a disk write to the booking path. The price is a small window: a
+crash between a commit and the next flush (at most FLUSH_INTERVAL plus one
+batch write) loses the audit entries of those committed operations.
+
+record() never raises. If the log cannot be written, the writer keeps the
+batch, retries every FLUSH_INTERVAL, warns once on stderr and exposes the
+error through last_failure(). Run this file directly to query the log.
+"""
+import argparse
+import atexit
+import datetime
+import itertools
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+AUDIT_LOG_PATH = os.environ.get("PESU_AUDIT_LOG", "audit_log.jsonl")
+BATCH_SIZE = 200          # max entries written per flush
+FLUSH_INTERVAL = 0.5      # seconds the writer waits before flushing a partial batch (or retrying a failed one)
+
+_queue = queue.Queue()
+_seq = itertools.count(1)
+_writer = None
+_writer_lock = threading.Lock()
+_actor = "anonymous"
+_failure = None           # (iso timestamp, message) of the last write that failed, until one succeeds
+
+
+def set_actor(actor):
+    """Sets who subsequent operations are attributed to (e.g. 'student:12', 'admin')."""
+    global _actor
+    _actor = actor
+
+
+def get_actor():
+    return _actor
+
+
+def last_failure():
+    """(timestamp, message) of the current writer failure, or None while the log is being written."""
+    return _failure
+
+
+def _report_failure(err):
+    global _failure
+    if _failure is None:
+        print(f"⚠️ Audit log cannot be written ({err}); entries are kept and retried.",
+              file=sys.stderr)
+    _failure = (datetime.datetime.now().isoformat(timespec="seconds"), str(err))
+
+
+def record(operation, params=None, before=None, after=None, started=None, outcome="committed", actor=None):
+    """
+    Queues one audit entry. Never blocks on I/O and never raises.
+    `started` is a time.perf_counter() value taken when the DB work began;
+    `actor` overrides the current actor (used by background jobs).
+    """
+    try:
+        start()
+        now = datetime.datetime.now()
+        _queue.put({
+            "seq": next(_seq),
+            "ts": now.isoformat(timespec="milliseconds"),
+            "actor": actor or _actor,
+            "operation": operation,
+            "outcome": outcome,
+            "params": params or {},
+            "before": before,
+            "after": after,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3) if started is not None else None,
+        })
+    except Exception as err:  # e.g. no new threads during interpreter shutdown
+        _report_failure(err)
+
+
+class _AuditWriter(threading.Thread):
+    """Drains the queue and appends entries to the log file in batches."""
+
+    def __init__(self, path):
+        super().__init__(name="audit-writer", daemon=True)
+        self.path = path
+        self._file = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        global _failure
+        batch = []
+        while True:
+            if not batch:
+                if self._stop_event.is_set() and _queue.empty():
+                    break
+                batch = self._next_batch()
+                continue
+            try:
+                self._write(batch)
+                batch, _failure = [], None
+            except OSError as err:
+                _report_failure(err)
+                if self._stop_event.wait(FLUSH_INTERVAL):
+                    break  # shutting down with an unwritable log; the failure has been reported
+            except Exception as err:  # an entry that cannot be serialised; drop the batch, keep the writer
+                _report_failure(err)
+                batch = []
+        if self._file is not None:
+            self._file.close()
+
+    def _write(self, batch):
+        text = "".join(json.dumps(e, default=str) + "\n" for e in batch)
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(text)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError:
+            f, self._file = self._file, None
+            if f is not None:
+                try:
+                    f.close()
+                except OSError:
+                    pass
+            raise
+
+    def _next_batch(self):
+        batch = []
+        try:
+            batch.append(_queue.get(timeout=FLUSH_INTERVAL))
+        except queue.Empty:
+            return batch
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start(path=None):
+    """
+    Starts the background writer (called lazily by record() if needed).
+    A no-op returning the running writer if one is already alive.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = _AuditWriter(path or AUDIT_LOG_PATH)
+            _writer.start()
+        return _writer
+
+
+def shutdown():
+    """Flushes every queued entry and stops the writer."""
+    global _writer
+    with _writer_lock:
+        if _writer is not None and _writer.is_alive():
+            _writer.stop()
+            _writer.join()
+        _writer = None
+
+
+atexit.register(shutdown)
+
+
+# --- Query Tool ---
+
+def read_entries(path=None):
+    """Yields audit entries from the log file, oldest first."""
+    path = path or AUDIT_LOG_PATH
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def query(path=None, actor=None, operation=None, since=None, until=None, contains=None, outcome=None):
+    """
+    Filters the log. `since`/`until` are ISO timestamps (string compare works
+    because entries are written in ISO format). `contains` matches any
+    parameter/before/after value as text.
+    """
+    for entry in read_entries(path):
+        if actor and entry["actor"] != actor:
+            continue
+        if operation and entry["operation"] != operation:
+            continue
+        if outcome and entry["outcome"] != outcome:
+            continue
+        if since and entry["ts"] < since:
+            continue
+        if until and entry["ts"] > until:
+            continue
+        if contains:
+            blob = json.dumps([entry["params"], entry["before"], entry["after"]], default=str)
+            if contains not in blob:
+                continue
+        yield entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the portal audit log.")
+    parser.add_argument("--log", default=AUDIT_LOG_PATH, help="audit log file")
+    parser.add_argument("--actor", help="e.g. student:12 or admin")
+    parser.add_argument("--operation", help="e.g. order_ticket_and_register")
+    parser.add_argument("--outcome", choices=["committed", "rolled_back"])
+    parser.add_argument("--since", help="ISO timestamp, e.g. 2025-03-01T09:00")
+    parser.add_argument("--until", help="ISO timestamp")
+    parser.add_argument("--contains", help="text to look for in params/before/after")
+    parser.add_argument("--json", action="store_true", help="print raw JSON lines")
+    args = parser.parse_args()
+
+    count = 0
+    for entry in query(args.log, args.actor, args.operation, args.since, args.until, args.contains, args.outcome):
+        count += 1
+        if args.json:
+            print(json.dumps(entry, default=str))
+            continue
+        print(f"{entry['ts']:<23} | {entry['actor']:<12} | {entry['operation']:<28} | {entry['outcome']:<11} | {entry['duration_ms'] or '':<8}")
+        print(f"    params: {entry['params']}")
+        if entry["before"] is not None or entry["after"] is not None:
+            print(f"    before: {entry['before']}")
+            print(f"    after:  {entry['after']}")
+    if not args.json:
+        print(f"\n{count} matching entries.")
+
+
+if __name__ == "__main__":
+    main()
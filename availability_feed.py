@@ -0,0 +1,290 @@
+"""
+Live ticket-availability feed.
+
+Instead of re-running the ticket query to see whether seats are left,
+screens can subscribe to a server-sent-events stream:
+
+    GET /availability?event_id=12&event_id=15     (no event_id: every upcoming event)
+
+The stream opens with a `snapshot` event (every watched ticket's remaining
+stock, one query) and then carries `availability` events with the tickets
+that changed: {"seq", "tickets": [{ticket_id, event_id, remaining, delta}]}.
+
+Writers that move stock (holds placed, released or expired, cancellations,
+ticket edits) call announce() after their commit. It reads the changed
+tickets' remaining stock once and publishes it into FEED, an in-process
+pub/sub that keeps only the latest value per ticket. Watchers wake up, take
+what changed since the sequence number they last sent, and send it at most
+every COALESCE_INTERVAL seconds, so a burst of purchases becomes one message
+and N watchers cost one query rather than N polls. A watcher that falls
+behind skips straight to the latest value; its deltas are computed against
+what it last sent, so they still add up.
+
+The feed sees the writes of the portal process it runs in. Set
+PESU_FEED_PORT to serve it from the portal; with no subscribers, announce()
+does nothing. The stream has no authentication, so it binds to 127.0.0.1
+unless PESU_FEED_HOST names another interface (e.g. behind a proxy).
+"""
+import collections
+import datetime
+import http.server
+import json
+import os
+import threading
+import urllib.parse
+
+import mysql.connector
+
+COALESCE_INTERVAL = 0.5   # seconds; minimum gap between two messages to one watcher
+HEARTBEAT_INTERVAL = 15   # seconds; SSE comment sent on an idle stream to detect closed clients
+
+
+class Feed:
+    """Latest remaining stock per ticket, with a sequence number watchers wait on."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._latest = collections.OrderedDict()   # ticket_id -> (seq, event_id, remaining), oldest first
+        self._subscribers = 0
+        self._closed = False
+
+    def has_subscribers(self):
+        return self._subscribers > 0
+
+    def subscribe(self):
+        """Registers a watcher; returns the sequence number to read changes after."""
+        with self._cond:
+            self._subscribers += 1
+            return self._seq
+
+    def unsubscribe(self):
+        with self._cond:
+            self._subscribers -= 1
+
+    def publish(self, tickets):
+        """Publishes {ticket_id: (event_id, remaining)} and wakes every watcher."""
+        if not tickets:
+            return
+        with self._cond:
+            self._seq += 1
+            for ticket_id, (event_id, remaining) in tickets.items():
+                self._latest[ticket_id] = (self._seq, event_id, remaining)
+                self._latest.move_to_end(ticket_id)
+            self._cond.notify_all()
+
+    def changes(self, after, timeout):
+        """
+        Waits up to `timeout` seconds for a publication after sequence `after`.
+        Returns (current seq, {ticket_id: (event_id, remaining)} changed since `after`),
+        or None once the feed is closed.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after or self._closed, timeout)
+            if self._closed:
+                return None
+            changed = {}
+            for ticket_id, (seq, event_id, remaining) in reversed(self._latest.items()):
+                if seq <= after:
+                    break
+                changed[ticket_id] = (event_id, remaining)
+            return self._seq, changed
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+FEED = Feed()
+
+
+def _stock(cursor):
+    return {ticket_id: (event_id, int(remaining)) for ticket_id, event_id, remaining in cursor.fetchall()}
+
+
+def stock_for_tickets(cursor, ticket_ids):
+    """{ticket_id: (event_id, remaining)} for the given tickets."""
+    placeholders = ", ".join(["%s"] * len(ticket_ids))
+    cursor.execute(f"""
+        SELECT t.id, t.event_id, COALESCE(SUM(s.quantity), 0)
+        FROM tbl_tickets t
+        LEFT JOIN tbl_ticket_slots s ON s.ticket_id = t.id
+        WHERE t.id IN ({placeholders})
+        GROUP BY t.id, t.event_id
+    """, tuple(ticket_ids))
+    return _stock(cursor)
+
+
+def stock_for_events(cursor, event_ids):
+    """{ticket_id: (event_id, remaining)} for every ticket of the given events."""
+    placeholders = ", ".join(["%s"] * len(event_ids))
+    cursor.execute(f"""
+        SELECT t.id, t.event_id, COALESCE(SUM(s.quantity), 0)
+        FROM tbl_tickets t
+        LEFT JOIN tbl_ticket_slots s ON s.ticket_id = t.id
+        WHERE t.event_id IN ({placeholders})
+        GROUP BY t.id, t.event_id
+    """, tuple(event_ids))
+    return _stock(cursor)
+
+
+def stock_for_upcoming(cursor, today):
+    """{ticket_id: (event_id, remaining)} for every ticket of events on or after `today`."""
+    cursor.execute("""
+        SELECT t.id, t.event_id, COALESCE(SUM(s.quantity), 0)
+        FROM tbl_tickets t
+        JOIN tbl_events e ON e.id = t.event_id
+        LEFT JOIN tbl_ticket_slots s ON s.ticket_id = t.id
+        WHERE e.date >= %s
+        GROUP BY t.id, t.event_id
+    """, (today,))
+    return _stock(cursor)
+
+
+def announce(cursor, conn, ticket_ids):
+    """
+    Publishes the current stock of `ticket_ids` after the caller's commit. The
+    read is rolled back so it leaves no snapshot open on the caller's
+    connection. A failed read is dropped: the feed lags, the write stands.
+    """
+    if not FEED.has_subscribers() or not ticket_ids:
+        return
+    try:
+        tickets = stock_for_tickets(cursor, sorted(set(ticket_ids)))
+        conn.rollback()
+    except mysql.connector.Error:
+        return
+    FEED.publish(tickets)
+
+
+def watcher_updates(seen, changed, watching):
+    """
+    The `availability` entries one watcher should get for `changed` (from
+    Feed.changes). `seen` maps ticket_id -> (event_id, remaining) as last sent
+    to this watcher and is updated; `watching` is its event ids (empty: all).
+    Deltas are against what the watcher last saw, so skipped values still add up.
+    """
+    updates = []
+    for ticket_id, (event_id, remaining) in sorted(changed.items()):
+        if watching and event_id not in watching:
+            continue
+        previous = seen[ticket_id][1] if ticket_id in seen else 0   # a new ticket type starts at 0
+        if ticket_id in seen and previous == remaining:
+            continue
+        seen[ticket_id] = (event_id, remaining)
+        updates.append({"ticket_id": ticket_id, "event_id": event_id,
+                        "remaining": remaining, "delta": remaining - previous})
+    return updates
+
+
+class _StreamHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass   # keep the portal's terminal clean
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path != "/availability":
+            self.send_error(404)
+            return
+        try:
+            event_ids = [int(value) for value in urllib.parse.parse_qs(url.query).get("event_id", [])]
+        except ValueError:
+            self.send_error(400, "event_id must be a number")
+            return
+
+        after = FEED.subscribe()
+        try:
+            try:
+                seen = self.server.snapshot(event_ids)
+            except mysql.connector.Error:
+                self.send_error(503, "database unavailable")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self._send("snapshot", {"seq": after, "tickets": [
+                {"ticket_id": ticket_id, "event_id": event_id, "remaining": remaining}
+                for ticket_id, (event_id, remaining) in sorted(seen.items())]})
+            watching = set(event_ids)
+            while True:
+                result = FEED.changes(after, HEARTBEAT_INTERVAL)
+                if result is None:
+                    return
+                after, changed = result
+                updates = watcher_updates(seen, changed, watching)
+                if updates:
+                    self._send("availability", {"seq": after, "tickets": updates})
+                    self.server.stopping.wait(COALESCE_INTERVAL)   # later changes pile up into one message
+                elif not changed:
+                    self.wfile.write(b": keepalive\n\n")
+                    self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass   # the watcher went away
+        finally:
+            FEED.unsubscribe()
+
+    def _send(self, name, data):
+        self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+class _FeedHTTPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, connect):
+        super().__init__(address, _StreamHandler)
+        self.connect = connect
+        self.stopping = threading.Event()
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def snapshot(self, event_ids):
+        """Current stock for the watched events, on one shared connection (reconnected after an error)."""
+        with self._lock:
+            try:
+                if self._conn is None:
+                    self._conn = self.connect()
+                cursor = self._conn.cursor()
+                try:
+                    if event_ids:
+                        return stock_for_events(cursor, event_ids)
+                    return stock_for_upcoming(cursor, datetime.date.today())
+                finally:
+                    cursor.close()
+                    self._conn.rollback()
+            except mysql.connector.Error:
+                if self._conn is not None:
+                    try:
+                        self._conn.close()
+                    except mysql.connector.Error:
+                        pass
+                self._conn = None
+                raise
+
+
+class FeedServer(threading.Thread):
+    """Background thread serving the SSE stream on `port`."""
+
+    def __init__(self, connect, port, host="127.0.0.1"):
+        super().__init__(name="availability-feed", daemon=True)
+        self.httpd = _FeedHTTPServer((host, port), connect)
+
+    def run(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.stopping.set()
+        FEED.close()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def server_from_env(connect):
+    """A FeedServer on PESU_FEED_PORT, or None when it is not set."""
+    port = os.environ.get("PESU_FEED_PORT")
+    if not port:
+        return None
+    return FeedServer(connect, int(port), os.environ.get("PESU_FEED_HOST", "127.0.0.1"))
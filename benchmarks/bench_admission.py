@@ -0,0 +1,206 @@
+"""
+Registration burst: 5,000 simulated students try to book at once.
+
+Each student is a thread that arrives within --ramp seconds and runs one
+booking, from arrival to commit. A few "spammers" retry in a tight loop.
+The burst runs twice, once straight at the database and once through
+admission control (admission.FairGate + admission.RateLimiter). The report
+gives p50/p95/p99 latency, throughput, and how many bookings were shed or
+rejected.
+
+By default the database is a simulated one with a fixed number of cores:
+a transaction's time is its base time scaled by how oversubscribed the
+cores are when it starts, plus a contention penalty for every transaction
+beyond the core count. One that would wait past the lock-wait timeout fails
+with errno 1205, like InnoDB. --sqlite runs the real
+hold-and-order path on a temporary SQLite file instead (slower).
+
+    python benchmarks/bench_admission.py --students 5000
+    python benchmarks/bench_admission.py --students 2000 --sqlite
+"""
+import argparse
+import datetime
+import os
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import mysql.connector  # noqa: E402
+
+import admission  # noqa: E402
+import db_backends  # noqa: E402
+import migrations  # noqa: E402
+import ticket_holds  # noqa: E402
+import ticket_inventory  # noqa: E402
+
+
+class SimulatedDatabase:
+    """Service time grows once concurrent transactions exceed the cores (sharing plus lock contention)."""
+
+    def __init__(self, cores, base_ms, contention, lock_wait_timeout):
+        self.cores = cores
+        self.base = base_ms / 1000
+        self.contention = contention
+        self.lock_wait_timeout = lock_wait_timeout
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def book(self, user_id):
+        with self._lock:
+            self.active += 1
+            concurrent = self.active
+        try:
+            overload = max(0, concurrent - self.cores)
+            service = self.base * max(1.0, concurrent / self.cores) * (1 + self.contention * overload)
+            if service > self.lock_wait_timeout:
+                time.sleep(self.lock_wait_timeout)
+                raise mysql.connector.Error(msg="Lock wait timeout exceeded", errno=1205)
+            time.sleep(service)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class SQLiteDatabase:
+    """The real hold + order path on SQLite; `pool_size` connections, or one per booking when None."""
+
+    def __init__(self, path, students, pool_size):
+        self.path = path
+        conn = db_backends.SQLiteBackend(path).connect()
+        cursor = conn.cursor()
+        migrations.migrate(cursor, conn)
+        cursor.execute("INSERT INTO tbl_hosts (name, email, role) VALUES ('Bench Host', 'burst@x', 'Bench')")
+        host_id = cursor.lastrowid
+        cursor.execute("""
+            INSERT INTO tbl_events (name, description, date, start_time, end_time, organizer_id, status, max_participants)
+            VALUES ('Burst', 'bench', %s, %s, %s, %s, 'Scheduled', 1000000)
+        """, (datetime.date.today() + datetime.timedelta(days=7), datetime.time(9), datetime.time(17), host_id))
+        self.event_id = cursor.lastrowid
+        cursor.execute("INSERT INTO tbl_tickets (event_id, ticket_type, price, quantity) VALUES (%s, 'Burst', 0, 1000000)",
+                       (self.event_id,))
+        self.ticket_id = cursor.lastrowid
+        ticket_inventory.init_slots(cursor, self.ticket_id, 1000000)
+        cursor.executemany("INSERT INTO tbl_students (srn, name, semester, section) VALUES (%s, %s, 5, 'A')",
+                           [(f"BURST-{i}", f"Student {i}") for i in range(students)])
+        cursor.execute("SELECT id FROM tbl_students WHERE srn LIKE 'BURST-%'")
+        self.student_ids = [row[0] for row in cursor.fetchall()]
+        conn.commit()
+        conn.close()
+        self.pool = None
+        if pool_size:
+            self.pool = queue.Queue()
+            for _ in range(pool_size):
+                self.pool.put(db_backends.SQLiteBackend(path).connect())
+
+    def book(self, user_id):
+        conn = self.pool.get() if self.pool else db_backends.SQLiteBackend(self.path).connect()
+        cursor = conn.cursor()
+        try:
+            user_id = self.student_ids[user_id % len(self.student_ids)]
+            hold = ticket_holds.place_hold(cursor, conn, self.ticket_id, self.event_id, user_id, 1)
+            ticket_holds.claim_hold(cursor, hold[0])
+            cursor.execute("INSERT INTO tbl_orders (ticket_id, user_id, order_time, payment_status) VALUES (%s, %s, %s, 'Completed')",
+                           (self.ticket_id, user_id, datetime.datetime.now()))
+            conn.commit()
+        except mysql.connector.Error:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            if self.pool:
+                self.pool.put(conn)
+            else:
+                conn.close()
+
+
+def run_burst(database, args, gate=None, limiter=None):
+    latencies, outcomes = [], {"ok": 0, "shed_1205": 0, "rate_limited": 0, "queue_rejected": 0, "error": 0}
+    lock = threading.Lock()
+    start_at = time.perf_counter() + 0.5
+
+    def attempt(user_id):
+        arrived = time.perf_counter()
+        outcome = "ok"
+        try:
+            if limiter:
+                limiter.check(user_id)
+            if gate:
+                gate.acquire()
+            entered = time.perf_counter()
+            try:
+                database.book(user_id)
+            finally:
+                if gate:
+                    gate.release(time.perf_counter() - entered)
+        except admission.Rejected as err:
+            outcome = "rate_limited" if err.args[0].startswith("Too many") else "queue_rejected"
+        except mysql.connector.Error as err:
+            outcome = "shed_1205" if admission.is_lock_timeout(err) else "error"
+        with lock:
+            outcomes[outcome] += 1
+            if outcome == "ok":
+                latencies.append((time.perf_counter() - arrived) * 1000)
+
+    def student(user_id, spammer):
+        time.sleep(max(0.0, start_at + random.uniform(0, args.ramp) - time.perf_counter()))
+        for _ in range(args.spam_attempts if spammer else 1):
+            attempt(user_id)
+
+    threads = [threading.Thread(target=student, args=(i, random.random() < args.spammers), daemon=True)
+               for i in range(args.students)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start_at
+    return latencies, outcomes, elapsed
+
+
+def report(name, latencies, outcomes, elapsed):
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else float("nan")
+
+    print(f"\n=== {name} ===")
+    print(f"succeeded {outcomes['ok']}, shed (1205) {outcomes['shed_1205']}, rate-limited {outcomes['rate_limited']}, "
+          f"queue-rejected {outcomes['queue_rejected']}, other errors {outcomes['error']}")
+    print(f"p50 {pct(0.50):.1f} ms | p95 {pct(0.95):.1f} ms | p99 {pct(0.99):.1f} ms | max {pct(1.0):.1f} ms | "
+          f"{outcomes['ok'] / elapsed:.0f} bookings/s over {elapsed:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--ramp", type=float, default=1.0, help="seconds over which students arrive")
+    parser.add_argument("--spammers", type=float, default=0.02, help="fraction of students that retry in a loop")
+    parser.add_argument("--spam-attempts", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=admission.BOOKING_CONCURRENCY)
+    parser.add_argument("--cores", type=int, default=8, help="simulated: transactions the database runs at full speed")
+    parser.add_argument("--base-ms", type=float, default=4.0, help="simulated: uncontended transaction time")
+    parser.add_argument("--contention", type=float, default=0.01, help="simulated: slowdown per transaction beyond --cores")
+    parser.add_argument("--lock-wait-timeout", type=float, default=5.0, help="simulated: seconds before errno 1205")
+    parser.add_argument("--sqlite", action="store_true", help="book on a real SQLite database")
+    args = parser.parse_args()
+    threading.stack_size(256 * 1024)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, use_admission in (("no admission control", False), ("admission control", True)):
+            if args.sqlite:
+                database = SQLiteDatabase(os.path.join(tmp, f"burst-{use_admission}.sqlite3"), args.students,
+                                          args.concurrency if use_admission else None)
+            else:
+                database = SimulatedDatabase(args.cores, args.base_ms, args.contention, args.lock_wait_timeout)
+            gate = admission.FairGate(args.concurrency, max_queue=args.students * 2, max_wait=60) if use_admission else None
+            limiter = admission.RateLimiter() if use_admission else None
+            report(f"{label} ({'sqlite' if args.sqlite else 'simulated'}, {args.students} students)",
+                   *run_burst(database, args, gate, limiter))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Runs the same portal workload on the SQLite and MySQL backends.
+
+The workload calls the real portal functions (with their printing sent to
+/dev/null) and the hold/booking path: listing upcoming events, a student's
+registrations, the participant report, and ticket purchases.
+
+SQLite always runs, on a fresh temporary file. MySQL runs only with --mysql.
+It needs a *scratch* database; the schema is migrated in and the seeded
+rows are left there.
+
+    python benchmarks/bench_backends.py --events 2000 --students 5000
+    python benchmarks/bench_backends.py --mysql --mysql-db pesu_bench
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("PESU_CACHE_DISABLED", "1")  # measure the database, not the shared cache
+
+import db_backends  # noqa: E402
+import db_profiles  # noqa: E402
+import migrations  # noqa: E402
+import mysqlconnector  # noqa: E402
+import ticket_holds  # noqa: E402
+import ticket_inventory  # noqa: E402
+
+
+def seed(cursor, conn, events, students, registrations_per_student):
+    cursor.execute("INSERT INTO tbl_hosts (name, email, role) VALUES ('Bench Host', %s, 'Bench')", (f"bench{time.time_ns()}@x",))
+    host_id = cursor.lastrowid
+    cursor.execute("INSERT INTO tbl_venues (name, building, capacity, is_available) VALUES ('Bench Hall', 'B', 100000, 1)")
+    venue_id = cursor.lastrowid
+
+    today = datetime.date.today()
+    event_rows = [(f"Event {i}", "bench", today + datetime.timedelta(days=random.randint(-365, 60)),
+                   datetime.time(9), datetime.time(17), venue_id, host_id, 100000) for i in range(events)]
+    cursor.executemany("""
+        INSERT INTO tbl_events (name, description, date, start_time, end_time, location_id, organizer_id, status, max_participants)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, 'Scheduled', %s)
+    """, event_rows)
+    cursor.execute("SELECT id FROM tbl_events WHERE organizer_id = %s", (host_id,))
+    event_ids = [row[0] for row in cursor.fetchall()]
+
+    tag = time.time_ns()
+    cursor.executemany("INSERT INTO tbl_students (srn, name, semester, section) VALUES (%s, %s, 5, 'A')",
+                       [(f"B{tag}-{i}", f"Student {i}") for i in range(students)])
+    cursor.execute("SELECT id FROM tbl_students WHERE srn LIKE %s", (f"B{tag}-%",))
+    student_ids = [row[0] for row in cursor.fetchall()]
+
+    now = datetime.datetime.now()
+    participants = {(random.choice(event_ids), s) for s in student_ids for _ in range(registrations_per_student)}
+    cursor.executemany("INSERT INTO tbl_event_participants (event_id, user_id, registration_time) VALUES (%s, %s, %s)",
+                       [(e, s, now) for e, s in participants])
+
+    cursor.execute("INSERT INTO tbl_tickets (event_id, ticket_type, price, quantity) VALUES (%s, 'Bench', 0, 1000000)",
+                   (event_ids[0],))
+    ticket_id = cursor.lastrowid
+    ticket_inventory.init_slots(cursor, ticket_id, 1000000)
+    conn.commit()
+    return event_ids[0], ticket_id, student_ids
+
+
+def timed(samples, fn):
+    start = time.perf_counter()
+    fn()
+    samples.append((time.perf_counter() - start) * 1000)
+
+
+def book(cursor, conn, event_id, ticket_id, user_id):
+    hold = ticket_holds.place_hold(cursor, conn, ticket_id, event_id, user_id, 1)
+    ticket_holds.claim_hold(cursor, hold[0])
+    cursor.execute("INSERT INTO tbl_orders (ticket_id, user_id, order_time, payment_status) VALUES (%s, %s, %s, 'Completed')",
+                   (ticket_id, user_id, datetime.datetime.now()))
+    conn.commit()
+
+
+def run_workload(conn, args):
+    cursor = conn.cursor()
+    migrations.migrate(cursor, conn)
+    start = time.perf_counter()
+    event_id, ticket_id, student_ids = seed(cursor, conn, args.events, args.students, args.registrations)
+    seed_s = time.perf_counter() - start
+
+    results = {"list_scheduled_events": [], "my_registrations": [], "list_participant_counts": [], "book_ticket": []}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(args.iterations):
+            user_id = random.choice(student_ids)
+            timed(results["list_scheduled_events"], lambda: mysqlconnector.list_scheduled_events(cursor))
+            timed(results["my_registrations"], lambda: mysqlconnector.my_registrations(cursor, user_id))
+            timed(results["list_participant_counts"], lambda: mysqlconnector.list_participant_counts(cursor))
+            timed(results["book_ticket"], lambda: book(cursor, conn, event_id, ticket_id, user_id))
+    cursor.close()
+    return seed_s, results
+
+
+def report(name, seed_s, results):
+    print(f"\n=== {name} (seeded in {seed_s:.2f}s) ===")
+    print(f"{'Operation':<25} | {'p50 ms':<8} | {'p95 ms':<8} | {'mean ms':<8}")
+    print("-" * 58)
+    for op, samples in results.items():
+        samples.sort()
+        p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0]
+        print(f"{op:<25} | {statistics.median(samples):<8.3f} | {p95:<8.3f} | {statistics.mean(samples):<8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--registrations", type=int, default=5, help="registrations per student")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--mysql", action="store_true", help="also run against MySQL")
+    parser.add_argument("--mysql-db", default="pesu_bench", help="scratch MySQL database with the portal schema")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = db_backends.SQLiteBackend(os.path.join(tmp, "bench.sqlite3")).connect()
+        report("sqlite (WAL)", *run_workload(conn, args))
+        conn.close()
+
+    if args.mysql:
+        conn = db_profiles.connect(db_profiles.load_profile().with_database(args.mysql_db), "mysql")
+        report(f"mysql ({args.mysql_db})", *run_workload(conn, args))
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
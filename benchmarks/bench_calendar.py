@@ -0,0 +1,137 @@
+"""
+Resource calendar latency: the admin week view for 1,000 resources.
+
+Seeds --resources resources with --bookings-per-resource event bookings and
+--maintenance-per-resource maintenance windows each, spread over the past
+and next two months, into a temporary SQLite database (or a scratch MySQL
+database with --mysql). It then times resource_calendar.week_view for random
+weeks, split into the bulk fetch, the sweep and the text rendering.
+
+    python benchmarks/bench_calendar.py
+    python benchmarks/bench_calendar.py --resources 5000 --mysql --mysql-db pesu_bench
+"""
+import argparse
+import collections
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import db_backends  # noqa: E402
+import db_profiles  # noqa: E402
+import migrations  # noqa: E402
+import resource_calendar  # noqa: E402
+
+SPAN_DAYS = 60
+TARGET_MS = 50
+
+
+def seed(cursor, conn, args):
+    tag = time.time_ns()
+    cursor.execute("INSERT INTO tbl_hosts (name, email, role) VALUES ('Bench Host', %s, 'Bench')", (f"cal{tag}@x",))
+    host_id = cursor.lastrowid
+    today = datetime.date.today()
+    cursor.executemany("""
+        INSERT INTO tbl_events (name, description, date, start_time, end_time, location_id, organizer_id, status, max_participants)
+        VALUES (%s, 'bench', %s, %s, %s, NULL, %s, 'Scheduled', 100)
+    """, [(f"Calendar Event {i}", today + datetime.timedelta(days=random.randint(-SPAN_DAYS, SPAN_DAYS)),
+           datetime.time(9), datetime.time(17), host_id) for i in range(500)])
+    cursor.execute("SELECT id FROM tbl_events WHERE organizer_id = %s", (host_id,))
+    events = [row[0] for row in cursor.fetchall()]
+
+    cursor.executemany("INSERT INTO tbl_resources (name, type, quantity, description) VALUES (%s, %s, %s, 'bench')",
+                       [(f"Res {tag % 10000}-{i}", random.choice(["AV", "Furniture", "Lab"]), random.randint(1, 40))
+                        for i in range(args.resources)])
+    cursor.execute("SELECT id, quantity FROM tbl_resources WHERE name LIKE %s", (f"Res {tag % 10000}-%",))
+    resources = cursor.fetchall()
+
+    now = datetime.datetime.combine(today, datetime.time())
+    bookings, windows = [], []
+    for resource_id, quantity in resources:
+        for _ in range(args.bookings_per_resource):
+            start = now + datetime.timedelta(hours=random.randint(-24 * SPAN_DAYS, 24 * SPAN_DAYS))
+            bookings.append((random.choice(events), resource_id, random.randint(1, max(quantity // 3, 1)),
+                             start, start + datetime.timedelta(hours=random.randint(1, 8))))
+        for _ in range(args.maintenance_per_resource):
+            start = now + datetime.timedelta(hours=random.randint(-24 * SPAN_DAYS, 24 * SPAN_DAYS))
+            windows.append((resource_id, start, start + datetime.timedelta(hours=random.randint(2, 48))))
+    cursor.executemany("INSERT INTO tbl_event_resources (event_id, resource_id, quantity_booked, booking_start, booking_end) "
+                       "VALUES (%s, %s, %s, %s, %s)", bookings)
+    cursor.executemany("INSERT INTO tbl_resource_maintenance (resource_id, maintenance_start, maintenance_end, description) "
+                       "VALUES (%s, %s, %s, 'bench')", windows)
+    conn.commit()
+    return [row[0] for row in resources]
+
+
+def run(conn, name, args):
+    cursor = conn.cursor()
+    migrations.migrate(cursor, conn)
+    seed(cursor, conn, args)
+    today = datetime.date.today()
+    phases = collections.defaultdict(list)
+    totals = []
+    for _ in range(args.samples):
+        first_day = today + datetime.timedelta(days=random.randint(-SPAN_DAYS, SPAN_DAYS - 7))
+        start = datetime.datetime.combine(first_day, datetime.time())
+        end = start + datetime.timedelta(days=resource_calendar.WEEK_DAYS)
+
+        t0 = time.perf_counter()
+        resources = resource_calendar.fetch_resources(cursor)
+        intervals = resource_calendar.fetch_intervals(cursor, start, end)
+        t1 = time.perf_counter()
+        boundaries = resource_calendar.day_starts(first_day, resource_calendar.WEEK_DAYS)
+        per_resource = collections.defaultdict(list)
+        for resource_id, interval_start, interval_end, units in intervals:
+            per_resource[resource_id].append((interval_start, interval_end, units))
+        for resource_id, (_, _, quantity) in resources.items():
+            resource_calendar.daily_minimum(resource_calendar.sweep(quantity, per_resource.get(resource_id, ()),
+                                                                    start, end), boundaries)
+        t2 = time.perf_counter()
+        phases["bulk fetch"].append((t1 - t0) * 1000)
+        phases["sweep"].append((t2 - t1) * 1000)
+
+        t0 = time.perf_counter()
+        text = resource_calendar.week_view(cursor, first_day)
+        totals.append((time.perf_counter() - t0) * 1000)
+    cursor.close()
+
+    totals.sort()
+    print(f"\n=== {name}: week view of {len(resources)} resources ({len(text.splitlines()) - 2} rows) ===")
+    print(f"{'Phase':<22} | {'p50 ms':<8} | {'p95 ms':<8} | {'max ms':<8}")
+    print("-" * 56)
+    for label, samples in list(phases.items()) + [("week_view end to end", totals)]:
+        samples.sort()
+        print(f"{label:<22} | {statistics.median(samples):<8.2f} | {samples[int(len(samples) * 0.95) - 1]:<8.2f} | "
+              f"{samples[-1]:<8.2f}")
+    verdict = "within" if totals[int(len(totals) * 0.95) - 1] < TARGET_MS else "OVER"
+    print(f"p95 is {verdict} the {TARGET_MS} ms target.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resources", type=int, default=1_000)
+    parser.add_argument("--bookings-per-resource", type=int, default=40)
+    parser.add_argument("--maintenance-per-resource", type=int, default=2)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--mysql", action="store_true", help="also run against MySQL")
+    parser.add_argument("--mysql-db", default="pesu_bench", help="scratch MySQL database")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = db_backends.SQLiteBackend(os.path.join(tmp, "calendar.sqlite3")).connect()
+        run(conn, "sqlite (WAL)", args)
+        conn.close()
+
+    if args.mysql:
+        conn = db_profiles.connect(db_profiles.load_profile().with_database(args.mysql_db), "mysql")
+        run(conn, f"mysql ({args.mysql_db})", args)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Cold start and per-query overhead for each connection profile.
+
+Cold start runs in a fresh interpreter per sample (so imports are not
+warm): import the driver and db_profiles, connect with the profile, run the
+first query. Per-query overhead is measured on one warm connection: many
+`SELECT 1` round trips plus a typical portal query (upcoming events with
+venue and host).
+
+Every profile is run as defined, and also with the driver and compression
+flipped, so the table shows what each knob costs on this machine and link:
+
+    <profile>               as configured
+    <profile>+pure          pure-Python protocol
+    <profile>+cext          C extension (skipped when it is not installed)
+    <profile>+compress      compressed protocol turned on (+nocompress: off)
+
+MySQL needs a reachable server (connection settings as for the portal,
+PESU_DB_HOST etc.) with the schema migrated. --sqlite runs the same harness
+on the SQLite backend as a baseline (a fresh temporary file; the profile
+knobs do not apply there).
+
+    python benchmarks/bench_profiles.py --cold-samples 10 --queries 2000
+    python benchmarks/bench_profiles.py --sqlite
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import mysql.connector  # noqa: E402
+
+import db_backends  # noqa: E402
+import db_profiles  # noqa: E402
+import migrations  # noqa: E402
+
+PORTAL_QUERY = """
+    SELECT e.id, e.name, e.date, e.start_time, v.name AS venue_name, h.name AS host_name
+    FROM tbl_events e
+    LEFT JOIN tbl_venues v ON e.location_id = v.id
+    JOIN tbl_hosts h ON e.organizer_id = h.id
+    WHERE e.date >= CURDATE()
+    ORDER BY e.date, e.start_time
+    LIMIT 50
+"""
+
+# Runs in a fresh interpreter; prints the phase timings as JSON
+COLD_START = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import db_profiles
+imported = time.perf_counter()
+profile = db_profiles.load_profile(sys.argv[2])
+profile.options.update(json.loads(sys.argv[3]))
+conn = db_profiles.connect(profile, sys.argv[4])
+connected = time.perf_counter()
+cursor = conn.cursor()
+cursor.execute("SELECT 1")
+cursor.fetchall()
+queried = time.perf_counter()
+print(json.dumps({"import": imported - started, "connect": connected - imported, "first_query": queried - connected,
+                  "driver": db_profiles.driver_name(conn)}))
+conn.close()
+"""
+
+
+def variants(names, backend):
+    """(label, profile name, option overrides) for every profile and knob."""
+    if backend == "sqlite":
+        return [(name, name, {}) for name in names]
+    result = []
+    for name in names:
+        options = db_profiles.load_profile(name).options
+        result.append((name, name, {}))
+        if options.get("use_pure", False) is not True:
+            result.append((f"{name}+pure", name, {"use_pure": True}))
+        elif mysql.connector.HAVE_CEXT:
+            result.append((f"{name}+cext", name, {"use_pure": False}))
+        compress = bool(options.get("compress"))
+        result.append((f"{name}+{'nocompress' if compress else 'compress'}", name, {"compress": not compress}))
+    return result
+
+
+def cold_start(profile_name, overrides, backend, samples):
+    runs = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", COLD_START, ROOT, profile_name, json.dumps(overrides), backend],
+                             capture_output=True, text=True, check=True)
+        run = json.loads(out.stdout)
+        run["total"] = time.perf_counter() - started
+        runs.append(run)
+    return runs
+
+
+def open_connection(profile_name, overrides, backend):
+    if backend == "sqlite":
+        # db_backends read PESU_SQLITE_PATH at import, before main() set it
+        return db_backends.SQLiteBackend(os.environ["PESU_SQLITE_PATH"]).connect()
+    profile = db_profiles.load_profile(profile_name)
+    profile.options.update(overrides)
+    return db_profiles.connect(profile, backend)
+
+
+def per_query(profile_name, overrides, backend, queries):
+    conn = open_connection(profile_name, overrides, backend)
+    cursor = conn.cursor()
+    results = {}
+    for label, sql, count in (("SELECT 1", "SELECT 1", queries), ("portal query", PORTAL_QUERY, max(queries // 10, 1))):
+        samples = []
+        for _ in range(count):
+            start = time.perf_counter()
+            cursor.execute(sql)
+            cursor.fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[label] = samples
+    cursor.close()
+    conn.close()
+    return results
+
+
+def report(backend, rows):
+    print(f"\n=== {backend}: cold start (ms, median of samples) ===")
+    print(f"{'Variant':<22} | {'Driver':<16} | {'import':<8} | {'connect':<8} | {'1st query':<9} | {'process':<8}")
+    print("-" * 88)
+    for label, runs, _ in rows:
+        med = {phase: statistics.median(run[phase] for run in runs) * 1000
+               for phase in ("import", "connect", "first_query", "total")}
+        print(f"{label:<22} | {runs[0]['driver']:<16} | {med['import']:<8.1f} | {med['connect']:<8.1f} | "
+              f"{med['first_query']:<9.2f} | {med['total']:<8.1f}")
+
+    print(f"\n=== {backend}: per-query overhead on a warm connection (ms) ===")
+    print(f"{'Variant':<22} | {'SELECT 1 p50':<12} | {'SELECT 1 mean':<13} | {'portal p50':<10} | {'portal mean':<11}")
+    print("-" * 82)
+    for label, _, results in rows:
+        ping, portal = results["SELECT 1"], results["portal query"]
+        print(f"{label:<22} | {statistics.median(ping):<12.3f} | {statistics.mean(ping):<13.3f} | "
+              f"{statistics.median(portal):<10.3f} | {statistics.mean(portal):<11.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="*", help="profiles to compare (default: all)")
+    parser.add_argument("--cold-samples", type=int, default=5, help="fresh processes per variant")
+    parser.add_argument("--queries", type=int, default=1000, help="SELECT 1 round trips per variant")
+    parser.add_argument("--sqlite", action="store_true", help="run on the SQLite backend instead of MySQL")
+    args = parser.parse_args()
+
+    names = args.profiles or db_profiles.profile_names()
+    backend = "sqlite" if args.sqlite else "mysql"
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.sqlite:
+            os.environ["PESU_SQLITE_PATH"] = os.path.join(tmp, "profiles.sqlite3")
+            conn = open_connection(names[0], {}, backend)
+            migrations.migrate(conn.cursor(), conn)
+            conn.close()
+        rows = []
+        for label, name, overrides in variants(names, backend):
+            try:
+                runs = cold_start(name, overrides, backend, args.cold_samples)
+                rows.append((label, runs, per_query(name, overrides, backend, args.queries)))
+            except (subprocess.CalledProcessError, mysql.connector.Error) as err:
+                detail = err.stderr.strip().splitlines()[-1] if isinstance(err, subprocess.CalledProcessError) else err
+                print(f"Skipping {label}: {detail}")
+        if rows:
+            report(backend, rows)
+
+
+if __name__ == "__main__":
+    main()
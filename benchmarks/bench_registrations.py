@@ -0,0 +1,148 @@
+"""
+my_registrations latency: the participants/events/venues join vs the
+precomputed tbl_student_registrations view.
+
+Seeds --students students with --per-student registrations each (default
+50,000 x 100 = 5M registrations) across --events events spread over the
+past year and next two months, builds the view, then times both queries
+for random students.
+
+SQLite always runs, on a fresh temporary file. MySQL runs only with --mysql,
+against a *scratch* database (the seeded rows are left there).
+
+    python benchmarks/bench_registrations.py
+    python benchmarks/bench_registrations.py --students 5000 --mysql --mysql-db pesu_bench
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import db_backends  # noqa: E402
+import db_profiles  # noqa: E402
+import migrations  # noqa: E402
+import student_registrations  # noqa: E402
+
+# my_registrations before the view existed
+JOIN_QUERY = """
+    SELECT e.id, e.name, e.date, e.start_time, v.name
+    FROM tbl_event_participants p
+    JOIN tbl_events e ON p.event_id = e.id
+    LEFT JOIN tbl_venues v ON e.location_id = v.id
+    WHERE p.user_id = %s
+    AND e.date >= CURDATE()
+    AND CONCAT(e.date, ' ', e.end_time) > NOW()
+    ORDER BY e.date
+"""
+BATCH = 50_000
+
+
+def seed(cursor, conn, args):
+    tag = time.time_ns()
+    cursor.execute("INSERT INTO tbl_hosts (name, email, role) VALUES ('Bench Host', %s, 'Bench')", (f"reg{tag}@x",))
+    host_id = cursor.lastrowid
+    cursor.executemany("INSERT INTO tbl_venues (name, building, capacity, is_available) VALUES (%s, 'B', 100000, 1)",
+                       [(f"Venue {tag}-{i}",) for i in range(50)])
+    cursor.execute("SELECT id FROM tbl_venues WHERE name LIKE %s", (f"Venue {tag}-%",))
+    venues = [row[0] for row in cursor.fetchall()]
+
+    today = datetime.date.today()
+    cursor.executemany("""
+        INSERT INTO tbl_events (name, description, date, start_time, end_time, location_id, organizer_id, status, max_participants)
+        VALUES (%s, 'bench', %s, %s, %s, %s, %s, 'Scheduled', 100000)
+    """, [(f"Event {i}", today + datetime.timedelta(days=random.randint(-365, 60)), datetime.time(9), datetime.time(17),
+           random.choice(venues), host_id) for i in range(args.events)])
+    cursor.execute("SELECT id FROM tbl_events WHERE organizer_id = %s", (host_id,))
+    events = [row[0] for row in cursor.fetchall()]
+
+    for start in range(0, args.students, BATCH):
+        cursor.executemany("INSERT INTO tbl_students (srn, name, semester, section) VALUES (%s, %s, 5, 'A')",
+                           [(f"R{tag}-{i}", f"Student {i}") for i in range(start, min(start + BATCH, args.students))])
+    cursor.execute("SELECT id FROM tbl_students WHERE srn LIKE %s", (f"R{tag}-%",))
+    students = [row[0] for row in cursor.fetchall()]
+
+    now = datetime.datetime.now()
+    rows = []
+    for user_id in students:
+        rows.extend((event_id, user_id, now) for event_id in random.sample(events, args.per_student))
+        if len(rows) >= BATCH:
+            cursor.executemany("INSERT INTO tbl_event_participants (event_id, user_id, registration_time) VALUES (%s, %s, %s)", rows)
+            rows = []
+    if rows:
+        cursor.executemany("INSERT INTO tbl_event_participants (event_id, user_id, registration_time) VALUES (%s, %s, %s)", rows)
+    conn.commit()
+    return students
+
+
+def sample(fn, user_ids):
+    samples = []
+    for user_id in user_ids:
+        start = time.perf_counter()
+        fn(user_id)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples
+
+
+def run(conn, name, args):
+    cursor = conn.cursor()
+    migrations.migrate(cursor, conn)
+    start = time.perf_counter()
+    students = seed(cursor, conn, args)
+    seeded = time.perf_counter() - start
+    start = time.perf_counter()
+    student_registrations.rebuild(cursor, conn)
+    built = time.perf_counter() - start
+
+    user_ids = [random.choice(students) for _ in range(args.samples)]
+
+    def join_query(user_id):
+        cursor.execute(JOIN_QUERY, (user_id,))
+        return cursor.fetchall()
+
+    results = {"join (old my_registrations)": sample(join_query, user_ids),
+               "registration view": sample(lambda u: student_registrations.upcoming(cursor, u), user_ids)}
+    mismatches = sum(len(join_query(u)) != len(student_registrations.upcoming(cursor, u)) for u in user_ids[:50])
+    cursor.close()
+
+    print(f"\n=== {name}: {len(students)} students x {args.per_student} registrations "
+          f"(seeded in {seeded:.1f}s, view built in {built:.1f}s) ===")
+    print(f"{'Query':<28} | {'p50 ms':<8} | {'p95 ms':<8} | {'p99 ms':<8}")
+    print("-" * 62)
+    for label, samples in results.items():
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        p99 = samples[int(len(samples) * 0.99) - 1]
+        print(f"{label:<28} | {statistics.median(samples):<8.3f} | {p95:<8.3f} | {p99:<8.3f}")
+    if mismatches:
+        print(f"WARNING: {mismatches} students got a different number of rows from the two queries")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=50_000)
+    parser.add_argument("--per-student", type=int, default=100)
+    parser.add_argument("--events", type=int, default=5_000)
+    parser.add_argument("--samples", type=int, default=1_000)
+    parser.add_argument("--mysql", action="store_true", help="also run against MySQL")
+    parser.add_argument("--mysql-db", default="pesu_bench", help="scratch MySQL database")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = db_backends.SQLiteBackend(os.path.join(tmp, "bench.sqlite3")).connect()
+        run(conn, "sqlite (WAL)", args)
+        conn.close()
+
+    if args.mysql:
+        conn = db_profiles.connect(db_profiles.load_profile().with_database(args.mysql_db), "mysql")
+        run(conn, f"mysql ({args.mysql_db})", args)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
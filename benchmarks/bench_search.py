@@ -0,0 +1,125 @@
+"""
+Event search latency at 500k events.
+
+Seeds --events synthetic events (names and descriptions drawn from a
+Zipf-like vocabulary, so some words are very common and most are rare) into
+a temporary SQLite database, with tickets for a fraction of them, builds the
+in-process index, and times typical searches end to end (index walk plus the
+database fetch of the result rows).
+
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --events 100000 --queries 500
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import db_backends  # noqa: E402
+import event_search  # noqa: E402
+import migrations  # noqa: E402
+import ticket_inventory  # noqa: E402
+
+TOPICS = ["workshop", "hackathon", "seminar", "concert", "quiz", "talk", "fest", "meetup", "competition", "exhibition"]
+BATCH = 50_000
+
+
+def vocabulary(size):
+    return [f"w{i}" for i in range(size)]
+
+
+def zipf_word(words):
+    return words[min(len(words) - 1, int(random.paretovariate(0.7)) - 1)]
+
+
+def seed(cursor, conn, args):
+    words = vocabulary(args.vocabulary)
+    random.shuffle(words)
+    cursor.execute("INSERT INTO tbl_hosts (name, email, role) VALUES ('Bench Host', 'search@x', 'Bench')")
+    hosts = [cursor.lastrowid]
+    for i in range(19):
+        cursor.execute("INSERT INTO tbl_hosts (name, email, role) VALUES (%s, %s, 'Bench')", (f"Host {i}", f"search{i}@x"))
+        hosts.append(cursor.lastrowid)
+    cursor.executemany("INSERT INTO tbl_venues (name, building, capacity, is_available) VALUES (%s, 'B', 1000, 1)",
+                       [(f"Venue {i}",) for i in range(100)])
+    cursor.execute("SELECT id FROM tbl_venues")
+    venues = [row[0] for row in cursor.fetchall()]
+
+    today = datetime.date.today()
+    for start in range(0, args.events, BATCH):
+        rows = []
+        for i in range(start, min(start + BATCH, args.events)):
+            name = f"{random.choice(TOPICS)} {zipf_word(words)} {zipf_word(words)}"
+            description = " ".join(zipf_word(words) for _ in range(random.randint(6, 12)))
+            rows.append((name, description, today + datetime.timedelta(days=random.randint(-3650, 90)),
+                         datetime.time(9), datetime.time(17), random.choice(venues), random.choice(hosts)))
+        cursor.executemany("""
+            INSERT INTO tbl_events (name, description, date, start_time, end_time, location_id, organizer_id, status, max_participants)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, 'Scheduled', 100)
+        """, rows)
+
+    cursor.execute("SELECT id FROM tbl_events")
+    event_ids = [row[0] for row in cursor.fetchall()]
+    for event_id in random.sample(event_ids, len(event_ids) // 10):
+        cursor.execute("INSERT INTO tbl_tickets (event_id, ticket_type, price, quantity) VALUES (%s, 'GA', 0, 100)", (event_id,))
+        ticket_inventory.init_slots(cursor, cursor.lastrowid, random.choice([0, 100]), slots=1)
+    conn.commit()
+    return words, venues, hosts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=500_000)
+    parser.add_argument("--vocabulary", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=1_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = db_backends.SQLiteBackend(os.path.join(tmp, "search.sqlite3")).connect()
+        cursor = conn.cursor()
+        migrations.migrate(cursor, conn)
+        start = time.perf_counter()
+        words, venues, hosts = seed(cursor, conn, args)
+        print(f"Seeded {args.events} events in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        index = event_search.ensure_index(cursor)
+        postings = sum(len(ids) for ids in index.postings.values())
+        print(f"Built index in {time.perf_counter() - start:.1f}s: {len(index.postings)} words, "
+              f"{postings} postings (~{postings * 4 / 1e6:.0f} MB of id arrays)")
+
+        rare = [word for word, ids in index.postings.items() if len(ids) < 50] or words
+        today = datetime.date.today()
+        shapes = {
+            "common topic word": lambda: dict(text=random.choice(TOPICS)),
+            "topic + frequent word": lambda: dict(text=f"{random.choice(TOPICS)} {random.choice(words[:20])}"),
+            "rare word": lambda: dict(text=random.choice(rare)),
+            "two words + date range": lambda: dict(text=f"{random.choice(TOPICS)} {random.choice(words[:50])}",
+                                                   date_from=today - datetime.timedelta(days=365), date_to=today),
+            "word + venue": lambda: dict(text=random.choice(TOPICS), venue_id=random.choice(venues)),
+            "word + host + upcoming": lambda: dict(text=random.choice(TOPICS), host_id=random.choice(hosts), date_from=today),
+            "word + tickets left": lambda: dict(text=random.choice(TOPICS), available_only=True),
+        }
+        print(f"\n{'Query shape':<26} | {'p50 ms':<8} | {'p99 ms':<8} | {'max ms':<8} | {'avg hits':<8}")
+        print("-" * 70)
+        for label, make in shapes.items():
+            samples, hits = [], []
+            for _ in range(args.queries):
+                kwargs = make()
+                start = time.perf_counter()
+                hits.append(len(event_search.search(cursor, **kwargs)))
+                samples.append((time.perf_counter() - start) * 1000)
+            samples.sort()
+            print(f"{label:<26} | {statistics.median(samples):<8.3f} | {samples[int(len(samples) * 0.99) - 1]:<8.3f} | "
+                  f"{samples[-1]:<8.3f} | {statistics.mean(hits):<8.1f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Listing output cost: one print() per row vs table_output.render().
+
+Formats --rows participant-like rows (event, student, SRN, attended) the
+way list_all_participants used to, with an f-string and a print() per row,
+and then with table_output.render() (sampled widths, chunked writes). Output
+goes to --target, which defaults to /dev/null so only the Python side is
+measured; point it at a terminal or pipe (e.g. --target /dev/tty) to
+include the cost of the terminal itself.
+
+    python benchmarks/bench_table_output.py
+    python benchmarks/bench_table_output.py --rows 200000 --target /dev/tty
+"""
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import table_output  # noqa: E402
+
+
+def make_rows(count):
+    return [(f"Event {random.randint(1, 500)}", f"Student {n}", f"PES2UG23CS{n:06d}", random.randint(0, 1))
+            for n in range(count)]
+
+
+def per_row_print(rows):
+    print(f"{'Event Name':<25} | {'Student Name':<25} | {'SRN':<17} | {'Attended?':<10}")
+    print("-" * 81)
+    for row in rows:
+        attended_text = "Yes" if row[3] == 1 else "No"
+        print(f"{row[0]:<25} | {row[1]:<25} | {row[2]:<17} | {attended_text:<10}")
+
+
+def buffered_render(rows):
+    table_output.render(table_output.columns(
+        "Event Name", "Student Name", "SRN", ("Attended?", lambda row: "Yes" if row[3] == 1 else "No")), rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--target", default=os.devnull, help="where the tables are written")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    os.environ["PESU_PAGER"] = "off"
+    results = {}
+    with open(args.target, "w", encoding="utf-8") as target:
+        for name, fn in (("print() per row", per_row_print), ("table_output.render", buffered_render)):
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(target):
+                    fn(rows)
+                    target.flush()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = best
+
+    print(f"\n=== {args.rows} rows -> {args.target} (best of {args.repeat}) ===")
+    print(f"{'Renderer':<22} | {'Seconds':<8} | {'Rows/s':<10}")
+    print("-" * 46)
+    for name, seconds in results.items():
+        print(f"{name:<22} | {seconds:<8.3f} | {args.rows / seconds:<10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Concurrency benchmark for the sharded ticket inventory.
+
+Runs many buyer threads (one connection each) against a single ticket type
+and reports purchase throughput for several shard counts. Each purchase is a
+real transaction: reserve from the slots, hold the row lock for a simulated
+order insert, then commit. With 1 slot every buyer queues on the same row;
+throughput should rise with the slot count until the server saturates.
+
+Needs a MySQL server with the pesu_proj schema. Connection settings come from
+PESU_DB_HOST / PESU_DB_USER / PESU_DB_PASSWORD / PESU_DB_NAME.
+
+    python benchmarks/bench_ticket_inventory.py --threads 32 --seconds 5
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import mysql.connector
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import migrations  # noqa: E402
+import ticket_inventory  # noqa: E402
+
+DB_CONFIG = {
+    "host": os.environ.get("PESU_DB_HOST", "localhost"),
+    "user": os.environ.get("PESU_DB_USER", "root"),
+    "password": os.environ.get("PESU_DB_PASSWORD", "root"),
+    "database": os.environ.get("PESU_DB_NAME", "pesu_proj"),
+}
+
+
+def setup_ticket(cursor, conn):
+    """Creates a throwaway host, venue, event and ticket; returns their ids."""
+    cursor.execute("INSERT INTO tbl_hosts (name, email, role) VALUES ('Bench Host', %s, 'Bench')", (f"bench{time.time_ns()}@x",))
+    host_id = cursor.lastrowid
+    cursor.execute("INSERT INTO tbl_venues (name, building, capacity, is_available) VALUES ('Bench Venue', 'B', 100000, 1)")
+    venue_id = cursor.lastrowid
+    cursor.execute("""
+        INSERT INTO tbl_events (name, description, date, start_time, end_time, location_id, organizer_id, status, max_participants)
+        VALUES ('Bench Event', 'bench', CURDATE() + INTERVAL 30 DAY, '09:00:00', '17:00:00', %s, %s, 'Scheduled', 100000)
+    """, (venue_id, host_id))
+    event_id = cursor.lastrowid
+    cursor.execute("INSERT INTO tbl_tickets (event_id, ticket_type, price, quantity) VALUES (%s, 'Bench', 0, 0)", (event_id,))
+    ticket_id = cursor.lastrowid
+    conn.commit()
+    return host_id, venue_id, event_id, ticket_id
+
+
+def teardown(cursor, conn, ids):
+    host_id, venue_id, event_id, ticket_id = ids
+    cursor.execute("DELETE FROM tbl_ticket_slots WHERE ticket_id = %s", (ticket_id,))
+    cursor.execute("DELETE FROM tbl_tickets WHERE id = %s", (ticket_id,))
+    cursor.execute("DELETE FROM tbl_events WHERE id = %s", (event_id,))
+    cursor.execute("DELETE FROM tbl_venues WHERE id = %s", (venue_id,))
+    cursor.execute("DELETE FROM tbl_hosts WHERE id = %s", (host_id,))
+    conn.commit()
+
+
+def buyer(ticket_id, deadline, hold_ms, counts, index):
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    done = 0
+    while time.perf_counter() < deadline:
+        if ticket_inventory.reserve(cursor, ticket_id, 1) is None:
+            conn.rollback()
+            break
+        time.sleep(hold_ms / 1000)  # stands in for the order/participant inserts
+        conn.commit()
+        done += 1
+    counts[index] = done
+    cursor.close()
+    conn.close()
+
+
+def run(ticket_id, slots, threads, seconds, hold_ms):
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    ticket_inventory.init_slots(cursor, ticket_id, 10_000_000, slots)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    counts = [0] * threads
+    deadline = time.perf_counter() + seconds
+    workers = [threading.Thread(target=buyer, args=(ticket_id, deadline, hold_ms, counts, i)) for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--hold-ms", type=float, default=2.0, help="time the row lock is held per purchase")
+    parser.add_argument("--shards", default="1,2,4,8,16,32")
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    migrations.migrate(cursor, conn)
+    ids = setup_ticket(cursor, conn)
+    try:
+        print(f"{'Slots':<7} | {'Purchases/s':<12} | {'Speedup':<8}")
+        print("-" * 33)
+        baseline = None
+        for slots in [int(x) for x in args.shards.split(",")]:
+            rate = run(ids[3], slots, args.threads, args.seconds, args.hold_ms)
+            baseline = baseline or rate
+            print(f"{slots:<7} | {rate:<12.1f} | {rate / baseline:<8.2f}")
+    finally:
+        teardown(cursor, conn, ids)
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Streaming consistency checker for inventory, orders and resource bookings.
+
+Several flows can drift the data: a cancellation that releases the wrong
+number of tickets, a ticket quantity edited without regard to orders
+already sold, an order promoted without registering its buyer, a resource
+booked past its capacity. This scanner checks the invariants behind them:
+
+    ticket_inventory        sold + remaining + held = issued, per ticket
+                            (see ticket_inventory for the definitions)
+    completed_orders        every Completed order's buyer is a participant
+                            of the order's event
+    stale_pending_orders    (warning) Pending orders older than
+                            reconciliation.EXPIRE_AFTER_HOURS
+    resource_capacity       concurrent bookings of a resource never exceed
+                            its quantity
+    resource_maintenance    (warning) no booking overlaps a maintenance
+                            window of its resource
+
+Every check walks its driving table in primary-key ranges (tickets, orders,
+resources). The ranges are handed to a pool of worker processes, each with
+its own connection, and the results stream back as they finish. Each range
+is bounded in size and the parent keeps only counts and the first
+MAX_SAMPLES violations per check, so memory stays flat however many orders
+there are. Every violation can also be streamed to a JSON-lines file.
+
+Each range is read with single statements, which InnoDB answers from one
+snapshot. Writes landing between two ranges can still show up as
+transient violations on a busy database; run against a replica or re-check
+what it reports.
+
+    python consistency_check.py --report consistency.json
+    python consistency_check.py --workers 8 --violations violations.jsonl
+    python consistency_check.py --only ticket_inventory completed_orders
+"""
+import argparse
+import datetime
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import mysql.connector
+
+import db_profiles
+import reconciliation
+import ticket_inventory
+
+MAX_SAMPLES = 100
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 8)
+
+# check -> (driving table, ids per range, severity, description)
+CHECKS = {
+    "ticket_inventory": ("tbl_tickets", 2_000, "error", "sold + remaining + held = issued"),
+    "completed_orders": ("tbl_orders", 50_000, "error", "every Completed order has a participant"),
+    "stale_pending_orders": ("tbl_orders", 50_000, "warning",
+                             f"no Pending order older than {reconciliation.EXPIRE_AFTER_HOURS}h"),
+    "resource_capacity": ("tbl_resources", 500, "error", "bookings stay within resource capacity"),
+    "resource_maintenance": ("tbl_resources", 500, "warning", "no booking during maintenance"),
+}
+
+_conn = None
+_cursor = None
+
+
+def _check_ticket_inventory(cursor, lo, hi):
+    cursor.execute("""
+        SELECT t.id, t.event_id, t.quantity,
+               (SELECT COUNT(*) FROM tbl_orders o WHERE o.ticket_id = t.id AND o.payment_status NOT IN (%s, %s)),
+               (SELECT COALESCE(SUM(s.quantity), 0) FROM tbl_ticket_slots s WHERE s.ticket_id = t.id),
+               (SELECT COALESCE(SUM(h.quantity), 0) FROM tbl_ticket_holds h WHERE h.ticket_id = t.id AND h.status = 'Held')
+        FROM tbl_tickets t
+        WHERE t.id >= %s AND t.id < %s
+    """, (*ticket_inventory.RELEASED_STATUSES, lo, hi))
+    rows = cursor.fetchall()
+    violations = [{"ticket_id": ticket_id, "event_id": event_id, "issued": issued, "sold": sold,
+                   "remaining": int(remaining), "held": int(held), "drift": issued - sold - int(remaining) - int(held)}
+                  for ticket_id, event_id, issued, sold, remaining, held in rows
+                  if sold + int(remaining) + int(held) != issued]
+    return len(rows), violations
+
+
+def _count_orders(cursor, lo, hi):
+    cursor.execute("SELECT COUNT(*) FROM tbl_orders WHERE id >= %s AND id < %s", (lo, hi))
+    return cursor.fetchone()[0]
+
+
+def _check_completed_orders(cursor, lo, hi):
+    cursor.execute("""
+        SELECT o.id, o.user_id, t.event_id
+        FROM tbl_orders o
+        JOIN tbl_tickets t ON t.id = o.ticket_id
+        WHERE o.id >= %s AND o.id < %s AND o.payment_status = 'Completed'
+        AND NOT EXISTS (SELECT 1 FROM tbl_event_participants p WHERE p.event_id = t.event_id AND p.user_id = o.user_id)
+    """, (lo, hi))
+    violations = [{"order_id": order_id, "user_id": user_id, "event_id": event_id}
+                  for order_id, user_id, event_id in cursor.fetchall()]
+    return _count_orders(cursor, lo, hi), violations
+
+
+def _check_stale_pending_orders(cursor, lo, hi):
+    cutoff = datetime.datetime.now() - datetime.timedelta(hours=reconciliation.EXPIRE_AFTER_HOURS)
+    cursor.execute("""
+        SELECT id, user_id, order_time FROM tbl_orders
+        WHERE id >= %s AND id < %s AND payment_status = 'Pending' AND order_time < %s
+    """, (lo, hi, cutoff))
+    violations = [{"order_id": order_id, "user_id": user_id, "order_time": order_time}
+                  for order_id, user_id, order_time in cursor.fetchall()]
+    return _count_orders(cursor, lo, hi), violations
+
+
+def peak_usage(bookings):
+    """(most units in use at once, when it first happened) for (start, end, units) bookings."""
+    points = sorted([(start, 1, units) for start, _, units in bookings]
+                    + [(end, 0, units) for _, end, units in bookings])   # ends sort before starts
+    used = peak = 0
+    peak_at = None
+    for at, is_start, units in points:
+        used += units if is_start else -units
+        if used > peak:
+            peak, peak_at = used, at
+    return peak, peak_at
+
+
+def _check_resource_capacity(cursor, lo, hi):
+    cursor.execute("SELECT id, quantity FROM tbl_resources WHERE id >= %s AND id < %s", (lo, hi))
+    capacity = dict(cursor.fetchall())
+    cursor.execute("""
+        SELECT resource_id, booking_start, booking_end, quantity_booked
+        FROM tbl_event_resources
+        WHERE resource_id >= %s AND resource_id < %s
+        ORDER BY resource_id
+    """, (lo, hi))
+    violations = []
+    for resource_id, rows in itertools.groupby(cursor.fetchall(), key=lambda row: row[0]):
+        peak, peak_at = peak_usage([row[1:] for row in rows])
+        if resource_id in capacity and peak > capacity[resource_id]:
+            violations.append({"resource_id": resource_id, "capacity": capacity[resource_id],
+                               "peak_booked": peak, "at": peak_at})
+    return len(capacity), violations
+
+
+def _check_resource_maintenance(cursor, lo, hi):
+    cursor.execute("""
+        SELECT er.id, er.resource_id, er.event_id, m.id, er.booking_start, er.booking_end
+        FROM tbl_event_resources er
+        JOIN tbl_resource_maintenance m ON m.resource_id = er.resource_id
+            AND m.maintenance_start < er.booking_end AND m.maintenance_end > er.booking_start
+        WHERE er.resource_id >= %s AND er.resource_id < %s
+    """, (lo, hi))
+    violations = [{"booking_id": booking_id, "resource_id": resource_id, "event_id": event_id,
+                   "maintenance_id": maintenance_id, "booking_start": start, "booking_end": end}
+                  for booking_id, resource_id, event_id, maintenance_id, start, end in cursor.fetchall()]
+    cursor.execute("SELECT COUNT(*) FROM tbl_resources WHERE id >= %s AND id < %s", (lo, hi))
+    return cursor.fetchone()[0], violations
+
+
+_CHECK_FUNCTIONS = {
+    "ticket_inventory": _check_ticket_inventory,
+    "completed_orders": _check_completed_orders,
+    "stale_pending_orders": _check_stale_pending_orders,
+    "resource_capacity": _check_resource_capacity,
+    "resource_maintenance": _check_resource_maintenance,
+}
+
+
+def plan_ranges(cursor, checks):
+    """[(check, lo, hi), ...] covering each check's driving table in primary-key ranges."""
+    bounds, tasks = {}, []
+    for check in checks:
+        table, span, _, _ = CHECKS[check]
+        if table not in bounds:
+            cursor.execute(f"SELECT MIN(id), MAX(id) FROM {table}")
+            bounds[table] = cursor.fetchone()
+        low, high = bounds[table]
+        if low is None:
+            continue
+        tasks.extend((check, lo, min(lo + span, high + 1)) for lo in range(low, high + 1, span))
+    return tasks
+
+
+def _init_worker(profile_name):
+    global _conn, _cursor
+    _conn = db_profiles.connect(profile_name)
+    _cursor = _conn.cursor()
+
+
+def _run_range(task):
+    check, lo, hi = task
+    scanned, violations = _CHECK_FUNCTIONS[check](_cursor, lo, hi)
+    _conn.rollback()   # end the read snapshot so the next range sees current data
+    return check, scanned, violations
+
+
+def run(checks=None, workers=DEFAULT_WORKERS, profile_name="batch", violations_file=None):
+    """Runs the checks and returns the report dict. Every violation is also written to `violations_file`."""
+    checks = list(checks or CHECKS)
+    started_at = datetime.datetime.now()
+    started = time.perf_counter()
+    _init_worker(profile_name)
+    try:
+        tasks = plan_ranges(_cursor, checks)
+        _conn.rollback()
+    finally:
+        _cursor.close()
+        _conn.close()
+
+    results = {check: {"severity": CHECKS[check][2], "invariant": CHECKS[check][3], "ranges": 0,
+                       "scanned": 0, "violations": 0, "samples": []} for check in checks}
+    sink = open(violations_file, "w", encoding="utf-8") if violations_file else None
+    try:
+        with multiprocessing.Pool(max(workers, 1), initializer=_init_worker, initargs=(profile_name,)) as pool:
+            for check, scanned, violations in pool.imap_unordered(_run_range, tasks):
+                result = results[check]
+                result["ranges"] += 1
+                result["scanned"] += scanned
+                result["violations"] += len(violations)
+                room = MAX_SAMPLES - len(result["samples"])
+                result["samples"].extend(violations[:max(room, 0)])
+                if sink:
+                    for violation in violations:
+                        sink.write(json.dumps({"check": check, **violation}, default=str) + "\n")
+    finally:
+        if sink:
+            sink.close()
+
+    for result in results.values():
+        result["samples"].sort(key=lambda violation: list(violation.values())[0])
+    return {
+        "started_at": started_at,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+        "workers": workers,
+        "ok": not any(r["violations"] for r in results.values() if r["severity"] == "error"),
+        "checks": results,
+    }
+
+
+def print_summary(report):
+    print(f"\n{'Check':<22} | {'Severity':<8} | {'Scanned':<10} | {'Violations':<10} | Invariant")
+    print("-" * 100)
+    for check, result in report["checks"].items():
+        print(f"{check:<22} | {result['severity']:<8} | {result['scanned']:<10} | {result['violations']:<10} | "
+              f"{result['invariant']}")
+    verdict = "consistent" if report["ok"] else "INCONSISTENT"
+    print(f"\n{verdict} ({report['elapsed_seconds']:.2f}s with {report['workers']} workers)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--report", default="consistency.json", help="JSON report to write")
+    parser.add_argument("--violations", help="also stream every violation to this JSON-lines file")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--only", nargs="+", choices=list(CHECKS), help="run only these checks")
+    parser.add_argument("--profile", default="batch", help="connection profile for the workers")
+    args = parser.parse_args(argv)
+
+    try:
+        report = run(args.only, args.workers, args.profile, args.violations)
+    except mysql.connector.Error as err:
+        print(f"Consistency check failed: {err}")
+        return 1
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    print_summary(report)
+    print(f"Report written to {args.report}")
+    return 0 if report["ok"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+"""
+Pluggable database backends.
+
+The portal code is written against the mysql.connector API: %s placeholders,
+cursor.rowcount/lastrowid, and mysql.connector.Error with MySQL errnos.
+MySQLBackend is the real thing. SQLiteBackend runs the same code on an
+embedded SQLite file in WAL mode, for offline kiosks and for working without
+a MySQL server. Its cursor rewrites the MySQL-only SQL used in this repo and
+raises mysql.connector errors with the matching errno, so every existing
+`except mysql.connector.Error` / `err.errno == 1062` handler keeps working.
+
+There is no separate SQLite schema: the cursor also translates the DDL in
+migrations.py (AUTO_INCREMENT keys, inline indexes, CREATE TABLE ... LIKE),
+so a SQLite file is created with `python migrations.py migrate` like any
+MySQL database.
+
+Select the backend with PESU_DB_BACKEND=mysql|sqlite (default mysql) and
+the SQLite file with PESU_SQLITE_PATH.
+"""
+import datetime
+import decimal
+import os
+import re
+import sqlite3
+
+import mysql.connector
+from mysql.connector import errors
+
+DEFAULT_SQLITE_PATH = os.environ.get("PESU_SQLITE_PATH", "pesu_proj.sqlite3")
+
+# --- Type adapters: make SQLite hand back the same Python types as MySQL ---
+
+def _adapt_timedelta(value):
+    total = int(value.total_seconds())
+    return f"{total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}"
+
+
+def _convert_time(raw):
+    parts = [int(float(p)) for p in raw.decode().split(":")]
+    while len(parts) < 3:
+        parts.append(0)
+    return datetime.timedelta(hours=parts[0], minutes=parts[1], seconds=parts[2])
+
+
+sqlite3.register_adapter(datetime.datetime, lambda v: v.isoformat(" "))
+sqlite3.register_adapter(datetime.date, lambda v: v.isoformat())
+sqlite3.register_adapter(datetime.time, lambda v: v.isoformat())
+sqlite3.register_adapter(datetime.timedelta, _adapt_timedelta)
+sqlite3.register_adapter(decimal.Decimal, float)
+sqlite3.register_converter("DATE", lambda raw: datetime.date.fromisoformat(raw.decode()))
+sqlite3.register_converter("TIME", _convert_time)
+sqlite3.register_converter("DATETIME", lambda raw: datetime.datetime.fromisoformat(raw.decode()))
+sqlite3.register_converter("DECIMAL", lambda raw: decimal.Decimal(raw.decode()))
+
+
+# --- SQL rewriting: MySQL dialect -> SQLite ---
+
+# Applied outside quoted literals only (see _code_segments)
+_SIMPLE_REWRITES = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\bNOW\(\)", re.I), "datetime('now', 'localtime')"),
+    (re.compile(r"\bCURDATE\(\)", re.I), "date('now', 'localtime')"),
+    (re.compile(r"\bINSERT\s+IGNORE\b", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"\bFOR\s+UPDATE(\s+SKIP\s+LOCKED)?", re.I), ""),
+    (re.compile(r"\bRAND\(\)", re.I), "RANDOM()"),
+]
+_CREATE_TABLE = re.compile(r"^\s*CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.I)
+_CREATE_LIKE = re.compile(r"^\s*CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+(\w+)\s+LIKE\s+(\w+)\s*$", re.I)
+_AUTO_INCREMENT_KEY = re.compile(r"\b(?:BIG)?INT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b", re.I)
+_INLINE_INDEX = re.compile(r",\s*(?:INDEX|KEY)\s+(\w+)\s*\(([^)]*)\)", re.I)
+_TABLE_OPTIONS = re.compile(r"\s*ENGINE\s*=\s*\w+\s*$", re.I)
+_FOREIGN_KEY = re.compile(r",\s*FOREIGN\s+KEY\s*\([^)]*\)\s*REFERENCES\s+\w+\s*\([^)]*\)"
+                          r"(?:\s+ON\s+(?:DELETE|UPDATE)\s+(?:CASCADE|RESTRICT|SET\s+NULL|NO\s+ACTION))*", re.I)
+_TABLE_HEADER = re.compile(r"^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?\w+", re.I)
+_INDEX_HEADER = re.compile(r"^(\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?)(\w+)(\s+ON\s+)(\w+)", re.I)
+
+
+def _code_segments(sql):
+    """Yields (is_code, text) pieces of `sql`, splitting out '...' / "..." literals (with \\ and doubled-quote escapes)."""
+    start, i, quote = 0, 0, None
+    while i < len(sql):
+        ch = sql[i]
+        if quote:
+            if ch == "\\":
+                i += 1
+            elif ch == quote:
+                if sql[i + 1:i + 2] == quote:
+                    i += 1
+                else:
+                    yield False, sql[start:i + 1]
+                    start, quote = i + 1, None
+        elif ch in "'\"":
+            if i > start:
+                yield True, sql[start:i]
+            start, quote = i, ch
+        i += 1
+    if start < len(sql):
+        yield quote is None, sql[start:]
+
+
+def _rewrite_concat(sql):
+    """CONCAT(a, b, ...) -> (a || b || ...), respecting nested parentheses and quotes."""
+    out, i = [], 0
+    pattern = re.compile(r"\bCONCAT\s*\(", re.I)
+    while True:
+        match = pattern.search(sql, i)
+        if not match:
+            out.append(sql[i:])
+            return "".join(out)
+        out.append(sql[i:match.start()])
+        depth, j, args, start, quote = 1, match.end(), [], match.end(), None
+        while depth:
+            ch = sql[j]
+            if quote:
+                if ch == quote:
+                    quote = None
+            elif ch in "'\"":
+                quote = ch
+            elif ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+            elif ch == "," and depth == 1:
+                args.append(sql[start:j])
+                start = j + 1
+            j += 1
+        args.append(sql[start:j - 1])
+        out.append("(" + " || ".join(_rewrite_concat(a.strip()) for a in args) + ")")
+        i = j
+
+
+def translate_sql(sql):
+    """Rewrites a MySQL-dialect statement from this repo into SQLite."""
+    out = []
+    for is_code, text in _code_segments(_rewrite_concat(sql)):
+        if is_code:
+            for pattern, replacement in _SIMPLE_REWRITES:
+                text = pattern.sub(replacement, text)
+        out.append(text)
+    return "".join(out)
+
+
+def translate_create_table(sql):
+    """A MySQL CREATE TABLE -> [SQLite CREATE TABLE, CREATE INDEX for each inline INDEX/KEY]."""
+    table = _CREATE_TABLE.match(sql).group(1)
+    indexes = [f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"
+               for name, columns in _INLINE_INDEX.findall(sql)]
+    sql = _INLINE_INDEX.sub("", sql)
+    sql = _AUTO_INCREMENT_KEY.sub("INTEGER PRIMARY KEY AUTOINCREMENT", sql)
+    sql = _TABLE_OPTIONS.sub("", sql.rstrip())
+    return [translate_sql(sql)] + indexes
+
+
+def _to_mysql_error(err):
+    """Maps a sqlite3 error to the mysql.connector error the portal code expects."""
+    message = str(err)
+    if isinstance(err, sqlite3.IntegrityError):
+        if "UNIQUE" in message or "PRIMARY KEY" in message:
+            return errors.IntegrityError(msg=message, errno=1062)
+        if "FOREIGN KEY" in message:
+            return errors.IntegrityError(msg=message, errno=1452)
+        return errors.IntegrityError(msg=message, errno=1048)
+    if isinstance(err, sqlite3.OperationalError) and "locked" in message:
+        return errors.DatabaseError(msg=message, errno=1205)
+    if isinstance(err, sqlite3.OperationalError) and "no such table" in message:
+        return errors.ProgrammingError(msg=message, errno=1146)
+    if isinstance(err, sqlite3.OperationalError) and "duplicate column name" in message:
+        return errors.ProgrammingError(msg=message, errno=1060)
+    return errors.DatabaseError(msg=message)
+
+
+class SQLiteCursor:
+    """A sqlite3 cursor that accepts this repo's MySQL SQL and raises mysql.connector errors."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursor = conn._raw.cursor()
+
+    def execute(self, sql, params=()):
+        try:
+            like = _CREATE_LIKE.match(sql)
+            if like:
+                self._create_like(*like.groups())
+            elif _CREATE_TABLE.match(sql):
+                for statement in translate_create_table(sql):
+                    self._cursor.execute(statement)
+            else:
+                self._cursor.execute(translate_sql(sql), tuple(params or ()))
+        except sqlite3.Error as err:
+            raise _to_mysql_error(err) from err
+
+    def _create_like(self, table, source):
+        """CREATE TABLE ... LIKE: same columns, keys and indexes as `source`, without its foreign keys (as MySQL)."""
+        if self._conn.table_exists(table):
+            return
+        objects = self._cursor.execute("SELECT type, name, sql FROM sqlite_master WHERE tbl_name = ? "
+                                       "AND sql IS NOT NULL ORDER BY type = 'index'", (source,)).fetchall()
+        if not objects:
+            raise errors.ProgrammingError(msg=f"no such table: {source}", errno=1146)
+        for kind, name, sql in objects:
+            if kind == "table":
+                sql = _FOREIGN_KEY.sub("", _TABLE_HEADER.sub(f"CREATE TABLE IF NOT EXISTS {table}", sql, count=1))
+            else:
+                sql = _INDEX_HEADER.sub(lambda m: f"{m.group(1)}{m.group(2)}_{table}{m.group(3)}{table}", sql, count=1)
+            self._cursor.execute(sql)
+
+    def executemany(self, sql, seq_params):
+        try:
+            self._cursor.executemany(translate_sql(sql), [tuple(p) for p in seq_params])
+        except sqlite3.Error as err:
+            raise _to_mysql_error(err) from err
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Connection wrapper exposing the subset of the mysql.connector API the portal uses."""
+
+    def __init__(self, path):
+        self.path = path
+        self._raw = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES,
+                                    timeout=10, check_same_thread=False)
+        self._raw.execute("PRAGMA journal_mode = WAL")
+        self._raw.execute("PRAGMA synchronous = NORMAL")
+        self._raw.execute("PRAGMA foreign_keys = ON")
+        self._tables = None
+
+    def table_exists(self, name):
+        if self._tables is None or name not in self._tables:
+            rows = self._raw.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+            self._tables = {row[0] for row in rows}
+        return name in self._tables
+
+    def cursor(self, *args, **kwargs):
+        return SQLiteCursor(self)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self._raw.close()
+
+
+class MySQLBackend:
+    name = "mysql"
+
+    def __init__(self, config):
+        self.config = config
+
+    def connect(self):
+        return mysql.connector.connect(**self.config)
+
+
+class SQLiteBackend:
+    name = "sqlite"
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = path
+
+    def connect(self):
+        try:
+            return SQLiteConnection(self.path)
+        except sqlite3.Error as err:
+            raise _to_mysql_error(err) from err
+
+
+def get_backend(config, name=None):
+    """Returns the backend selected by `name` or PESU_DB_BACKEND."""
+    name = (name or os.environ.get("PESU_DB_BACKEND", "mysql")).lower()
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name == "mysql":
+        return MySQLBackend(config)
+    raise ValueError(f"Unknown database backend '{name}' (expected 'mysql' or 'sqlite')")
+
+
+def connect(config, name=None):
+    """Opens a connection on the selected backend."""
+    return get_backend(config, name).connect()
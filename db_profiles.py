@@ -0,0 +1,184 @@
+"""
+Connection profiles.
+
+A profile says how one kind of process talks to MySQL: which driver
+implementation (the C extension or pure Python), whether the protocol is
+compressed, cursor buffering, autocommit, transaction isolation, and any
+session variables to set right after connecting. Every entry point picks
+the profile that fits its workload:
+
+    console  the interactive portal (default)
+    kiosk    venue kiosks on slow links: compression, short timeouts
+    batch    reconciliation, archival, sweepers, migrations: READ COMMITTED,
+             longer lock waits, unbuffered streaming
+    server   long-lived services: READ COMMITTED, short lock waits
+
+Settings come from, in increasing priority: the built-in PROFILES below,
+a JSON file named by PESU_DB_PROFILES ({"profiles": {"name": {...}}},
+where a profile may say "extends": "<other profile>"), and the
+PESU_DB_HOST / PESU_DB_PORT / PESU_DB_USER / PESU_DB_PASSWORD / PESU_DB_NAME
+environment variables. PESU_DB_PROFILE picks the profile used when a caller
+does not name one.
+
+The C extension is used only when it is installed; without it, profiles
+asking for it fall back to the pure implementation. driver_name() reports
+which one a connection really got.
+"""
+import json
+import os
+import re
+
+import mysql.connector
+
+import db_backends
+
+DEFAULT_PROFILE = os.environ.get("PESU_DB_PROFILE", "console")
+
+BASE_CONNECTION = {
+    "host": "localhost",
+    "user": "root",
+    "password": "root",  # <-- IMPORTANT: Change to your MySQL password (or set PESU_DB_PASSWORD)
+    "database": "pesu_proj",  # Make sure this matches your database name
+}
+
+PROFILES = {
+    "console": {"use_pure": False},
+    "kiosk": {"use_pure": False, "compress": True, "connection_timeout": 5},
+    "batch": {"use_pure": False, "buffered": False, "isolation_level": "READ COMMITTED",
+              "session": {"innodb_lock_wait_timeout": 30}},
+    "server": {"use_pure": False, "isolation_level": "READ COMMITTED",
+               "session": {"innodb_lock_wait_timeout": 5}},
+}
+
+_ENV_OVERRIDES = {"PESU_DB_HOST": "host", "PESU_DB_PORT": "port", "PESU_DB_USER": "user",
+                  "PESU_DB_PASSWORD": "password", "PESU_DB_NAME": "database"}
+_CONNECT_OPTIONS = ("use_pure", "compress", "autocommit", "buffered", "raw", "connection_timeout", "charset")
+_ISOLATION_LEVELS = ("READ UNCOMMITTED", "READ COMMITTED", "REPEATABLE READ", "SERIALIZABLE")
+_VARIABLE_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class ConnectionProfile:
+    def __init__(self, name, connection, options=None, isolation_level=None, session=None):
+        if isolation_level and isolation_level.upper() not in _ISOLATION_LEVELS:
+            raise ValueError(f"Profile '{name}': unknown isolation level '{isolation_level}'")
+        for variable in session or {}:
+            if not _VARIABLE_NAME.match(variable):
+                raise ValueError(f"Profile '{name}': invalid session variable name '{variable}'")
+        self.name = name
+        self.connection = connection
+        self.options = options or {}
+        self.isolation_level = isolation_level.upper() if isolation_level else None
+        self.session = session or {}
+
+    def connect_args(self):
+        """Keyword arguments for mysql.connector.connect()."""
+        args = dict(self.connection, **self.options)
+        # connect() raises ImportError for an explicit use_pure=False without the C extension
+        if not args.get("use_pure", True) and not mysql.connector.HAVE_CEXT:
+            del args["use_pure"]
+        return args
+
+    def session_statements(self):
+        """(sql, params) pairs to run on a fresh connection."""
+        statements = []
+        if self.isolation_level:
+            statements.append((f"SET SESSION TRANSACTION ISOLATION LEVEL {self.isolation_level}", ()))
+        for variable, value in self.session.items():
+            statements.append((f"SET SESSION {variable} = %s", (value,)))
+        return statements
+
+    def with_database(self, database):
+        """A copy of this profile pointing at another database (e.g. a scratch one)."""
+        return ConnectionProfile(self.name, dict(self.connection, database=database), self.options,
+                                 self.isolation_level, self.session)
+
+    def __repr__(self):
+        return (f"ConnectionProfile({self.name!r}, options={self.options}, "
+                f"isolation_level={self.isolation_level!r}, session={self.session})")
+
+
+def _load_file_profiles(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("profiles", {})
+
+
+def _resolve(name, definitions, seen=()):
+    if name not in definitions:
+        raise ValueError(f"Unknown connection profile '{name}' (known: {', '.join(sorted(definitions))})")
+    if name in seen:
+        raise ValueError(f"Connection profile '{name}' extends itself")
+    definition = dict(definitions[name])
+    parent = definition.pop("extends", None)
+    if parent is None:
+        return definition
+    merged = _resolve(parent, definitions, seen + (name,))
+    session = dict(merged.get("session", {}), **definition.pop("session", {}))
+    merged.update(definition)
+    merged["session"] = session
+    return merged
+
+
+def _definitions():
+    definitions = dict(PROFILES)
+    if os.environ.get("PESU_DB_PROFILES"):
+        definitions.update(_load_file_profiles(os.environ["PESU_DB_PROFILES"]))
+    return definitions
+
+
+def profile_names():
+    return sorted(_definitions())
+
+
+def load_profile(name=None):
+    """Builds the named profile (default PESU_DB_PROFILE) from the built-ins, the profile file and the env."""
+    name = name or DEFAULT_PROFILE
+    definition = _resolve(name, _definitions())
+
+    connection = dict(BASE_CONNECTION, **definition.get("connection", {}))
+    for variable, key in _ENV_OVERRIDES.items():
+        if os.environ.get(variable):
+            connection[key] = int(os.environ[variable]) if key == "port" else os.environ[variable]
+    options = {key: definition[key] for key in _CONNECT_OPTIONS if key in definition}
+    return ConnectionProfile(name, connection, options, definition.get("isolation_level"), definition.get("session"))
+
+
+def apply_session(conn, profile):
+    """Runs the profile's isolation level and session variables on a MySQL connection."""
+    cursor = conn.cursor()
+    try:
+        for sql, params in profile.session_statements():
+            cursor.execute(sql, params)
+    finally:
+        cursor.close()
+
+
+def connect(profile=None, backend=None):
+    """
+    Opens a connection with `profile` (a ConnectionProfile or a profile name)
+    on the backend chosen by PESU_DB_BACKEND. Session settings only apply to
+    MySQL; the SQLite backend ignores them.
+    """
+    if not isinstance(profile, ConnectionProfile):
+        profile = load_profile(profile)
+    selected = db_backends.get_backend(profile.connect_args(), backend)
+    conn = selected.connect()
+    if selected.name == "mysql" and profile.session_statements():
+        apply_session(conn, profile)
+    return conn
+
+
+def connector(profile=None, backend=None):
+    """A zero-argument callable that opens a new connection with `profile` (for threads and kiosks)."""
+    if not isinstance(profile, ConnectionProfile):
+        profile = load_profile(profile)
+    return lambda: connect(profile, backend)
+
+
+def driver_name(conn):
+    """'C extension', 'pure Python' or the backend class name, for reports."""
+    module = type(conn).__module__
+    if module.startswith("mysql.connector.connection_cext"):
+        return "C extension"
+    if module.startswith("mysql.connector"):
+        return "pure Python"
+    return type(conn).__name__
@@ -0,0 +1,184 @@
+"""
+Read/write routing between the primary and read replicas.
+
+Report and listing reads can go to a replica whose replication lag is within
+a staleness bound. Everything else keeps using the primary cursor it was
+handed, including every read inside a booking transaction. After a student
+writes (registers or cancels), that student's reads stay on the primary for
+a short read-your-writes window, so a just-made registration never
+"disappears". Replica rows may predate a cache invalidation, so callers must
+not put them in the shared cache (see is_replica()).
+
+Replicas are configured with PESU_REPLICA_HOSTS="host[:port],host[:port]"
+(same user/password/database as the primary) and PESU_MAX_STALENESS seconds.
+For local testing without real replication, simulated_replica() wraps any
+connect callable with a fixed fake lag.
+"""
+import os
+import threading
+import time
+
+import mysql.connector
+
+MAX_STALENESS_SECONDS = float(os.environ.get("PESU_MAX_STALENESS", "5"))
+READ_YOUR_WRITES_SECONDS = float(os.environ.get("PESU_READ_YOUR_WRITES", "30"))
+LAG_CHECK_INTERVAL = 1.0   # seconds a lag measurement is trusted for
+
+
+def measure_replication_lag(conn):
+    """Seconds the replica is behind its source, or None if unknown / not replicating."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except mysql.connector.Error:
+            cursor.execute("SHOW SLAVE STATUS")  # MySQL < 8.0.22
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    if not row:
+        return None
+    lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+    return None if lag is None else float(lag)
+
+
+class Replica:
+    """One replica connection plus its last lag measurement."""
+
+    def __init__(self, name, connect, lag_probe=measure_replication_lag):
+        self.name = name
+        self.connect = connect
+        self.lag_probe = lag_probe
+        self.conn = None
+        self.cursor = None
+        self.lag = None
+        self.checked_at = 0.0
+
+    def ensure_connected(self):
+        if self.conn is None:
+            self.conn = self.connect()
+            # Autocommit so each read sees the replica's latest state instead of one frozen snapshot
+            self.conn.autocommit = True
+            self.cursor = self.conn.cursor()
+
+    def current_lag(self):
+        now = time.monotonic()
+        if now - self.checked_at > LAG_CHECK_INTERVAL:
+            try:
+                self.ensure_connected()
+                self.lag = self.lag_probe(self.conn)
+            except mysql.connector.Error:
+                self.close()
+                self.lag = None
+            self.checked_at = now
+        return self.lag
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.cursor.close()
+                self.conn.close()
+            except mysql.connector.Error:
+                pass
+        self.conn = self.cursor = None
+
+
+class Router:
+    """Chooses the cursor a read should use."""
+
+    def __init__(self, primary_cursor, replicas, max_staleness=MAX_STALENESS_SECONDS,
+                 read_your_writes=READ_YOUR_WRITES_SECONDS):
+        self.primary_cursor = primary_cursor
+        self.replicas = replicas
+        self.max_staleness = max_staleness
+        self.read_your_writes = read_your_writes
+        self._recent_writes = {}
+        self._lock = threading.Lock()
+        self._next = 0
+        self.stats = {"primary": 0, "replica": 0}
+
+    def note_write(self, user_id):
+        """Pins `user_id`'s reads to the primary for the read-your-writes window."""
+        with self._lock:
+            self._recent_writes[user_id] = time.monotonic()
+
+    def _recently_wrote(self, user_id):
+        if user_id is None:
+            return False
+        with self._lock:
+            wrote_at = self._recent_writes.get(user_id)
+            if wrote_at is None:
+                return False
+            if time.monotonic() - wrote_at > self.read_your_writes:
+                del self._recent_writes[user_id]
+                return False
+            return True
+
+    def read_cursor(self, user_id=None):
+        """A replica cursor within the staleness bound, else the primary cursor."""
+        if self.replicas and not self._recently_wrote(user_id):
+            for i in range(len(self.replicas)):
+                replica = self.replicas[(self._next + i) % len(self.replicas)]
+                lag = replica.current_lag()
+                if lag is not None and lag <= self.max_staleness and replica.cursor is not None:
+                    self._next = (self._next + i + 1) % len(self.replicas)
+                    self.stats["replica"] += 1
+                    return replica.cursor
+        self.stats["primary"] += 1
+        return self.primary_cursor
+
+    def close(self):
+        for replica in self.replicas:
+            replica.close()
+
+
+def simulated_replica(name, connect, lag_seconds):
+    """
+    A stand-in replica for tests: reads go through `connect` (e.g. the same
+    local database, or a second local instance) and the reported lag is
+    `lag_seconds` (a number, or a callable returning one).
+    """
+    probe = (lambda conn: float(lag_seconds())) if callable(lag_seconds) else (lambda conn: float(lag_seconds))
+    return Replica(name, connect, lag_probe=probe)
+
+
+def replicas_from_env(base_config):
+    """Builds Replica objects from PESU_REPLICA_HOSTS, sharing the primary's credentials."""
+    replicas = []
+    for entry in filter(None, (h.strip() for h in os.environ.get("PESU_REPLICA_HOSTS", "").split(","))):
+        host, _, port = entry.partition(":")
+        config = dict(base_config, host=host)
+        if port:
+            config["port"] = int(port)
+        replicas.append(Replica(entry, lambda config=config: mysql.connector.connect(**config)))
+    return replicas
+
+
+_router = None
+
+
+def install(router):
+    global _router
+    _router = router
+
+
+def uninstall():
+    global _router
+    if _router is not None:
+        _router.close()
+    _router = None
+
+
+def read_cursor(cursor, user_id=None):
+    """The cursor a read-only listing should use; `cursor` itself when routing is off."""
+    return cursor if _router is None else _router.read_cursor(user_id)
+
+
+def is_replica(cursor):
+    """True if `cursor` reads from a replica (its rows may lag the primary)."""
+    return _router is not None and any(cursor is replica.cursor for replica in _router.replicas)
+
+
+def note_write(user_id):
+    if _router is not None:
+        _router.note_write(user_id)
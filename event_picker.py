@@ -0,0 +1,121 @@
+"""
+Bounded event picker for the admin flows.
+
+Instead of printing every event ever created, the picker shows one page of
+PAGE_SIZE events at a time, starting a little before today, and pages with
+keyset conditions on (date, id) served by idx_events_date_id. Every page,
+and jumping straight to an ID or a date, costs one short index range read
+however many years of history tbl_events holds.
+
+At the prompt:
+    <number>       choose that event ID (checked by primary key)
+    n / p          next / previous page
+    d YYYY-MM-DD   jump to a date
+    / words        search names and descriptions (event_search)
+    blank          cancel
+"""
+import datetime
+
+import event_search
+import table_output
+
+PAGE_SIZE = 15
+DAYS_BEFORE_TODAY = 14
+
+
+def page_after(cursor, date, event_id, limit=PAGE_SIZE):
+    """Events strictly after (date, event_id), oldest first."""
+    cursor.execute("""
+        SELECT id, name, date, start_time
+        FROM tbl_events
+        WHERE date > %s OR (date = %s AND id > %s)
+        ORDER BY date, id
+        LIMIT %s
+    """, (date, date, event_id, limit))
+    return cursor.fetchall()
+
+
+def page_before(cursor, date, event_id, limit=PAGE_SIZE):
+    """Events strictly before (date, event_id), oldest first."""
+    cursor.execute("""
+        SELECT id, name, date, start_time
+        FROM tbl_events
+        WHERE date < %s OR (date = %s AND id < %s)
+        ORDER BY date DESC, id DESC
+        LIMIT %s
+    """, (date, date, event_id, limit))
+    return cursor.fetchall()[::-1]
+
+
+def find_event(cursor, event_id, allow_archived=False):
+    cursor.execute("SELECT id, name, date, start_time FROM tbl_events WHERE id = %s", (event_id,))
+    event = cursor.fetchone()
+    if event is None and allow_archived:
+        cursor.execute("SELECT id, name, date, start_time FROM tbl_events_archive WHERE id = %s", (event_id,))
+        event = cursor.fetchone()
+    return event
+
+
+def _show(rows, today):
+    table_output.render(table_output.columns(
+        ("ID", 0), ("Date", 2), ("Start", 3),
+        ("Event Name", lambda row: row[1] if row[2] >= today else f"{row[1]}  (past)")), rows)
+
+
+def pick_event(cursor, prompt="Enter Event ID", start_date=None, allow_archived=False):
+    """
+    Lets the user page through events and choose one. Returns the chosen
+    event ID, or None if the user cancelled. With allow_archived, an ID typed
+    in may also name an archived event.
+    """
+    today = datetime.date.today()
+    start_date = start_date or today - datetime.timedelta(days=DAYS_BEFORE_TODAY)
+    rows = page_after(cursor, start_date, 0)
+    if not rows:
+        rows = page_before(cursor, start_date, 0)
+    if not rows:
+        print("No events found.")
+        return None
+
+    while True:
+        print()
+        _show(rows, today)
+        answer = input(f"\n{prompt} (n/p = next/previous page, d YYYY-MM-DD = go to date, / words = search, "
+                       f"blank = cancel): ").strip()
+        if not answer:
+            return None
+        if answer.isdigit():
+            event = find_event(cursor, int(answer), allow_archived)
+            if event is None:
+                print(f"Error: No event with ID {answer}.")
+                continue
+            return event[0]
+
+        command = answer[0].lower()
+        if command == "n":
+            more = page_after(cursor, rows[-1][2], rows[-1][0]) if rows else []
+            if more:
+                rows = more
+            else:
+                print("(No later events.)")
+        elif command == "p":
+            more = page_before(cursor, rows[0][2], rows[0][0]) if rows else []
+            if more:
+                rows = more
+            else:
+                print("(No earlier events.)")
+        elif command == "d":
+            try:
+                day = datetime.datetime.strptime(answer[1:].strip(), '%Y-%m-%d').date()
+            except ValueError:
+                print("Invalid date. Use YYYY-MM-DD.")
+                continue
+            rows = page_after(cursor, day, 0) or page_before(cursor, day, 0)
+        elif command == "/":
+            found = event_search.search(cursor, answer[1:])
+            if found:
+                rows = sorted(((row[0], row[1], row[2], row[3]) for row in found), key=lambda r: (r[2], r[0]))
+            else:
+                print("No events matched your search.")
+        else:
+            print("Invalid choice.")
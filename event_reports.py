@@ -0,0 +1,215 @@
+"""
+End-of-semester event reports, generated in parallel.
+
+For every event in a date range (hot and archived alike), writes one text
+file with the event's attendance sheet and feedback report: who registered,
+who attended, the ratings and comments, and a summary line for each.
+
+The events are cut into batches of --batch-events and handed to a pool of
+worker processes. Each worker has its own connection and fetches a batch's
+participants and feedback with one query each, then writes the batch's
+files. Batches go to whichever worker is free, so one crowded event does
+not hold up a whole partition.
+
+--scaling runs the same job with 1, 2, 4, ... up to --workers processes and
+prints wall time, events/s and speedup for each, to show how far the
+reports scale with cores on this machine and database.
+
+    python event_reports.py --from 2026-01-01 --to 2026-05-31 --out reports/
+    python event_reports.py --from 2026-01-01 --to 2026-05-31 --workers 8 --scaling
+"""
+import argparse
+import datetime
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+import mysql.connector
+
+import db_profiles
+import table_output
+
+BATCH_EVENTS = 25
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+EVENTS_QUERY = """
+    SELECT e.id, e.name, e.date, e.start_time, e.end_time, v.name, h.name
+    FROM tbl_events e
+    LEFT JOIN tbl_venues v ON e.location_id = v.id
+    JOIN tbl_hosts h ON e.organizer_id = h.id
+    WHERE e.date >= %s AND e.date <= %s
+    UNION ALL
+    SELECT e.id, e.name, e.date, e.start_time, e.end_time, v.name, h.name
+    FROM tbl_events_archive e
+    LEFT JOIN tbl_venues v ON e.location_id = v.id
+    JOIN tbl_hosts h ON e.organizer_id = h.id
+    WHERE e.date >= %s AND e.date <= %s
+    ORDER BY 3, 1
+"""
+
+ATTENDANCE_COLUMNS = table_output.columns("Student ID", "Name", "SRN", "Registered At",
+                                          ("Attended?", lambda row: "Yes" if row[4] == 1 else "No"))
+FEEDBACK_COLUMNS = table_output.columns("Student", "SRN", ("Rating", lambda row: f"{row[2]}/5"),
+                                        ("Comment", 3, 80), "Submitted At")
+
+_conn = None
+_cursor = None
+
+
+def select_events(cursor, date_from, date_to):
+    """(id, name, date, start, end, venue, host) for every hot or archived event in the range, by date."""
+    cursor.execute(EVENTS_QUERY, (date_from, date_to, date_from, date_to))
+    return cursor.fetchall()
+
+
+def fetch_participants(cursor, event_ids):
+    """{event_id: [(student_id, name, srn, registered_at, attendance_status), ...]} in one query."""
+    placeholders = ", ".join(["%s"] * len(event_ids))
+    cursor.execute(f"""
+        SELECT p.event_id, s.id, s.name, s.srn, p.registration_time, p.attendance_status
+        FROM tbl_event_participants p
+        JOIN tbl_students s ON p.user_id = s.id
+        WHERE p.event_id IN ({placeholders})
+        UNION ALL
+        SELECT p.event_id, s.id, s.name, s.srn, p.registration_time, p.attendance_status
+        FROM tbl_event_participants_archive p
+        JOIN tbl_students s ON p.user_id = s.id
+        WHERE p.event_id IN ({placeholders})
+        ORDER BY 1, 3
+    """, tuple(event_ids) * 2)
+    grouped = {event_id: [] for event_id in event_ids}
+    for event_id, *row in cursor.fetchall():
+        grouped[event_id].append(row)
+    return grouped
+
+
+def fetch_feedback(cursor, event_ids):
+    """{event_id: [(name, srn, rating, comments, submitted_at), ...]} in one query."""
+    placeholders = ", ".join(["%s"] * len(event_ids))
+    cursor.execute(f"""
+        SELECT f.event_id, s.name, s.srn, f.rating, f.comments, f.submitted_at
+        FROM tbl_event_feedback f
+        JOIN tbl_students s ON f.user_id = s.id
+        WHERE f.event_id IN ({placeholders})
+        UNION ALL
+        SELECT f.event_id, s.name, s.srn, f.rating, f.comments, f.submitted_at
+        FROM tbl_event_feedback_archive f
+        JOIN tbl_students s ON f.user_id = s.id
+        WHERE f.event_id IN ({placeholders})
+        ORDER BY 1, 6
+    """, tuple(event_ids) * 2)
+    grouped = {event_id: [] for event_id in event_ids}
+    for event_id, *row in cursor.fetchall():
+        grouped[event_id].append(row)
+    return grouped
+
+
+def report_path(out_dir, event):
+    slug = re.sub(r"[^a-z0-9]+", "-", event[1].lower()).strip("-")[:40]
+    return os.path.join(out_dir, f"event-{event[0]}-{slug or 'untitled'}.txt")
+
+
+def write_report(path, event, participants, feedback):
+    """Writes one event's attendance sheet and feedback report."""
+    event_id, name, date, start, end, venue, host = event
+    attended = sum(1 for row in participants if row[4] == 1)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"Event {event_id}: {name}\n")
+        f.write(f"{date} {start}-{end} at {venue or 'N/A'}, hosted by {host}\n")
+
+        f.write("\n--- Attendance Sheet ---\n")
+        table_output.write_table(f, ATTENDANCE_COLUMNS, participants, empty_message="No registrations.")
+        if participants:
+            f.write(f"Registered: {len(participants)}, attended: {attended} "
+                    f"({100 * attended / len(participants):.0f}%)\n")
+
+        f.write("\n--- Feedback Report ---\n")
+        table_output.write_table(f, FEEDBACK_COLUMNS, feedback, empty_message="No feedback.")
+        if feedback:
+            f.write(f"Responses: {len(feedback)}, average rating: "
+                    f"{sum(row[2] for row in feedback) / len(feedback):.2f}/5\n")
+
+
+def _init_worker(profile_name):
+    global _conn, _cursor
+    _conn = db_profiles.connect(profile_name)
+    _cursor = _conn.cursor()
+
+
+def _run_batch(task):
+    events, out_dir = task
+    event_ids = [event[0] for event in events]
+    participants = fetch_participants(_cursor, event_ids)
+    feedback = fetch_feedback(_cursor, event_ids)
+    _conn.rollback()   # end the read snapshot
+    for event in events:
+        write_report(report_path(out_dir, event), event, participants[event[0]], feedback[event[0]])
+    return len(events), sum(map(len, participants.values())), sum(map(len, feedback.values()))
+
+
+def run(events, out_dir, workers=DEFAULT_WORKERS, batch_events=BATCH_EVENTS, profile_name="batch"):
+    """Writes every event's report with `workers` processes. Returns (events, participants, feedback, wall seconds)."""
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = [(events[i:i + batch_events], out_dir) for i in range(0, len(events), batch_events)]
+    totals = [0, 0, 0]
+    started = time.perf_counter()
+    with multiprocessing.Pool(max(workers, 1), initializer=_init_worker, initargs=(profile_name,)) as pool:
+        for counts in pool.imap_unordered(_run_batch, tasks):
+            totals = [total + count for total, count in zip(totals, counts)]
+    return (*totals, time.perf_counter() - started)
+
+
+def scaling_steps(workers):
+    """1, 2, 4, ... below `workers`, then `workers` itself."""
+    steps, n = [], 1
+    while n < workers:
+        steps.append(n)
+        n *= 2
+    return steps + [workers]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    today = datetime.date.today()
+    parser.add_argument("--from", dest="date_from", type=datetime.date.fromisoformat,
+                        default=today - datetime.timedelta(days=180), help="first event date (default: 180 days ago)")
+    parser.add_argument("--to", dest="date_to", type=datetime.date.fromisoformat, default=today,
+                        help="last event date (default: today)")
+    parser.add_argument("--out", default="reports", help="directory for the report files")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--batch-events", type=int, default=BATCH_EVENTS, help="events per worker task")
+    parser.add_argument("--scaling", action="store_true", help="time the job from 1 worker up to --workers")
+    parser.add_argument("--profile", default="batch", help="connection profile for the workers")
+    args = parser.parse_args(argv)
+
+    try:
+        conn = db_profiles.connect(args.profile)
+        cursor = conn.cursor()
+        events = select_events(cursor, args.date_from, args.date_to)
+        cursor.close()
+        conn.close()
+        if not events:
+            print(f"No events between {args.date_from} and {args.date_to}.")
+            return 0
+
+        print(f"Writing reports for {len(events)} events ({args.date_from} to {args.date_to}) to {args.out}/")
+        print(f"\n{'Workers':<8} | {'Wall s':<8} | {'Events/s':<9} | {'Speedup':<8} | {'Efficiency':<10}")
+        print("-" * 55)
+        single = None   # wall time with one worker, the base for speedup
+        for workers in scaling_steps(args.workers) if args.scaling else [args.workers]:
+            written, participants, feedback, wall = run(events, args.out, workers, args.batch_events, args.profile)
+            if workers == 1:
+                single = wall
+            speedup = f"{single / wall:<8.2f} | {single / wall / workers:<10.0%}" if single else f"{'-':<8} | {'-':<10}"
+            print(f"{workers:<8} | {wall:<8.2f} | {written / wall:<9.1f} | {speedup}")
+        print(f"\n{written} report files, {participants} registrations and {feedback} feedback entries.")
+    except mysql.connector.Error as err:
+        print(f"Report run failed: {err}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Full-text event search over tbl_events.name and description.
+
+An in-process inverted index maps each word to the ascending ids of the
+events containing it (compact int arrays, ~4 bytes per posting), and keeps
+each event's date, venue and host in arrays indexed by event id. A search
+walks the shortest posting list newest-first, checks the other words by
+binary search and the filters by array lookup, and stops once it has
+enough hits, so it touches a small slice of the index even at 500k events.
+Ticket availability is checked in the database for the candidates only.
+
+The index is built lazily on the first search. reindex() keeps it current
+after add_new_event / update_event_details in this process, and every
+search first picks up events other processes inserted since (id > the
+highest id seen). An updated event stays in its old words' postings; its
+current words are kept in `_dirty` and re-checked, which is cheaper than
+rewriting the arrays.
+"""
+import array
+import bisect
+import datetime
+import re
+import threading
+
+MAX_RESULTS = 20
+_CANDIDATE_BATCH = 100
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("a an and at for in of on or the to with".split())
+
+
+def tokenize(*texts):
+    words = set()
+    for text in texts:
+        words.update(_TOKEN.findall((text or "").lower()))
+    return words - _STOPWORDS
+
+
+class EventIndex:
+    def __init__(self):
+        self.postings = {}
+        self.dates = array.array("i")    # date ordinal by event id; 0 = no such event
+        self.venues = array.array("i")
+        self.hosts = array.array("i")
+        self.max_id = 0
+        self._dirty = {}
+
+    def __len__(self):
+        return sum(1 for d in self.dates if d)
+
+    def _grow(self, event_id):
+        missing = event_id + 1 - len(self.dates)
+        if missing > 0:
+            zeros = array.array("i", bytes(4 * missing))
+            self.dates.extend(zeros)
+            self.venues.extend(zeros)
+            self.hosts.extend(zeros)
+
+    def add(self, event_id, name, description, date, venue_id, host_id):
+        """Indexes an event, or re-indexes it if it is already present."""
+        self._grow(event_id)
+        existed = self.dates[event_id] != 0
+        words = tokenize(name, description)
+        for word in words:
+            ids = self.postings.get(word)
+            if ids is None:
+                self.postings[word] = array.array("i", [event_id])
+            elif ids[-1] < event_id:
+                ids.append(event_id)
+            else:
+                pos = bisect.bisect_left(ids, event_id)
+                if pos == len(ids) or ids[pos] != event_id:
+                    ids.insert(pos, event_id)
+        if existed:
+            self._dirty[event_id] = frozenset(words)
+        self.dates[event_id] = date.toordinal()
+        self.venues[event_id] = venue_id or 0
+        self.hosts[event_id] = host_id or 0
+        self.max_id = max(self.max_id, event_id)
+
+    def remove(self, event_id):
+        if event_id < len(self.dates):
+            self.dates[event_id] = 0
+
+    def matches(self, words, date_from=None, date_to=None, venue_id=None, host_id=None):
+        """Yields ids of events containing every word and passing the filters, newest id first."""
+        lists = [self.postings.get(word) for word in words]
+        if not lists or any(ids is None for ids in lists):
+            return
+        lists.sort(key=len)
+        driver, others = lists[0], lists[1:]
+        low = date_from.toordinal() if date_from else 1
+        high = date_to.toordinal() if date_to else datetime.date.max.toordinal()
+        dates, venues, hosts, dirty = self.dates, self.venues, self.hosts, self._dirty
+        for i in range(len(driver) - 1, -1, -1):
+            event_id = driver[i]
+            if not low <= dates[event_id] <= high:
+                continue
+            if venue_id is not None and venues[event_id] != venue_id:
+                continue
+            if host_id is not None and hosts[event_id] != host_id:
+                continue
+            if not all(_contains(ids, event_id) for ids in others):
+                continue
+            if event_id in dirty and not words <= dirty[event_id]:
+                continue
+            yield event_id
+
+
+def _contains(ids, event_id):
+    pos = bisect.bisect_left(ids, event_id)
+    return pos < len(ids) and ids[pos] == event_id
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def _load(cursor, index, after_id=0):
+    cursor.execute("""
+        SELECT id, name, description, date, location_id, organizer_id
+        FROM tbl_events
+        WHERE id > %s
+        ORDER BY id
+    """, (after_id,))
+    while True:
+        rows = cursor.fetchmany(5000)
+        if not rows:
+            break
+        for row in rows:
+            index.add(*row)
+
+
+def ensure_index(cursor):
+    """Builds the index on first use; afterwards picks up events inserted elsewhere."""
+    global _index
+    with _lock:
+        if _index is None:
+            index = EventIndex()
+            _load(cursor, index)
+            _index = index
+        else:
+            _load(cursor, _index, _index.max_id)
+        return _index
+
+
+def reindex(cursor, event_id):
+    """Call after committing an insert or update of `event_id`. No-op until the index is built."""
+    with _lock:
+        if _index is None:
+            return
+        cursor.execute("SELECT id, name, description, date, location_id, organizer_id FROM tbl_events WHERE id = %s",
+                       (event_id,))
+        row = cursor.fetchone()
+        if row is None:
+            _index.remove(event_id)
+        else:
+            _index.add(*row)
+
+
+def drop(event_id):
+    """Call after an event leaves tbl_events."""
+    with _lock:
+        if _index is not None:
+            _index.remove(event_id)
+
+
+def _with_tickets_left(cursor, event_ids):
+    placeholders = ", ".join(["%s"] * len(event_ids))
+    cursor.execute(f"""
+        SELECT t.event_id
+        FROM tbl_tickets t
+        JOIN tbl_ticket_slots s ON s.ticket_id = t.id
+        WHERE t.event_id IN ({placeholders})
+        GROUP BY t.event_id
+        HAVING SUM(s.quantity) > 0
+    """, tuple(event_ids))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def search(cursor, text, date_from=None, date_to=None, venue_id=None, host_id=None,
+           available_only=False, limit=MAX_RESULTS):
+    """
+    Returns up to `limit` rows (id, name, date, start_time, venue, host) for
+    events matching every word of `text` and the filters, newest first.
+    """
+    words = tokenize(text)
+    if not words:
+        return []
+    index = ensure_index(cursor)
+    with _lock:
+        candidates = index.matches(words, date_from, date_to, venue_id, host_id)
+        found = []
+        while len(found) < limit:
+            batch = [event_id for _, event_id in zip(range(_CANDIDATE_BATCH if available_only else limit), candidates)]
+            if not batch:
+                break
+            if available_only:
+                open_events = _with_tickets_left(cursor, batch)
+                batch = [event_id for event_id in batch if event_id in open_events]
+            found.extend(batch[:limit - len(found)])
+    if not found:
+        return []
+
+    placeholders = ", ".join(["%s"] * len(found))
+    cursor.execute(f"""
+        SELECT e.id, e.name, e.date, e.start_time, v.name, h.name
+        FROM tbl_events e
+        LEFT JOIN tbl_venues v ON e.location_id = v.id
+        JOIN tbl_hosts h ON e.organizer_id = h.id
+        WHERE e.id IN ({placeholders})
+    """, tuple(found))
+    rows = {row[0]: row for row in cursor.fetchall()}
+    return [rows[event_id] for event_id in found if event_id in rows]
@@ -0,0 +1,101 @@
+"""
+Group registration: one buyer books a ticket for each of a list of students.
+
+Attendees are given by SRN. All SRNs are resolved with one set query and
+checked against existing registrations with another, so a 50-member club
+costs a handful of round trips. Orders and participant rows are written
+with multi-row INSERTs inside the caller's transaction.
+
+Each order is recorded under the *attendee's* user id, so an attendee can
+cancel their own registration (and get the ticket refunded), and settlement
+reconciliation registers the right student when a pending group payment
+clears. The buyer is kept in the audit log.
+
+Conflicts never abort the batch: unknown SRNs and students who are already
+registered are reported and skipped. If a registration slips in between the
+check and the insert, the multi-row insert of that chunk fails with 1062 and
+its rows are retried one by one (a failed statement only rolls back itself),
+so only the conflicting attendees are dropped; earlier chunks stay inserted.
+"""
+import re
+
+import mysql.connector
+
+INSERT_CHUNK = 500
+_SRN_SPLIT = re.compile(r"[\s,;]+")
+
+
+def parse_srns(text):
+    """Splits a comma/space/newline separated SRN list, upper-cased, duplicates removed, order kept."""
+    seen = {}
+    for srn in _SRN_SPLIT.split(text or ""):
+        if srn:
+            seen.setdefault(srn.upper(), None)
+    return list(seen)
+
+
+def _in_list(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def resolve_students(cursor, srns):
+    """Returns ({srn: user_id} for known SRNs, [unknown SRNs])."""
+    found = {}
+    for start in range(0, len(srns), INSERT_CHUNK):
+        chunk = srns[start:start + INSERT_CHUNK]
+        cursor.execute(f"SELECT srn, id FROM tbl_students WHERE srn IN ({_in_list(chunk)})", tuple(chunk))
+        found.update((srn.upper(), user_id) for srn, user_id in cursor.fetchall())
+    return found, [srn for srn in srns if srn not in found]
+
+
+def already_registered(cursor, event_id, user_ids):
+    registered = set()
+    for start in range(0, len(user_ids), INSERT_CHUNK):
+        chunk = user_ids[start:start + INSERT_CHUNK]
+        cursor.execute(f"""
+            SELECT user_id FROM tbl_event_participants
+            WHERE event_id = %s AND user_id IN ({_in_list(chunk)})
+        """, (event_id, *chunk))
+        registered.update(row[0] for row in cursor.fetchall())
+    return registered
+
+
+def _insert_rows(cursor, sql_prefix, row_template, rows):
+    for start in range(0, len(rows), INSERT_CHUNK):
+        chunk = rows[start:start + INSERT_CHUNK]
+        cursor.execute(sql_prefix + ", ".join([row_template] * len(chunk)),
+                       tuple(value for row in chunk for value in row))
+
+
+def insert_registrations(cursor, event_id, user_ids, registered_at):
+    """
+    Inserts participant rows for `user_ids`. Returns the ids that were
+    registered and the ids that hit a duplicate (errno 1062).
+    """
+    sql = "INSERT INTO tbl_event_participants (event_id, user_id, registration_time) VALUES "
+    rows = [(event_id, user_id, registered_at) for user_id in user_ids]
+    registered, duplicates = [], []
+    for start in range(0, len(rows), INSERT_CHUNK):
+        chunk = rows[start:start + INSERT_CHUNK]
+        try:
+            _insert_rows(cursor, sql, "(%s, %s, %s)", chunk)
+            registered.extend(row[1] for row in chunk)
+            continue
+        except mysql.connector.Error as err:
+            if err.errno != 1062:
+                raise
+        for row in chunk:
+            try:
+                cursor.execute(sql + "(%s, %s, %s)", row)
+                registered.append(row[1])
+            except mysql.connector.Error as err:
+                if err.errno != 1062:
+                    raise
+                duplicates.append(row[1])
+    return registered, duplicates
+
+
+def insert_orders(cursor, ticket_id, user_ids, order_time, payment_status):
+    """One order per attendee, in multi-row INSERTs."""
+    _insert_rows(cursor, "INSERT INTO tbl_orders (ticket_id, user_id, order_time, payment_status) VALUES ",
+                 "(%s, %s, %s, %s)", [(ticket_id, user_id, order_time, payment_status) for user_id in user_ids])
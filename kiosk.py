@@ -0,0 +1,365 @@
+"""
+Offline venue kiosk for attendance and feedback.
+
+A kiosk snapshots one event's participant list from the central database
+into a local SQLite file. After that, it marks attendance and takes feedback
+against the local file only, so scanning works at local-disk speed with no
+connectivity. Every local action is queued and pushed to the central
+database in idempotent batches whenever a connection can be opened; the
+background KioskSyncer retries on its own.
+
+Conflict rules when syncing:
+  * attendance for a registration cancelled centrally since the snapshot is
+    dropped and reported as a conflict;
+  * feedback that already exists centrally wins (first write wins) and the
+    local copy is marked as a conflict instead of overwriting it.
+
+Disconnects can be simulated by handing sync() a `connect` callable that
+raises mysql.connector errors; nothing local is marked as synced unless the
+central transaction committed (see tests/test_kiosk.py).
+
+A kiosk file holds one event at a time. Re-snapshotting it for another
+event first needs every queued action of the old one synced; run_kiosk()
+tries, and refuses to switch while anything is still pending.
+
+    python kiosk.py --event 12
+"""
+import argparse
+import datetime
+import os
+import sqlite3
+import threading
+import time
+
+import mysql.connector
+
+import audit_log
+import db_profiles
+
+SYNC_BATCH_SIZE = 200
+SYNC_INTERVAL = 15   # seconds between background sync attempts
+
+KIOSK_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS kiosk_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    CREATE TABLE IF NOT EXISTS kiosk_participants (
+        user_id INTEGER PRIMARY KEY,
+        srn TEXT NOT NULL,
+        name TEXT NOT NULL,
+        attendance_status INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_kiosk_participants_srn ON kiosk_participants (srn);
+    CREATE TABLE IF NOT EXISTS kiosk_attendance (
+        user_id INTEGER PRIMARY KEY,
+        marked_at TEXT NOT NULL,
+        sync_state TEXT NOT NULL DEFAULT 'pending'
+    );
+    CREATE TABLE IF NOT EXISTS kiosk_feedback (
+        user_id INTEGER PRIMARY KEY,
+        rating INTEGER NOT NULL,
+        comments TEXT,
+        submitted_at TEXT NOT NULL,
+        sync_state TEXT NOT NULL DEFAULT 'pending'
+    );
+"""
+
+
+def kiosk_path(event_id):
+    return os.environ.get("PESU_KIOSK_PATH", f"kiosk_event_{event_id}.sqlite3")
+
+
+class KioskStore:
+    """The kiosk's local SQLite file for one event."""
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.executescript(KIOSK_SCHEMA)
+        self.lock = threading.RLock()   # the kiosk loop and KioskSyncer share the connection
+
+    @property
+    def event_id(self):
+        with self.lock:
+            row = self.db.execute("SELECT value FROM kiosk_meta WHERE key = 'event_id'").fetchone()
+        return int(row[0]) if row else None
+
+    def snapshot(self, cursor, event_id):
+        """
+        Copies the event's participant list from the central DB. Returns the row
+        count. Raises ValueError if the file holds another event with actions
+        still pending, which would otherwise be synced under `event_id`.
+        """
+        query = """
+            SELECT s.id, s.srn, s.name, p.attendance_status
+            FROM tbl_event_participants p
+            JOIN tbl_students s ON p.user_id = s.id
+            WHERE p.event_id = %s
+        """
+        cursor.execute(query, (event_id,))
+        rows = cursor.fetchall()
+        with self.lock, self.db:
+            previous = self.event_id
+            if previous is not None and previous != event_id:
+                attendance, feedback, _ = self.pending_counts()
+                if attendance or feedback:
+                    raise ValueError(f"this kiosk file still has {attendance} attendance and {feedback} feedback "
+                                     f"records for Event {previous} waiting to sync")
+                self.db.execute("DELETE FROM kiosk_attendance")
+                self.db.execute("DELETE FROM kiosk_feedback")
+            self.db.execute("DELETE FROM kiosk_participants")
+            self.db.executemany("INSERT INTO kiosk_participants (user_id, srn, name, attendance_status) VALUES (?, ?, ?, ?)", rows)
+            # Anything marked locally but not yet synced stays marked
+            self.db.execute("""
+                UPDATE kiosk_participants SET attendance_status = 1
+                WHERE user_id IN (SELECT user_id FROM kiosk_attendance)
+            """)
+            self.db.execute("INSERT OR REPLACE INTO kiosk_meta (key, value) VALUES ('event_id', ?)", (str(event_id),))
+            self.db.execute("INSERT OR REPLACE INTO kiosk_meta (key, value) VALUES ('snapshot_at', ?)",
+                            (datetime.datetime.now().isoformat(" ", "seconds"),))
+        return len(rows)
+
+    def find_participant(self, key):
+        """Looks a participant up by SRN or student ID. Returns (user_id, srn, name, attendance_status) or None."""
+        with self.lock:
+            row = self.db.execute("SELECT user_id, srn, name, attendance_status FROM kiosk_participants WHERE srn = ?", (key,)).fetchone()
+            if row is None and str(key).isdigit():
+                row = self.db.execute("SELECT user_id, srn, name, attendance_status FROM kiosk_participants WHERE user_id = ?", (int(key),)).fetchone()
+        return row
+
+    def mark_attendance(self, user_id):
+        """Marks attendance locally. Returns False if the student had already been marked."""
+        with self.lock, self.db:
+            cur = self.db.execute("UPDATE kiosk_participants SET attendance_status = 1 WHERE user_id = ? AND attendance_status = 0", (user_id,))
+            if cur.rowcount == 0:
+                return False
+            self.db.execute("INSERT OR IGNORE INTO kiosk_attendance (user_id, marked_at) VALUES (?, ?)",
+                            (user_id, datetime.datetime.now().isoformat(" ", "seconds")))
+        return True
+
+    def write_feedback(self, user_id, rating, comments):
+        """Stores feedback locally. Returns False if this student already left feedback here."""
+        with self.lock, self.db:
+            cur = self.db.execute("INSERT OR IGNORE INTO kiosk_feedback (user_id, rating, comments, submitted_at) VALUES (?, ?, ?, ?)",
+                                  (user_id, rating, comments, datetime.datetime.now().isoformat(" ", "seconds")))
+            return cur.rowcount == 1
+
+    def pending_counts(self):
+        with self.lock:
+            attendance = self.db.execute("SELECT COUNT(*) FROM kiosk_attendance WHERE sync_state = 'pending'").fetchone()[0]
+            feedback = self.db.execute("SELECT COUNT(*) FROM kiosk_feedback WHERE sync_state = 'pending'").fetchone()[0]
+            conflicts = self.db.execute("""
+                SELECT (SELECT COUNT(*) FROM kiosk_attendance WHERE sync_state = 'conflict')
+                     + (SELECT COUNT(*) FROM kiosk_feedback WHERE sync_state = 'conflict')
+            """).fetchone()[0]
+        return attendance, feedback, conflicts
+
+    def close(self):
+        self.db.close()
+
+
+def _sync_attendance_batch(store, cursor, conn, event_id, batch):
+    user_ids = [row[0] for row in batch]
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    cursor.execute(f"SELECT user_id FROM tbl_event_participants WHERE event_id = %s AND user_id IN ({placeholders})",
+                   (event_id, *user_ids))
+    registered = {row[0] for row in cursor.fetchall()}
+    if registered:
+        placeholders = ", ".join(["%s"] * len(registered))
+        # Setting the flag to 1 is idempotent, so a batch re-sent after a lost commit is harmless
+        cursor.execute(f"UPDATE tbl_event_participants SET attendance_status = 1 WHERE event_id = %s AND user_id IN ({placeholders})",
+                       (event_id, *registered))
+    conn.commit()
+    with store.lock, store.db:
+        store.db.executemany("UPDATE kiosk_attendance SET sync_state = ? WHERE user_id = ?",
+                             [("synced" if u in registered else "conflict", u) for u in user_ids])
+    return len(registered), len(user_ids) - len(registered)
+
+
+def _sync_feedback_batch(store, cursor, conn, event_id, batch):
+    user_ids = [row[0] for row in batch]
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    cursor.execute(f"SELECT user_id FROM tbl_event_feedback WHERE event_id = %s AND user_id IN ({placeholders})",
+                   (event_id, *user_ids))
+    already = {row[0] for row in cursor.fetchall()}
+    cursor.execute(f"SELECT user_id FROM tbl_event_participants WHERE event_id = %s AND attendance_status = 1 AND user_id IN ({placeholders})",
+                   (event_id, *user_ids))
+    attended = {row[0] for row in cursor.fetchall()}
+    to_insert = [row for row in batch if row[0] not in already and row[0] in attended]
+    if to_insert:
+        cursor.executemany("""
+            INSERT IGNORE INTO tbl_event_feedback (event_id, user_id, rating, comments, submitted_at)
+            VALUES (%s, %s, %s, %s, %s)
+        """, [(event_id, u, rating, comments, submitted_at) for u, rating, comments, submitted_at in to_insert])
+    conn.commit()
+    inserted = {row[0] for row in to_insert}
+    with store.lock, store.db:
+        store.db.executemany("UPDATE kiosk_feedback SET sync_state = ? WHERE user_id = ?",
+                             [("synced" if u in inserted else "conflict", u) for u in user_ids])
+    return len(inserted), len(user_ids) - len(inserted)
+
+
+def sync(store, connect, batch_size=SYNC_BATCH_SIZE):
+    """
+    Pushes pending local attendance, then feedback, to the central DB.
+    Returns a stats dict, or None if the central DB could not be reached.
+    """
+    event_id = store.event_id
+    stats = {"attendance_synced": 0, "feedback_synced": 0, "conflicts": 0}
+    try:
+        conn = connect()
+    except mysql.connector.Error:
+        return None
+    cursor = conn.cursor()
+    try:
+        for table, push in (("kiosk_attendance", _sync_attendance_batch), ("kiosk_feedback", _sync_feedback_batch)):
+            columns = "user_id" if table == "kiosk_attendance" else "user_id, rating, comments, submitted_at"
+            while True:
+                with store.lock:
+                    batch = store.db.execute(f"SELECT {columns} FROM {table} WHERE sync_state = 'pending' ORDER BY user_id LIMIT ?",
+                                             (batch_size,)).fetchall()
+                if not batch:
+                    break
+                synced, conflicts = push(store, cursor, conn, event_id, batch)
+                stats["attendance_synced" if table == "kiosk_attendance" else "feedback_synced"] += synced
+                stats["conflicts"] += conflicts
+    except mysql.connector.Error:
+        try:
+            conn.rollback()
+        except mysql.connector.Error:
+            pass
+        return None  # connection dropped mid-sync; unsynced rows stay pending
+    finally:
+        try:
+            cursor.close()
+            conn.close()
+        except mysql.connector.Error:
+            pass
+    if stats["attendance_synced"] or stats["feedback_synced"] or stats["conflicts"]:
+        audit_log.record("kiosk_sync", {"event_id": event_id}, after=stats, actor="system:kiosk")
+    return stats
+
+
+class KioskSyncer(threading.Thread):
+    """Retries sync() in the background until stopped."""
+
+    def __init__(self, store, connect, interval=SYNC_INTERVAL):
+        super().__init__(name="kiosk-sync", daemon=True)
+        self.store = store
+        self.connect = connect
+        self.interval = interval
+        self.last_result = None
+        self.last_attempt = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.last_attempt = time.time()
+            try:
+                self.last_result = sync(self.store, self.connect)
+            except Exception:  # keep retrying; the pending rows stay in the kiosk file
+                self.last_result = None
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def run_kiosk(connect, event_id):
+    """Interactive kiosk loop for one event."""
+    store = KioskStore(kiosk_path(event_id))
+    if store.event_id not in (None, event_id) and any(store.pending_counts()[:2]):
+        print(f"Finishing the sync of Event {store.event_id} left in this kiosk file...")
+        sync(store, connect)
+    try:
+        conn = connect()
+        cursor = conn.cursor()
+        try:
+            count = store.snapshot(cursor, event_id)
+        finally:
+            cursor.close()
+            conn.close()
+        print(f"✅ Snapshot taken: {count} registered participants for Event {event_id}.")
+    except ValueError as err:
+        print(f"❌ Cannot switch this kiosk to Event {event_id}: {err}. Sync it first or set another PESU_KIOSK_PATH.")
+        store.close()
+        return
+    except mysql.connector.Error as err:
+        if store.event_id != event_id:
+            print(f"❌ Cannot reach the central database and no local snapshot exists for Event {event_id}: {err}")
+            store.close()
+            return
+        print("⚠️ Central database unreachable. Working from the last local snapshot.")
+
+    syncer = KioskSyncer(store, connect)
+    syncer.start()
+    try:
+        while True:
+            attendance, feedback, conflicts = store.pending_counts()
+            print(f"\n--- 📟 Venue Kiosk: Event {event_id} (unsynced: {attendance} attendance, {feedback} feedback; {conflicts} conflicts) ---")
+            print("1. Scan Student (mark attendance)")
+            print("2. Leave Feedback")
+            print("3. Sync Now")
+            print("0. Close Kiosk")
+            choice = input("Enter your choice: ")
+
+            if choice == "1":
+                participant = store.find_participant(input("Scan SRN or enter Student ID: ").strip())
+                if participant is None:
+                    print("❌ Not registered for this event.")
+                elif store.mark_attendance(participant[0]):
+                    print(f"✅ {participant[2]} ({participant[1]}) marked as attended.")
+                else:
+                    print(f"{participant[2]} was already marked as attended.")
+            elif choice == "2":
+                participant = store.find_participant(input("Scan SRN or enter Student ID: ").strip())
+                if participant is None:
+                    print("❌ Not registered for this event.")
+                    continue
+                if not store.find_participant(participant[1])[3]:
+                    print("Error: You cannot leave feedback because your attendance was not marked for this event.")
+                    continue
+                try:
+                    rating = int(input("Enter rating (1-5): "))
+                except ValueError:
+                    print("Invalid input. Please enter a number.")
+                    continue
+                if not 1 <= rating <= 5:
+                    print("Invalid rating. Please enter a number between 1 and 5.")
+                    continue
+                comments = input("Enter comments (optional): ")
+                if store.write_feedback(participant[0], rating, comments):
+                    print("✅ Thank you! Your feedback has been recorded.")
+                else:
+                    print("Error: You have already submitted feedback for this event.")
+            elif choice == "3":
+                result = sync(store, connect)
+                if result is None:
+                    print("⚠️ Still offline. Everything is kept locally and will sync later.")
+                else:
+                    print(f"✅ Synced {result['attendance_synced']} attendance and {result['feedback_synced']} feedback records "
+                          f"({result['conflicts']} conflicts).")
+            elif choice == "0":
+                result = sync(store, connect)
+                if result is None:
+                    print("⚠️ Closing while offline. Re-open the kiosk for this event to finish syncing.")
+                break
+            else:
+                print("Invalid choice.")
+    finally:
+        syncer.stop()
+        store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline venue kiosk for attendance and feedback.")
+    parser.add_argument("--event", type=int, required=True, help="event ID to run the kiosk for")
+    args = parser.parse_args()
+
+    run_kiosk(db_profiles.connector("kiosk"), args.event)
+    audit_log.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Bulk resource maintenance planning.
+
+A plan is a list of maintenance windows, (resource_id, start, end,
+description), over any number of resources. find_impacted() joins the
+whole plan against tbl_event_resources at once and returns every booking
+each window would collide with, not just the first one. schedule() inserts
+all the windows that collide with nothing in a single transaction and
+reports the rest.
+
+Scheduling a window no longer touches the resource's status. Each window
+carries its own status ('Scheduled' -> 'Active' -> 'Done'), and apply_due()
+moves windows along by the clock. A resource goes 'Under Maintenance' when
+one of its windows starts, and back to 'Available' when its last active
+window ends. Statuses set by hand to anything other than
+'Available'/'Under Maintenance' (e.g. 'Damaged') are left alone.
+MaintenanceScheduler runs apply_due() in the background of the portal; a
+deployment without a long-running portal can cron `--run-due`.
+
+    python maintenance_planner.py plan.csv            # impact report only
+    python maintenance_planner.py plan.csv --apply    # schedule the conflict-free windows
+    python maintenance_planner.py --run-due
+
+plan.csv has one window per row: resource_id,start,end[,description], with
+times as 'YYYY-MM-DD HH:MM:SS'. A header row is skipped.
+"""
+import argparse
+import csv
+import datetime
+import sys
+import threading
+import time
+
+import mysql.connector
+
+import audit_log
+import db_profiles
+
+SCHEDULER_INTERVAL = 60     # seconds between scheduler passes
+PLAN_CHUNK = 200            # windows per impact query (4 parameters each)
+SCHEDULER_ACTOR = "system:maintenance-scheduler"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_window(resource_id, start, end, description=""):
+    """Validates one window given as text. Raises ValueError on a bad ID, time or order."""
+    window = (int(resource_id), datetime.datetime.strptime(start.strip(), TIME_FORMAT),
+              datetime.datetime.strptime(end.strip(), TIME_FORMAT), description.strip())
+    if window[2] <= window[1]:
+        raise ValueError(f"window for resource {window[0]} ends before it starts")
+    return window
+
+
+def known_resources(cursor, windows):
+    """The subset of the plan's resource IDs that exist."""
+    ids = sorted({window[0] for window in windows})
+    found = set()
+    for i in range(0, len(ids), PLAN_CHUNK):
+        chunk = ids[i:i + PLAN_CHUNK]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(f"SELECT id FROM tbl_resources WHERE id IN ({placeholders})", tuple(chunk))
+        found.update(row[0] for row in cursor.fetchall())
+    return found
+
+
+def find_impacted(cursor, windows):
+    """
+    {window index: [(booking_id, event_id, event_name, quantity, booking_start, booking_end), ...]}
+    for every window that overlaps at least one booking. The plan is sent as a
+    derived table and joined against the bookings in one query per PLAN_CHUNK windows.
+    """
+    impacted = {}
+    for offset in range(0, len(windows), PLAN_CHUNK):
+        chunk = windows[offset:offset + PLAN_CHUNK]
+        requested = " UNION ALL ".join(
+            ["SELECT %s AS n, %s AS resource_id, %s AS window_start, %s AS window_end"]
+            + ["SELECT %s, %s, %s, %s"] * (len(chunk) - 1))
+        params = []
+        for n, (resource_id, start, end, _) in enumerate(chunk, start=offset):
+            params.extend((n, resource_id, start, end))
+        cursor.execute(f"""
+            SELECT w.n, er.id, er.event_id, e.name, er.quantity_booked, er.booking_start, er.booking_end
+            FROM ({requested}) w
+            JOIN tbl_event_resources er ON er.resource_id = w.resource_id
+                AND er.booking_start < w.window_end AND er.booking_end > w.window_start
+            JOIN tbl_events e ON e.id = er.event_id
+            ORDER BY w.n, er.booking_start
+        """, tuple(params))
+        for n, *booking in cursor.fetchall():
+            impacted.setdefault(int(n), []).append(tuple(booking))
+    return impacted
+
+
+def plan(cursor, windows):
+    """
+    Returns (clear, impacted, unknown): the indexes of windows that name a known
+    resource and overlap no booking, find_impacted() for the plan, and the
+    indexes whose resource does not exist.
+    """
+    found = known_resources(cursor, windows)
+    unknown = [n for n, window in enumerate(windows) if window[0] not in found]
+    impacted = find_impacted(cursor, windows)
+    clear = [n for n, window in enumerate(windows) if window[0] in found and n not in impacted]
+    return clear, impacted, unknown
+
+
+def schedule(cursor, conn, windows):
+    """
+    Plans `windows` and inserts the clear ones in one transaction, reading the
+    plan in the same transaction. Returns plan()'s (scheduled, impacted, unknown).
+    """
+    started = time.perf_counter()
+    try:
+        scheduled, impacted, unknown = plan(cursor, windows)
+        if scheduled:
+            cursor.executemany("""
+                INSERT INTO tbl_resource_maintenance (resource_id, maintenance_start, maintenance_end, description, status)
+                VALUES (%s, %s, %s, %s, 'Scheduled')
+            """, [windows[n] for n in scheduled])
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    if scheduled:
+        audit_log.record("plan_resource_maintenance",
+                         {"windows": len(windows), "resource_ids": sorted({w[0] for w in windows})},
+                         after={"scheduled": [windows[n][:3] for n in scheduled],
+                                "impacted_bookings": sum(len(b) for b in impacted.values()),
+                                "unknown_resources": sorted({windows[n][0] for n in unknown})},
+                         started=started)
+    return scheduled, impacted, unknown
+
+
+def apply_due(cursor, conn, now=None, actor=SCHEDULER_ACTOR):
+    """
+    Starts windows whose time has come and finishes those that are over,
+    updating resource status to match, in one transaction. Returns
+    (windows started, windows finished).
+    """
+    now = now or datetime.datetime.now()
+    started = time.perf_counter()
+    try:
+        cursor.execute("""
+            SELECT id, resource_id FROM tbl_resource_maintenance
+            WHERE status = 'Scheduled' AND maintenance_start <= %s AND maintenance_end > %s
+            FOR UPDATE
+        """, (now, now))
+        starting = cursor.fetchall()
+        if starting:
+            placeholders = ", ".join(["%s"] * len(starting))
+            cursor.execute(f"UPDATE tbl_resource_maintenance SET status = 'Active' WHERE id IN ({placeholders})",
+                           tuple(row[0] for row in starting))
+            resource_ids = tuple({row[1] for row in starting})
+            placeholders = ", ".join(["%s"] * len(resource_ids))
+            cursor.execute(f"""
+                UPDATE tbl_resources SET is_available = 0, maintenance_status = 'Under Maintenance'
+                WHERE id IN ({placeholders}) AND maintenance_status = 'Available'
+            """, resource_ids)
+
+        # Finishing runs after starting, so a back-to-back window keeps its resource out
+        cursor.execute("""
+            SELECT id, resource_id FROM tbl_resource_maintenance
+            WHERE status IN ('Scheduled', 'Active') AND maintenance_end <= %s
+            FOR UPDATE
+        """, (now,))
+        finishing = cursor.fetchall()
+        if finishing:
+            placeholders = ", ".join(["%s"] * len(finishing))
+            cursor.execute(f"UPDATE tbl_resource_maintenance SET status = 'Done' WHERE id IN ({placeholders})",
+                           tuple(row[0] for row in finishing))
+            resource_ids = tuple({row[1] for row in finishing})
+            placeholders = ", ".join(["%s"] * len(resource_ids))
+            cursor.execute(f"""
+                UPDATE tbl_resources SET is_available = 1, maintenance_status = 'Available'
+                WHERE id IN ({placeholders}) AND maintenance_status = 'Under Maintenance'
+                AND NOT EXISTS (SELECT 1 FROM tbl_resource_maintenance m
+                                WHERE m.resource_id = tbl_resources.id AND m.status = 'Active')
+            """, resource_ids)
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    if starting or finishing:
+        audit_log.record("apply_resource_maintenance", {"now": now},
+                         after={"started": [row[0] for row in starting], "finished": [row[0] for row in finishing]},
+                         started=started, actor=actor)
+    return len(starting), len(finishing)
+
+
+def print_plan(windows, scheduled, impacted, unknown, names=None):
+    """Prints the impact report: what was (or would be) scheduled and every booking in the way."""
+    names = names or {}
+    for n in unknown:
+        print(f"  ❌ Window {n + 1}: resource {windows[n][0]} does not exist.")
+    for n, bookings in sorted(impacted.items()):
+        resource_id, start, end, _ = windows[n]
+        print(f"  ❌ Window {n + 1}: {names.get(resource_id, f'resource {resource_id}')} "
+              f"{start:%Y-%m-%d %H:%M} -> {end:%Y-%m-%d %H:%M} collides with {len(bookings)} booking(s):")
+        for booking_id, event_id, event_name, quantity, booking_start, booking_end in bookings:
+            print(f"       booking {booking_id}: {quantity} for '{event_name}' (event {event_id}) "
+                  f"{booking_start:%Y-%m-%d %H:%M} -> {booking_end:%Y-%m-%d %H:%M}")
+    print(f"\n{len(scheduled)} of {len(windows)} window(s) conflict-free, "
+          f"{len(impacted)} blocked by bookings, {len(unknown)} with unknown resources.")
+
+
+class MaintenanceScheduler(threading.Thread):
+    """Background thread that applies due maintenance windows on its own connection."""
+
+    def __init__(self, connect, interval=SCHEDULER_INTERVAL):
+        super().__init__(name="maintenance-scheduler", daemon=True)
+        self.connect = connect
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        conn = None
+        while not self._stop_event.is_set():
+            try:
+                if conn is None:
+                    conn = self.connect()
+                cursor = conn.cursor()
+                apply_due(cursor, conn)
+                cursor.close()
+            except Exception:
+                # Drop the connection and try again on the next pass; a bug in one pass must not stop the thread
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except mysql.connector.Error:
+                        pass
+                conn = None
+            self._stop_event.wait(self.interval)
+        if conn is not None:
+            conn.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def read_plan(path):
+    """Windows from a CSV file (see the module docstring). Raises ValueError naming the bad line."""
+    windows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for line, row in enumerate(csv.reader(f), start=1):
+            if not row or (line == 1 and not row[0].strip().isdigit()):
+                continue
+            try:
+                windows.append(parse_window(*row[:4]))
+            except (TypeError, ValueError) as err:
+                raise ValueError(f"{path}:{line}: {err}") from err
+    return windows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("plan", nargs="?", help="CSV of resource_id,start,end[,description]")
+    parser.add_argument("--apply", action="store_true", help="schedule the conflict-free windows")
+    parser.add_argument("--run-due", action="store_true", help="start and finish due windows, then exit")
+    args = parser.parse_args(argv)
+    if not args.plan and not args.run_due:
+        parser.error("give a plan file and/or --run-due")
+
+    conn = db_profiles.connect("batch")
+    cursor = conn.cursor()
+    try:
+        audit_log.start()
+        if args.plan:
+            windows = read_plan(args.plan)
+            if args.apply:
+                scheduled, impacted, unknown = schedule(cursor, conn, windows)
+            else:
+                scheduled, impacted, unknown = plan(cursor, windows)
+            print_plan(windows, scheduled, impacted, unknown)
+            print("Scheduled." if args.apply else "Dry run; pass --apply to schedule.")
+        if args.run_due:
+            print("Started {} and finished {} maintenance window(s).".format(*apply_due(cursor, conn)))
+    except ValueError as err:
+        print(f"Bad plan: {err}")
+        return 1
+    except mysql.connector.Error as err:
+        print(f"Maintenance planning failed: {err}")
+        return 1
+    finally:
+        audit_log.shutdown()
+        cursor.close()
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,543 @@
+"""
+Versioned schema migrations and an EXPLAIN-based index regression check.
+
+MIGRATIONS is an ordered list of (version, description, statements); all
+DDL lives in this module, so the migration list never changes with the
+application code. migrate() applies the versions not yet recorded in
+tbl_schema_migrations. Table creation uses IF NOT EXISTS, and "index/column
+already exists" errors are ignored, so an existing hand-built database can be
+brought under management. Migrating is an explicit step (some migrations
+rewrite data); the portal only checks pending_migrations() and refuses to
+start while any are outstanding.
+
+check_query_plans() collects every SQL template in the portal modules
+(string constants, f-strings over `placeholders`, and `+` concatenations of
+those with module-level constants), EXPLAINs each one, and reports any table
+read with a full scan (type ALL). Only unfiltered listings (no WHERE clause)
+may full-scan, and only their driving table. A template that cannot be
+EXPLAINed fails the check too.
+
+    python migrations.py migrate
+    python migrations.py status
+    python migrations.py check --database pesu_scratch --seed 20000
+"""
+import argparse
+import ast
+import datetime
+import os
+import random
+import re
+import sys
+
+import mysql.connector
+
+import db_profiles
+
+BASE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS tbl_venues (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        building VARCHAR(100),
+        capacity INT NOT NULL,
+        is_available TINYINT(1) NOT NULL DEFAULT 1
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tbl_hosts (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        email VARCHAR(100) NOT NULL UNIQUE,
+        phone VARCHAR(20) UNIQUE,
+        role VARCHAR(50),
+        department VARCHAR(100)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tbl_students (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        srn VARCHAR(20) NOT NULL UNIQUE,
+        name VARCHAR(100) NOT NULL,
+        semester INT NOT NULL,
+        section VARCHAR(5)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tbl_events (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(200) NOT NULL,
+        description TEXT,
+        date DATE NOT NULL,
+        start_time TIME NOT NULL,
+        end_time TIME NOT NULL,
+        location_id INT,
+        organizer_id INT NOT NULL,
+        max_participants INT,
+        status VARCHAR(20) NOT NULL DEFAULT 'Scheduled',
+        FOREIGN KEY (location_id) REFERENCES tbl_venues(id),
+        FOREIGN KEY (organizer_id) REFERENCES tbl_hosts(id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tbl_tickets (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        event_id INT NOT NULL,
+        ticket_type VARCHAR(50) NOT NULL,
+        price DECIMAL(10, 2) NOT NULL DEFAULT 0,
+        quantity INT NOT NULL DEFAULT 0,
+        FOREIGN KEY (event_id) REFERENCES tbl_events(id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tbl_orders (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        ticket_id INT NOT NULL,
+        user_id INT NOT NULL,
+        order_time DATETIME NOT NULL,
+        payment_status VARCHAR(20) NOT NULL DEFAULT 'Pending',
+        FOREIGN KEY (ticket_id) REFERENCES tbl_tickets(id),
+        FOREIGN KEY (user_id) REFERENCES tbl_students(id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tbl_event_participants (
+        event_id INT NOT NULL,
+        user_id INT NOT NULL,
+        registration_time DATETIME NOT NULL,
+        attendance_status TINYINT(1) NOT NULL DEFAULT 0,
+        PRIMARY KEY (event_id, user_id),
+        FOREIGN KEY (event_id) REFERENCES tbl_events(id),
+        FOREIGN KEY (user_id) REFERENCES tbl_students(id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tbl_event_feedback (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        event_id INT NOT NULL,
+        user_id INT NOT NULL,
+        rating INT NOT NULL,
+        comments TEXT,
+        submitted_at DATETIME NOT NULL,
+        FOREIGN KEY (event_id) REFERENCES tbl_events(id),
+        FOREIGN KEY (user_id) REFERENCES tbl_students(id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tbl_resources (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        type VARCHAR(50),
+        quantity INT NOT NULL DEFAULT 0,
+        description TEXT,
+        is_available TINYINT(1) NOT NULL DEFAULT 1,
+        maintenance_status VARCHAR(50) NOT NULL DEFAULT 'Available'
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tbl_resource_maintenance (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        resource_id INT NOT NULL,
+        maintenance_start DATETIME NOT NULL,
+        maintenance_end DATETIME NOT NULL,
+        description TEXT,
+        FOREIGN KEY (resource_id) REFERENCES tbl_resources(id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tbl_event_resources (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        event_id INT NOT NULL,
+        resource_id INT NOT NULL,
+        quantity_booked INT NOT NULL,
+        booking_start DATETIME NOT NULL,
+        booking_end DATETIME NOT NULL,
+        FOREIGN KEY (event_id) REFERENCES tbl_events(id),
+        FOREIGN KEY (resource_id) REFERENCES tbl_resources(id)
+    ) ENGINE=InnoDB
+    """,
+]
+
+# Databases from before the unique feedback index can hold a student's feedback
+# twice; keep the first submission (as kiosk sync does) so the index can be built.
+DEDUPE_FEEDBACK_SQL = """
+    DELETE FROM tbl_event_feedback
+    WHERE id NOT IN (SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM tbl_event_feedback
+                                          GROUP BY event_id, user_id) AS keep)
+"""
+
+# Indexes for the hot queries. tbl_event_participants is already keyed by
+# (event_id, user_id); the extra (user_id, event_id) index serves my_registrations.
+HOT_PATH_INDEXES = [
+    "CREATE INDEX idx_events_date ON tbl_events (date, start_time)",
+    "CREATE INDEX idx_events_location_date ON tbl_events (location_id, date)",
+    "CREATE INDEX idx_tickets_event_quantity ON tbl_tickets (event_id, quantity)",
+    "CREATE INDEX idx_orders_ticket_status ON tbl_orders (ticket_id, payment_status)",
+    "CREATE INDEX idx_orders_user_ticket ON tbl_orders (user_id, ticket_id)",
+    "CREATE INDEX idx_orders_status_time ON tbl_orders (payment_status, order_time)",
+    "CREATE INDEX idx_participants_user_event ON tbl_event_participants (user_id, event_id)",
+    DEDUPE_FEEDBACK_SQL,
+    "CREATE UNIQUE INDEX uq_feedback_event_user ON tbl_event_feedback (event_id, user_id)",
+    "CREATE INDEX idx_maintenance_resource_window ON tbl_resource_maintenance (resource_id, maintenance_start, maintenance_end)",
+    "CREATE INDEX idx_event_resources_resource_window ON tbl_event_resources (resource_id, booking_start, booking_end)",
+]
+
+# Stock split over rows so buyers of one ticket lock different rows (ticket_inventory),
+# and short-lived reservations taken before payment (ticket_holds).
+TICKET_STOCK_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS tbl_ticket_slots (
+        ticket_id INT NOT NULL,
+        slot_no INT NOT NULL,
+        quantity INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (ticket_id, slot_no),
+        FOREIGN KEY (ticket_id) REFERENCES tbl_tickets(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tbl_ticket_holds (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        ticket_id INT NOT NULL,
+        event_id INT NOT NULL,
+        user_id INT NOT NULL,
+        quantity INT NOT NULL,
+        created_at DATETIME NOT NULL,
+        expires_at DATETIME NOT NULL,
+        status VARCHAR(16) NOT NULL DEFAULT 'Held',
+        INDEX idx_holds_status_expiry (status, expires_at),
+        FOREIGN KEY (ticket_id) REFERENCES tbl_tickets(id) ON DELETE CASCADE
+    )
+    """,
+]
+
+# Per-student registration view (student_registrations), filled from the existing registrations.
+REGISTRATIONS_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS tbl_student_registrations (
+        user_id INT NOT NULL,
+        event_end DATETIME NOT NULL,
+        event_id INT NOT NULL,
+        event_name VARCHAR(200) NOT NULL,
+        event_date DATE NOT NULL,
+        start_time TIME NOT NULL,
+        venue_name VARCHAR(100),
+        PRIMARY KEY (user_id, event_end, event_id),
+        KEY idx_student_registrations_event (event_id)
+    ) ENGINE=InnoDB
+    """,
+    """
+    INSERT IGNORE INTO tbl_student_registrations
+        (user_id, event_end, event_id, event_name, event_date, start_time, venue_name)
+    SELECT p.user_id, CONCAT(e.date, ' ', e.end_time), e.id, e.name, e.date, e.start_time, v.name
+    FROM tbl_event_participants p
+    JOIN tbl_events e ON p.event_id = e.id
+    LEFT JOIN tbl_venues v ON e.location_id = v.id
+    """,
+]
+
+# Archive tables with the hot tables' columns (archival)
+ARCHIVE_DDL = [
+    f"CREATE TABLE IF NOT EXISTS {table}_archive LIKE {table}"
+    for table in ("tbl_events", "tbl_tickets", "tbl_orders", "tbl_event_participants", "tbl_event_feedback",
+                  "tbl_event_resources")
+]
+
+# Notification outbox and its per-recipient delivery log (outbox)
+OUTBOX_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS tbl_outbox (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        kind VARCHAR(40) NOT NULL,
+        event_id INT NOT NULL,
+        payload TEXT NOT NULL,
+        created_at DATETIME NOT NULL,
+        status VARCHAR(16) NOT NULL DEFAULT 'Pending',
+        attempts INT NOT NULL DEFAULT 0,
+        next_attempt_at DATETIME NOT NULL,
+        claimed_by VARCHAR(64),
+        claimed_until DATETIME,
+        sent_at DATETIME,
+        last_error VARCHAR(255),
+        INDEX idx_outbox_status_due (status, next_attempt_at)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tbl_outbox_deliveries (
+        outbox_id BIGINT NOT NULL,
+        user_id INT NOT NULL,
+        delivered_at DATETIME NOT NULL,
+        PRIMARY KEY (outbox_id, user_id),
+        FOREIGN KEY (outbox_id) REFERENCES tbl_outbox(id) ON DELETE CASCADE
+    ) ENGINE=InnoDB
+    """,
+]
+
+# Time-window range reads of the resource calendar (resource_calendar)
+CALENDAR_INDEXES = [
+    "CREATE INDEX idx_event_resources_window ON tbl_event_resources "
+    "(booking_end, booking_start, resource_id, quantity_booked)",
+    "CREATE INDEX idx_maintenance_window ON tbl_resource_maintenance "
+    "(maintenance_end, maintenance_start, resource_id)",
+]
+
+# Per-window status for scheduled maintenance (maintenance_planner)
+MAINTENANCE_STATUS_DDL = [
+    "ALTER TABLE tbl_resource_maintenance ADD COLUMN status VARCHAR(16) NOT NULL DEFAULT 'Scheduled'",
+    "CREATE INDEX idx_maintenance_status_start ON tbl_resource_maintenance (status, maintenance_start)",
+]
+
+MIGRATIONS = [
+    (1, "base schema", BASE_SCHEMA),
+    (2, "sharded ticket slots and ticket holds", TICKET_STOCK_DDL),
+    (3, "hot-path indexes", HOT_PATH_INDEXES),
+    (4, "per-student registration view", REGISTRATIONS_DDL),
+    (5, "keyset index for the event picker", ["CREATE INDEX idx_events_date_id ON tbl_events (date, id)"]),
+    (6, "archive tables for completed events", ARCHIVE_DDL),
+    (7, "notification outbox", OUTBOX_DDL),
+    (8, "time-window indexes for the resource calendar", CALENDAR_INDEXES),
+    (9, "per-window maintenance status", MAINTENANCE_STATUS_DDL),
+]
+
+MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS tbl_schema_migrations (
+        version INT PRIMARY KEY,
+        description VARCHAR(200) NOT NULL,
+        applied_at DATETIME NOT NULL
+    )
+"""
+
+_IGNORABLE_ERRNOS = {1050, 1060, 1061}   # table exists, duplicate column name, duplicate key name
+
+
+def applied_versions(cursor):
+    cursor.execute(MIGRATIONS_DDL)
+    cursor.execute("SELECT version FROM tbl_schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def pending_migrations(cursor):
+    """(version, description) of every migration not applied yet. Read-only."""
+    try:
+        cursor.execute("SELECT version FROM tbl_schema_migrations")
+        done = {row[0] for row in cursor.fetchall()}
+    except mysql.connector.Error as err:
+        if err.errno != 1146:   # no such table: nothing has been applied
+            raise
+        done = set()
+    return [(version, description) for version, description, _ in MIGRATIONS if version not in done]
+
+
+def migrate(cursor, conn, verbose=False):
+    """Applies every pending migration in order. Returns the versions applied."""
+    done = applied_versions(cursor)
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version in done:
+            continue
+        for statement in statements:
+            try:
+                cursor.execute(statement)
+            except mysql.connector.Error as err:
+                if err.errno not in _IGNORABLE_ERRNOS and "already exists" not in str(err):
+                    conn.rollback()
+                    raise
+            if statement is DEDUPE_FEEDBACK_SQL and cursor.rowcount > 0:
+                print(f"⚠️ Migration {version}: removed {cursor.rowcount} duplicate feedback row(s), "
+                      "keeping each student's first submission.")
+        cursor.execute("INSERT INTO tbl_schema_migrations (version, description, applied_at) VALUES (%s, %s, %s)",
+                       (version, description, datetime.datetime.now()))
+        conn.commit()
+        applied.append(version)
+        if verbose:
+            print(f"✅ Applied migration {version}: {description}")
+    return applied
+
+
+# --- EXPLAIN-based regression check ---
+
+TEMPLATE_MODULES = ["mysqlconnector.py", "ticket_inventory.py", "ticket_holds.py", "reconciliation.py", "kiosk.py",
+                    "student_registrations.py", "event_search.py",
+                    "event_picker.py", "archival.py", "group_registration.py", "outbox.py",
+                    "resource_calendar.py", "maintenance_planner.py", "consistency_check.py", "event_reports.py",
+                    "availability_feed.py"]
+_STATEMENT = re.compile(r"^\s*(SELECT|UPDATE|DELETE|INSERT\b.*?\bSELECT)\b", re.I | re.S)
+
+
+def _template_text(node, constants=None):
+    """
+    Returns SQL text for a string constant, an f-string whose only holes are
+    `placeholders`, or a `+` concatenation of those and names in `constants`.
+    """
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Name) and constants is not None:
+        return constants.get(node.id)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left, right = _template_text(node.left, constants), _template_text(node.right, constants)
+        return left + right if left is not None and right is not None else None
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(value.value)
+            elif isinstance(value, ast.FormattedValue) and isinstance(value.value, ast.Name) and value.value.id == "placeholders":
+                parts.append("%s")
+            else:
+                return None
+        return "".join(parts)
+    return None
+
+
+def collect_templates(base_dir=None):
+    """Yields (module, line, sql) for every SQL template in the portal modules."""
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+    for module in TEMPLATE_MODULES:
+        path = os.path.join(base_dir, module)
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        constants = {}
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                text = _template_text(node.value, constants)
+                if text is not None:
+                    constants[node.targets[0].id] = text
+        fragments = {id(part) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr) for part in node.values}
+        fragments.update(id(side) for node in ast.walk(tree) if isinstance(node, ast.BinOp)
+                         for side in (node.left, node.right))
+        for node in ast.walk(tree):
+            if id(node) in fragments or isinstance(node, ast.Name):
+                continue
+            text = _template_text(node, constants)
+            if text and _STATEMENT.match(text) and "tbl_" in text:
+                yield module, node.lineno, " ".join(text.split())
+
+
+def _explain_params(sql):
+    """Dummy parameters: ints after LIMIT, otherwise strings (which MySQL coerces without losing index use)."""
+    params = []
+    for match in re.finditer(r"%s", sql):
+        params.append(1 if sql[:match.start()].rstrip().upper().endswith("LIMIT") else "1")
+    return tuple(params)
+
+
+def explain(cursor, sql):
+    cursor.execute("EXPLAIN " + sql, _explain_params(sql))
+    columns = [d[0] for d in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def check_query_plans(cursor):
+    """
+    Returns (checked, failures, errors). A failure is (module, line, table, sql);
+    an error is (module, line, message) for a template EXPLAIN rejected.
+    """
+    checked, failures, errors = 0, [], []
+    for module, line, sql in collect_templates():
+        try:
+            plan = explain(cursor, sql)
+        except mysql.connector.Error as err:
+            errors.append((module, line, str(err)))
+            continue
+        checked += 1
+        unfiltered = " WHERE " not in f" {sql.upper()} "
+        for position, row in enumerate(plan):
+            if row.get("type") != "ALL":
+                continue
+            if unfiltered and position == 0:
+                continue  # a full listing has to read its driving table
+            failures.append((module, line, row.get("table"), sql))
+    return checked, failures, errors
+
+
+def seed(cursor, conn, rows):
+    """Fills an empty scratch database with `rows`-ish rows per table so EXPLAIN reflects real plans."""
+    import student_registrations  # only the check command needs the application modules
+    import ticket_inventory
+    print(f"Seeding ~{rows} rows per table...")
+    today = datetime.date.today()
+    cursor.execute("INSERT INTO tbl_hosts (name, email, role) VALUES ('Seed Host', %s, 'Seed')", (f"seed{random.random()}@x",))
+    host_id = cursor.lastrowid
+    cursor.executemany("INSERT INTO tbl_venues (name, building, capacity, is_available) VALUES (%s, 'B', 500, 1)",
+                       [(f"Venue {i}",) for i in range(100)])
+    cursor.execute("SELECT id FROM tbl_venues")
+    venues = [r[0] for r in cursor.fetchall()]
+    cursor.executemany("INSERT INTO tbl_students (srn, name, semester, section) VALUES (%s, %s, 5, 'A')",
+                       [(f"SEED{i:08d}-{random.randint(0, 1 << 30)}", f"Student {i}") for i in range(rows)])
+    cursor.execute("SELECT id FROM tbl_students")
+    students = [r[0] for r in cursor.fetchall()]
+    cursor.executemany("""
+        INSERT INTO tbl_events (name, description, date, start_time, end_time, location_id, organizer_id, status, max_participants)
+        VALUES (%s, 'seed', %s, '09:00:00', '17:00:00', %s, %s, 'Scheduled', 500)
+    """, [(f"Event {i}", today + datetime.timedelta(days=random.randint(-1500, 60)), random.choice(venues), host_id)
+          for i in range(rows // 10)])
+    cursor.execute("SELECT id FROM tbl_events")
+    events = [r[0] for r in cursor.fetchall()]
+    cursor.executemany("INSERT INTO tbl_tickets (event_id, ticket_type, price, quantity) VALUES (%s, 'GA', 100, 500)",
+                       [(e,) for e in events])
+    cursor.execute("SELECT id FROM tbl_tickets")
+    tickets = [r[0] for r in cursor.fetchall()]
+    now = datetime.datetime.now()
+    cursor.executemany("INSERT INTO tbl_orders (ticket_id, user_id, order_time, payment_status) VALUES (%s, %s, %s, 'Completed')",
+                       [(random.choice(tickets), random.choice(students), now) for _ in range(rows)])
+    pairs = {(random.choice(events), random.choice(students)) for _ in range(rows)}
+    cursor.executemany("INSERT INTO tbl_event_participants (event_id, user_id, registration_time, attendance_status) VALUES (%s, %s, %s, 1)",
+                       [(e, s, now) for e, s in pairs])
+    cursor.execute(student_registrations.BACKFILL_SQL)
+    cursor.executemany("INSERT INTO tbl_event_feedback (event_id, user_id, rating, comments, submitted_at) VALUES (%s, %s, 4, 'seed', %s)",
+                       [(e, s, now) for e, s in list(pairs)[:rows // 2]])
+    cursor.executemany("INSERT INTO tbl_resources (name, type, quantity, description) VALUES (%s, 'AV', 10, 'seed')",
+                       [(f"Resource {i}",) for i in range(rows // 20)])
+    cursor.execute("SELECT id FROM tbl_resources")
+    resources = [r[0] for r in cursor.fetchall()]
+    windows = []
+    for _ in range(rows // 2):
+        start = now + datetime.timedelta(hours=random.randint(-20000, 2000))
+        windows.append((random.choice(resources), start, start + datetime.timedelta(hours=4)))
+    cursor.executemany("INSERT INTO tbl_resource_maintenance (resource_id, maintenance_start, maintenance_end, description) VALUES (%s, %s, %s, 'seed')", windows)
+    cursor.executemany("INSERT INTO tbl_event_resources (event_id, resource_id, quantity_booked, booking_start, booking_end) VALUES (%s, %s, 1, %s, %s)",
+                       [(random.choice(events), r, s, e) for r, s, e in windows])
+    ticket_inventory.backfill_slots(cursor, conn)
+    conn.commit()
+    cursor.execute("ANALYZE TABLE tbl_events, tbl_tickets, tbl_orders, tbl_event_participants, tbl_event_feedback, "
+                   "tbl_resource_maintenance, tbl_event_resources, tbl_ticket_slots, tbl_ticket_holds")
+    cursor.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["migrate", "status", "check"])
+    parser.add_argument("--database", help="override the database name (use a scratch database for 'check --seed')")
+    parser.add_argument("--seed", type=int, default=0, help="seed this many rows per table before checking")
+    args = parser.parse_args()
+
+    profile = db_profiles.load_profile("batch")
+    if args.database:
+        profile = profile.with_database(args.database)
+    conn = db_profiles.connect(profile)
+    cursor = conn.cursor()
+    try:
+        if args.command == "migrate":
+            applied = migrate(cursor, conn, verbose=True)
+            print("Schema is up to date." if not applied else f"Applied {len(applied)} migration(s).")
+        elif args.command == "status":
+            done = applied_versions(cursor)
+            for version, description, _ in MIGRATIONS:
+                print(f"{version:<4} | {'applied' if version in done else 'PENDING':<8} | {description}")
+        else:
+            migrate(cursor, conn)
+            if args.seed:
+                seed(cursor, conn, args.seed)
+            checked, failures, errors = check_query_plans(cursor)
+            for module, line, error in errors:
+                print(f"EXPLAIN FAILED {module}:{line} ({error})")
+            for module, line, table, sql in failures:
+                print(f"FULL SCAN {module}:{line} on {table}: {sql[:140]}")
+            print(f"\nChecked {checked} query templates: {len(failures)} full scan(s), {len(errors)} EXPLAIN error(s).")
+            if failures or errors:
+                sys.exit(1)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,39 @@
 import mysql.connector
 from mysql.connector import errorcode
 import datetime
+import time
+import audit_log
+import availability_feed
+import ticket_inventory
+import ticket_holds
+import shared_cache
+import kiosk
+import migrations
+import db_router
+import admission
+import student_registrations
+import event_search
+import event_picker
+import archival
+import group_registration
+import db_profiles
+import action_profiler
+import outbox
+import session_trace
+import resource_calendar
+import maintenance_planner
+import table_output
+
+# Table layouts shared by several listings
+UPCOMING_EVENT_COLUMNS = table_output.columns("ID", "Event Name", "Date", "Start",
+                                              ("Venue", lambda row: row[4] or "N/A"), "Host")
+COMPLETED_EVENT_COLUMNS = table_output.columns("ID", "Event Name", "Date", "End Time",
+                                               ("Venue", lambda row: row[4] or "N/A"), "Host")
+TICKET_COLUMNS = table_output.columns("ID", "Type", ("Price", lambda t: f"${t[2]}"), "Available")
 
 # --- Helper Functions (No changes in these) ---
 
+@action_profiler.profiled
 def list_available_venues(cursor):
     """Fetches and prints all venues marked as available."""
     print("\n--- 🏟️ Available Venues ---")
@@ -15,16 +45,14 @@ def list_available_venues(cursor):
             print("No available venues found.")
             return None # Return None if no venues
             
-        print(f"{'ID':<5} | {'Name':<25} | {'Building':<15} | {'Capacity':<10}")
-        print("-" * 60)
-        for row in venues:
-            print(f"{row[0]:<5} | {row[1]:<25} | {row[2]:<15} | {row[3]:<10}")
+        table_output.render(table_output.columns("ID", "Name", "Building", "Capacity"), venues)
         return venues # Return the list of venues
             
     except mysql.connector.Error as err:
         print(f"Error listing venues: {err}")
         return None
 
+@action_profiler.profiled
 def list_all_venues(cursor):
     """Fetches and prints ALL venues with their availability status."""
     print("\n--- 🏟️ All Venues (with status) ---")
@@ -36,16 +64,15 @@ def list_all_venues(cursor):
             print("No venues found in the database.")
             return
             
-        print(f"{'ID':<5} | {'Name':<25} | {'Building':<15} | {'Capacity':<10} | {'Status':<15}")
-        print("-" * 75)
-        for row in venues:
-            status_text = "Available" if row[4] == 1 else "Not Available"
-            print(f"{row[0]:<5} | {row[1]:<25} | {row[2]:<15} | {row[3]:<10} | {status_text:<15}")
+        table_output.render(table_output.columns(
+            "ID", "Name", "Building", "Capacity",
+            ("Status", lambda row: "Available" if row[4] == 1 else "Not Available")), venues)
             
     except mysql.connector.Error as err:
         print(f"Error listing all venues: {err}")
 
 
+@action_profiler.profiled
 def list_scheduled_events(cursor):
     """
     Fetches and prints all events where the end time is in the future.
@@ -64,33 +91,38 @@ def list_scheduled_events(cursor):
         FROM tbl_events e
         LEFT JOIN tbl_venues v ON e.location_id = v.id
         JOIN tbl_hosts h ON e.organizer_id = h.id
-        WHERE CONCAT(e.date, ' ', e.end_time) > NOW()
+        WHERE e.date >= CURDATE()
+        AND CONCAT(e.date, ' ', e.end_time) > NOW()
         ORDER BY e.date, e.start_time
     """
     try:
-        cursor.execute(query)
-        events = cursor.fetchall()
+        events, version = shared_cache.get("events:upcoming")
+        if events is None:
+            cursor.execute(query)
+            events = cursor.fetchall()
+            # Only primary reads are cached: lagging replica rows would outlive the invalidation
+            if not db_router.is_replica(cursor):
+                shared_cache.put("events:upcoming", events, shared_cache.EVENT_LIST_TTL, version)
         
         if not events:
             print("No upcoming or ongoing events found.")
             return False 
             
-        print(f"{'ID':<5} | {'Event Name':<25} | {'Date':<12} | {'Start':<10} | {'Venue':<20} | {'Host':<20}")
-        print("-" * 95)
-        for row in events:
-            print(f"{row[0]:<5} | {row[1]:<25} | {str(row[2]):<12} | {str(row[3]):<10} | {row[4] or 'N/A':<20} | {row[5]:<20}")
+        table_output.render(UPCOMING_EVENT_COLUMNS, events)
         return True
         
     except mysql.connector.Error as err:
         print(f"Error listing events: {err}")
         return False
 
-def list_completed_events(cursor):
+@action_profiler.profiled
+def list_completed_events(cursor, include_archive=False):
     """
     Fetches and prints all events where the end time is in the past.
+    With include_archive, archived (older) events are listed too.
     Returns True if events exist, False otherwise.
     """
-    print("\n--- 🏁 Completed Events ---")
+    print("\n--- 🏁 Completed Events ---" + (" (including archive)" if include_archive else ""))
     
     query = """
         SELECT 
@@ -103,27 +135,75 @@ def list_completed_events(cursor):
         FROM tbl_events e
         LEFT JOIN tbl_venues v ON e.location_id = v.id
         JOIN tbl_hosts h ON e.organizer_id = h.id
-        WHERE CONCAT(e.date, ' ', e.end_time) <= NOW()
+        WHERE e.date <= CURDATE()
+        AND CONCAT(e.date, ' ', e.end_time) <= NOW()
         ORDER BY e.date DESC, e.end_time DESC
     """
+    if include_archive:
+        query = archival.COMPLETED_EVENTS_QUERY
+    cache_key = "events:completed:all" if include_archive else "events:completed"
     try:
-        cursor.execute(query)
-        events = cursor.fetchall()
+        events, version = shared_cache.get(cache_key)
+        if events is None:
+            cursor.execute(query)
+            events = cursor.fetchall()
+            if not db_router.is_replica(cursor):
+                shared_cache.put(cache_key, events, shared_cache.EVENT_LIST_TTL, version)
         
         if not events:
             print("No completed events found.")
             return False
             
-        print(f"{'ID':<5} | {'Event Name':<25} | {'Date':<12} | {'End Time':<10} | {'Venue':<20} | {'Host':<20}")
-        print("-" * 95)
-        for row in events:
-            print(f"{row[0]:<5} | {row[1]:<25} | {str(row[2]):<12} | {str(row[3]):<10} | {row[4] or 'N/A':<20} | {row[5]:<20}")
+        table_output.render(COMPLETED_EVENT_COLUMNS, events)
         return True
         
     except mysql.connector.Error as err:
         print(f"Error listing completed events: {err}")
         return False
 
+@action_profiler.profiled
+def search_events(cursor):
+    """
+    Searches event names/descriptions, with optional date, venue, host and
+    availability filters. Returns True if any events matched.
+    """
+    print("\n--- 🔎 Search Events ---")
+    try:
+        text = input("Search words: ").strip()
+        if not text:
+            print("Please enter at least one word to search for.")
+            return False
+        date_from = input("From date (YYYY-MM-DD, blank for any): ").strip()
+        date_to = input("To date (YYYY-MM-DD, blank for any): ").strip()
+        venue_id = input("Venue ID (blank for any): ").strip()
+        host_id = input("Host ID (blank for any): ").strip()
+        available_only = input("Only events with tickets left? (y/n): ").strip().lower() == 'y'
+
+        events = event_search.search(
+            cursor, text,
+            date_from=datetime.datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else None,
+            date_to=datetime.datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else None,
+            venue_id=int(venue_id) if venue_id else None,
+            host_id=int(host_id) if host_id else None,
+            available_only=available_only,
+        )
+        if not events:
+            print("No events matched your search.")
+            return False
+
+        table_output.render(UPCOMING_EVENT_COLUMNS, events)
+        if len(events) == event_search.MAX_RESULTS:
+            print(f"(Showing the newest {event_search.MAX_RESULTS} matches. Add words or filters to narrow it down.)")
+        return True
+
+    except ValueError:
+        print("Invalid input. Dates must be YYYY-MM-DD and IDs must be numbers.")
+        return False
+    except mysql.connector.Error as err:
+        print(f"Error searching events: {err}")
+        return False
+
+@action_profiler.profiled
 def list_all_students(cursor):
     """
     Fetches and prints all students from tbl_students.
@@ -138,16 +218,14 @@ def list_all_students(cursor):
             print("No students found in the database.")
             return False
             
-        print(f"{'ID':<5} | {'SRN':<17} | {'Name':<25} | {'Sem':<5} | {'Sec':<5}")
-        print("-" * 65)
-        for row in students:
-            print(f"{row[0]:<5} | {row[1]:<17} | {row[2]:<25} | {row[3]:<5} | {row[4]:<5}")
+        table_output.render(table_output.columns("ID", "SRN", "Name", "Sem", "Sec"), students)
         return True
             
     except mysql.connector.Error as err:
         print(f"Error listing students: {err}")
         return False
 
+@action_profiler.profiled
 def add_new_student(cursor, conn):
     """Inserts a new student into tbl_students."""
     print("\n--- 🧑‍🎓 Add New Student ---")
@@ -164,8 +242,11 @@ def add_new_student(cursor, conn):
         sql = "INSERT INTO tbl_students (srn, name, semester, section) VALUES (%s, %s, %s, %s)"
         val = (srn, name, semester, section)
         
+        started = time.perf_counter()
         cursor.execute(sql, val)
         conn.commit()
+        audit_log.record("add_new_student", {"srn": srn, "name": name, "semester": semester, "section": section},
+                         after={"student_id": cursor.lastrowid}, started=started)
         print(f"✅ Successfully added student: {name} ({srn})")
         
     except mysql.connector.Error as err:
@@ -177,10 +258,31 @@ def add_new_student(cursor, conn):
     except ValueError:
         print("Invalid input. Semester must be a number.")
 
-def order_ticket_and_register(cursor, conn):
+def fetch_available_tickets(cursor, event_id):
+    """(id, type, price, available) for the event's ticket types that are not sold out."""
+    # Remaining stock is the sum of the ticket's slots
+    query_tickets = """
+        SELECT t.id, t.ticket_type, t.price, SUM(s.quantity) AS available
+        FROM tbl_tickets t
+        JOIN tbl_ticket_slots s ON s.ticket_id = t.id
+        WHERE t.event_id = %s
+        GROUP BY t.id, t.ticket_type, t.price
+        HAVING SUM(s.quantity) > 0
+    """
+    tickets, version = shared_cache.get(f"tickets:{event_id}")
+    if tickets is None:
+        cursor.execute(query_tickets, (event_id,))
+        tickets = cursor.fetchall()
+        if not db_router.is_replica(cursor):
+            shared_cache.put(f"tickets:{event_id}", tickets, shared_cache.AVAILABILITY_TTL, version)
+    return tickets
+
+@action_profiler.profiled
+def order_ticket_and_register(cursor, conn, session_user_id):
     """
     Handles ordering one or more tickets, processing payment,
     updating ticket quantity, and registering the BUYER as a participant.
+    Rate limits apply to the logged-in student (`session_user_id`), whichever buyer ID is typed.
     """
     print("\n--- 🎟️ Order Ticket & Register for Event ---")
     
@@ -193,19 +295,14 @@ def order_ticket_and_register(cursor, conn):
         event_id = int(input("\nEnter the Event ID to register for: "))
 
         # 2. Find available tickets
-        query_tickets = "SELECT id, ticket_type, price, quantity FROM tbl_tickets WHERE event_id = %s AND quantity > 0"
-        cursor.execute(query_tickets, (event_id,))
-        tickets = cursor.fetchall()
+        tickets = fetch_available_tickets(cursor, event_id)
 
         if not tickets:
             print("Sorry, no tickets are available for this event or it's sold out.")
             return
 
         print("\n--- Available Tickets for this Event ---")
-        print(f"{'ID':<5} | {'Type':<25} | {'Price':<10} | {'Available':<10}")
-        print("-" * 55)
-        for t in tickets:
-            print(f"{t[0]:<5} | {t[1]:<25} | ${t[2]:<9} | {t[3]:<10}")
+        table_output.render(TICKET_COLUMNS, tickets)
         
         ticket_id = int(input("\nEnter the Ticket ID you want to order: "))
 
@@ -241,8 +338,31 @@ def order_ticket_and_register(cursor, conn):
             return
         
         user_id = int(input("\nEnter the Student ID of the *buyer*: "))
+
+        # 6. Hold the tickets in a short transaction so no lock is kept while we wait for payment
+        audit_params = {"event_id": event_id, "ticket_id": ticket_id, "how_many": how_many, "buyer_id": user_id,
+                        "session_user_id": session_user_id}
+        try:
+            admission.check_rate(session_user_id)
+            entered_at = admission.enter_booking(admission.print_queue_position)
+        except admission.Rejected as err:
+            print(f"\n❌ {err}")
+            return
+        try:
+            hold = ticket_holds.place_hold(cursor, conn, ticket_id, event_id, user_id, how_many)
+        except mysql.connector.Error as err:
+            conn.rollback()
+            print(f"\n❌ {admission.BUSY_MESSAGE}" if admission.is_lock_timeout(err) else f"\n❌ Could not reserve tickets: {err}")
+            return
+        finally:
+            admission.leave_booking(entered_at)
+        if hold is None:
+            print(f"\n❌ Sorry, fewer than {how_many} tickets of this type are left now. Nothing was booked.")
+            return
+        hold_id, hold_expires = hold
+        print(f"Reserving {how_many} tickets... (held until {hold_expires:%H:%M:%S})")
         
-        # 6. Handle Payment
+        # 7. Handle Payment
         total_price = ticket_price * how_many
         print("\n--- Payment ---")
         print(f"Ticket: {selected_ticket[1]} (x{how_many})")
@@ -259,14 +379,25 @@ def order_ticket_and_register(cursor, conn):
             print("This is a free ticket. Registration will be completed automatically.")
             payment_status = 'Completed'
 
-        # 7. Database Transaction
+        # 8. Database Transaction (admitted through the booking queue like the hold was)
+        try:
+            entered_at = admission.enter_booking(admission.print_queue_position)
+        except admission.Rejected as err:
+            try:
+                ticket_holds.release_hold(cursor, conn, hold_id)
+            except mysql.connector.Error:
+                pass  # the hold sweeper returns the tickets once the hold expires
+            print(f"\n❌ {err} Your tickets were released.")
+            return
+        started = time.perf_counter()
         try:
-            # 7a: Update (decrement) the quantity in tbl_tickets
-            sql_update_tickets = "UPDATE tbl_tickets SET quantity = quantity - %s WHERE id = %s"
-            cursor.execute(sql_update_tickets, (how_many, ticket_id))
-            print(f"Reserving {how_many} tickets...")
+            # 8a: Convert the hold into orders (fails if it expired while we waited)
+            if not ticket_holds.claim_hold(cursor, hold_id):
+                conn.rollback()
+                print("\n❌ Your ticket hold expired and the tickets were released. Please start again.")
+                return
 
-            # 7b: Insert one row per ticket into tbl_orders
+            # 8b: Insert one row per ticket into tbl_orders
             sql_order = "INSERT INTO tbl_orders (ticket_id, user_id, order_time, payment_status) VALUES (%s, %s, %s, %s)"
             order_time = datetime.datetime.now()
             for _ in range(how_many):
@@ -274,69 +405,243 @@ def order_ticket_and_register(cursor, conn):
                 cursor.execute(sql_order, val_order)
             print(f"Created {how_many} order records with status: {payment_status}.")
 
-            # 7c: If paid, register the BUYER in tbl_event_participants
+            # 8c: If paid, register the BUYER in tbl_event_participants
             if payment_status == 'Completed':
                 sql_register = "INSERT INTO tbl_event_participants (event_id, user_id, registration_time) VALUES (%s, %s, %s)"
                 val_register = (event_id, user_id, order_time)
                 cursor.execute(sql_register, val_register)
+                student_registrations.add(cursor, [(event_id, user_id)])
                 print(f"✅ Successfully registered Student {user_id} (the buyer) for event {event_id}.")
             else:
                 print(f"⚠️ Registration is pending. Please complete payment to attend.")
             
             conn.commit()
+            audit_log.record("order_ticket_and_register", audit_params,
+                             before={"ticket_quantity": available_quantity},
+                             after={"ticket_quantity": available_quantity - how_many, "payment_status": payment_status},
+                             started=started)
+            db_router.note_write(user_id)
             print(f"\nTransaction complete. {how_many} tickets successfully booked by Student {user_id}.")
 
         except mysql.connector.Error as err:
             conn.rollback()
+            audit_log.record("order_ticket_and_register", audit_params, started=started,
+                             outcome="rolled_back", after={"error": str(err)})
+            try:
+                ticket_holds.release_hold(cursor, conn, hold_id)
+            except mysql.connector.Error:
+                pass  # the hold sweeper returns the tickets once the hold expires
             print("\n❌ TRANSACTION FAILED. All changes have been rolled back.")
             if err.errno == 1062: 
                 print("Error: This student is ALREADY registered for this event.")
             elif err.errno == 1452: 
                  print("Error: Invalid Student ID or Ticket ID. Please check and try again.")
+            elif admission.is_lock_timeout(err):
+                print(admission.BUSY_MESSAGE)
             else:
                 print(f"An unexpected error occurred: {err}")
+        finally:
+            admission.leave_booking(entered_at)
         
     except ValueError:
         print("Invalid input. IDs and quantity must be numbers.")
 
+@action_profiler.profiled
+def register_group(cursor, conn, buyer_id):
+    """
+    (Student) Buys one ticket per attendee and registers each attendee,
+    reporting attendees that could not be registered instead of failing the group.
+    """
+    print("\n--- 👥 Group Registration ---")
 
+    try:
+        # 1. Pick the event and ticket type
+        if not list_scheduled_events(cursor):
+            print("Cannot register for events as none are available.")
+            return
+
+        event_id = int(input("\nEnter the Event ID to register the group for: "))
+        tickets = fetch_available_tickets(cursor, event_id)
+        if not tickets:
+            print("Sorry, no tickets are available for this event or it's sold out.")
+            return
+
+        print("\n--- Available Tickets for this Event ---")
+        table_output.render(TICKET_COLUMNS, tickets)
+
+        ticket_id = int(input("\nEnter the Ticket ID for the group: "))
+        selected_ticket = next((t for t in tickets if t[0] == ticket_id), None)
+        if selected_ticket is None:
+            print("Error: Invalid Ticket ID for this event.")
+            return
+
+        # 2. Read the attendee list
+        answer = input("Enter attendee SRNs (comma or space separated), or @file with one SRN per line: ").strip()
+        if answer.startswith("@"):
+            try:
+                with open(answer[1:], encoding="utf-8") as f:
+                    answer = f.read()
+            except OSError as err:
+                print(f"Error reading attendee file: {err}")
+                return
+        srns = group_registration.parse_srns(answer)
+        if not srns:
+            print("No SRNs entered.")
+            return
+
+        # 3. Validate every SRN and existing registration with set queries
+        problems = {}
+        students, unknown = group_registration.resolve_students(cursor, srns)
+        for srn in unknown:
+            problems[srn] = "unknown SRN"
+        registered_before = group_registration.already_registered(cursor, event_id, list(students.values()))
+        for srn, attendee_id in students.items():
+            if attendee_id in registered_before:
+                problems[srn] = "already registered"
+        attendees = [(srn, students[srn]) for srn in srns if srn in students and srn not in problems]
+
+        if not attendees:
+            print("\n❌ Nobody in the list can be registered:")
+            for srn, reason in problems.items():
+                print(f"  {srn:<20} {reason}")
+            return
+        if len(attendees) > selected_ticket[3]:
+            print(f"Error: {len(attendees)} attendees but only {selected_ticket[3]} tickets of this type are available.")
+            return
+
+        # 4. Hold one ticket per attendee
+        how_many = len(attendees)
+        audit_params = {"event_id": event_id, "ticket_id": ticket_id, "how_many": how_many, "buyer_id": buyer_id}
+        try:
+            admission.check_rate(buyer_id)
+            entered_at = admission.enter_booking(admission.print_queue_position)
+        except admission.Rejected as err:
+            print(f"\n❌ {err}")
+            return
+        try:
+            hold = ticket_holds.place_hold(cursor, conn, ticket_id, event_id, buyer_id, how_many)
+        except mysql.connector.Error as err:
+            conn.rollback()
+            print(f"\n❌ {admission.BUSY_MESSAGE}" if admission.is_lock_timeout(err) else f"\n❌ Could not reserve tickets: {err}")
+            return
+        finally:
+            admission.leave_booking(entered_at)
+        if hold is None:
+            print(f"\n❌ Sorry, fewer than {how_many} tickets of this type are left now. Nothing was booked.")
+            return
+        hold_id, hold_expires = hold
+        print(f"Reserving {how_many} tickets... (held until {hold_expires:%H:%M:%S})")
+
+        # 5. Payment for the whole group
+        total_price = selected_ticket[2] * how_many
+        print("\n--- Payment ---")
+        print(f"Ticket: {selected_ticket[1]} (x{how_many})")
+        print(f"Total Price: ${total_price:.2f}")
+        if total_price > 0:
+            payment_status = 'Completed' if input("Is payment completed? (y/n): ").strip().lower() == 'y' else 'Pending'
+        else:
+            print("These are free tickets. Registration will be completed automatically.")
+            payment_status = 'Completed'
+
+        # 6. One transaction: orders + registrations, skipping attendees that conflict
+        try:
+            entered_at = admission.enter_booking(admission.print_queue_position)
+        except admission.Rejected as err:
+            try:
+                ticket_holds.release_hold(cursor, conn, hold_id)
+            except mysql.connector.Error:
+                pass  # the hold sweeper returns the tickets once the hold expires
+            print(f"\n❌ {err} Your tickets were released.")
+            return
+        started = time.perf_counter()
+        try:
+            if not ticket_holds.claim_hold(cursor, hold_id):
+                conn.rollback()
+                print("\n❌ Your ticket hold expired and the tickets were released. Please start again.")
+                return
+
+            order_time = datetime.datetime.now()
+            attendee_ids = [attendee_id for _, attendee_id in attendees]
+            if payment_status == 'Completed':
+                booked, duplicates = group_registration.insert_registrations(cursor, event_id, attendee_ids, order_time)
+            else:
+                booked, duplicates = attendee_ids, []
+            if duplicates:
+                ticket_inventory.release(cursor, ticket_id, len(duplicates))
+                for srn, attendee_id in attendees:
+                    if attendee_id in duplicates:
+                        problems[srn] = "already registered"
+            if booked:
+                group_registration.insert_orders(cursor, ticket_id, booked, order_time, payment_status)
+                if payment_status == 'Completed':
+                    student_registrations.add(cursor, [(event_id, attendee_id) for attendee_id in booked])
+            conn.commit()
+            if duplicates:
+                availability_feed.announce(cursor, conn, [ticket_id])
+            audit_log.record("register_group", audit_params,
+                             after={"booked": booked, "skipped": problems, "payment_status": payment_status},
+                             started=started)
+            for attendee_id in booked:
+                db_router.note_write(attendee_id)
+
+        except mysql.connector.Error as err:
+            conn.rollback()
+            audit_log.record("register_group", audit_params, started=started,
+                             outcome="rolled_back", after={"error": str(err)})
+            try:
+                ticket_holds.release_hold(cursor, conn, hold_id)
+            except mysql.connector.Error:
+                pass  # the hold sweeper returns the tickets once the hold expires
+            print("\n❌ TRANSACTION FAILED. All changes have been rolled back.")
+            print(admission.BUSY_MESSAGE if admission.is_lock_timeout(err) else f"An unexpected error occurred: {err}")
+            return
+        finally:
+            admission.leave_booking(entered_at)
+
+        # 7. Per-attendee report
+        status_text = "registered" if payment_status == 'Completed' else "ticket booked, payment pending"
+        print(f"\n--- Group Registration Result ({len(booked)} of {len(srns)} booked) ---")
+        for srn in srns:
+            print(f"  {srn:<20} {'✅ ' + status_text if srn not in problems else '❌ ' + problems[srn]}")
+
+    except ValueError:
+        print("Invalid input. IDs must be numbers.")
+
+
+@action_profiler.profiled
 def view_event_feedback(cursor):
     """Generates a report of feedback for a specific event."""
     print("\n--- 📊 View Event Feedback ---")
     
-    cursor.execute("SELECT id, name FROM tbl_events ORDER BY date DESC")
-    print("--- All Events (for feedback lookup) ---")
-    for row in cursor.fetchall():
-        print(f"ID: {row[0]}, Name: {row[1]}")
-    
     try:
-        event_id = int(input("\nEnter Event ID to see feedback for: "))
+        event_id = event_picker.pick_event(cursor, "Enter Event ID to see feedback for", allow_archived=True)
+        if event_id is None:
+            return
         
+        # Archived events keep their feedback in the archive table
         query = """
             SELECT s.name, s.srn, f.rating, f.comments
             FROM tbl_event_feedback f
             JOIN tbl_students s ON f.user_id = s.id
             WHERE f.event_id = %s
+            UNION ALL
+            SELECT s.name, s.srn, f.rating, f.comments
+            FROM tbl_event_feedback_archive f
+            JOIN tbl_students s ON f.user_id = s.id
+            WHERE f.event_id = %s
         """
-        cursor.execute(query, (event_id,))
-        feedback = cursor.fetchall()
-        
-        if not feedback:
-            print("No feedback found for this event.")
-            return
-            
+        cursor.execute(query, (event_id, event_id))
         print(f"\n--- Feedback Report for Event ID {event_id} ---")
-        for row in feedback:
-            print(f"Student: {row[0]} ({row[1]})")
-            print(f"Rating:  {'⭐' * row[2]} ({row[2]}/5)")
-            print(f"Comment: {row[3]}")
-            print("-" * 20)
+        table_output.render(table_output.columns(
+            "Student", "SRN", ("Comment", 3, 60), ("Rating", lambda row: f"{row[2]}/5 {'⭐' * row[2]}")),
+            table_output.stream(cursor), empty_message="No feedback found for this event.")
             
     except mysql.connector.Error as err:
         print(f"Error fetching feedback: {err}")
     except ValueError:
         print("Invalid input. Event ID must be a number.")
 
+@action_profiler.profiled
 def write_event_feedback(cursor, conn):
     """
     Allows a student to write feedback for a completed event
@@ -403,8 +708,11 @@ def write_event_feedback(cursor, conn):
         """
         val_insert = (event_id, user_id, rating, comments, datetime.datetime.now())
         
+        started = time.perf_counter()
         cursor.execute(sql_insert, val_insert)
         conn.commit()
+        audit_log.record("write_event_feedback", {"event_id": event_id, "user_id": user_id},
+                         after={"rating": rating, "comments": comments}, started=started)
         
         print("✅ Thank you! Your feedback has been submitted successfully.")
 
@@ -417,6 +725,7 @@ def write_event_feedback(cursor, conn):
 
 # --- Host & Admin Functions ---
 
+@action_profiler.profiled
 def add_new_event(cursor, conn):
     """(Host) Adds a new event with venue capacity and time conflict checks."""
     print("\n--- 🗓️ Add New Event (Host Only) ---")
@@ -488,10 +797,18 @@ def add_new_event(cursor, conn):
             (name, description, date, start_time, end_time, location_id, organizer_id, status, max_participants)
             VALUES (%s, %s, %s, %s, %s, %s, %s, 'Scheduled', %s)
         """
-        val_insert = (name, description, req_date_str, req_start_str, req_end_str, location_id, organizer_id, max_participants)
+        val_insert = (name, description, req_start_dt.date(), req_start_dt.time(), req_end_dt.time(), location_id, organizer_id, max_participants)
         
+        started = time.perf_counter()
         cursor.execute(sql_insert, val_insert)
+        new_event_id = cursor.lastrowid
         conn.commit()
+        shared_cache.invalidate()
+        audit_log.record("add_new_event", {"name": name, "date": req_date_str, "start_time": req_start_str,
+                                           "end_time": req_end_str, "location_id": location_id,
+                                           "organizer_id": organizer_id, "max_participants": max_participants},
+                         after={"event_id": new_event_id}, started=started)
+        event_search.reindex(cursor, new_event_id)
         print("✅ Success! New event has been scheduled.")
         
     except mysql.connector.Error as err:
@@ -501,6 +818,7 @@ def add_new_event(cursor, conn):
         print("Invalid input. Please enter a valid number or date/time format.")
 
 # *** NEW FEATURE: Update Event ***
+@action_profiler.profiled
 def update_event_details(cursor, conn):
     """(Host) Allows updating details, time, or location for an event."""
     print("\n--- ✏️ Update Event Details (Host Only) ---")
@@ -528,8 +846,15 @@ def update_event_details(cursor, conn):
             new_desc = input("Enter new description: ") or event[2]
             
             sql_update = "UPDATE tbl_events SET name = %s, description = %s WHERE id = %s"
+            started = time.perf_counter()
             cursor.execute(sql_update, (new_name, new_desc, event_id))
+            student_registrations.refresh_event(cursor, event_id)
             conn.commit()
+            shared_cache.invalidate()
+            audit_log.record("update_event_details", {"event_id": event_id, "field": "name/description"},
+                             before={"name": event[1], "description": event[2]},
+                             after={"name": new_name, "description": new_desc}, started=started)
+            event_search.reindex(cursor, event_id)
             print("✅ Event name/description updated.")
 
         elif choice == "2":
@@ -560,8 +885,22 @@ def update_event_details(cursor, conn):
                 return
             
             sql_update = "UPDATE tbl_events SET date = %s, start_time = %s, end_time = %s WHERE id = %s"
-            cursor.execute(sql_update, (req_date_str, req_start_str, req_end_str, event_id))
+            started = time.perf_counter()
+            cursor.execute(sql_update, (req_start_dt.date(), req_start_dt.time(), req_end_dt.time(), event_id))
+            student_registrations.refresh_event(cursor, event_id)
+            # Participants are told through the outbox, committed together with the change
+            outbox.enqueue(cursor, "event_rescheduled", event_id, {
+                "event_id": event_id, "event_name": event[1], "date": req_start_dt.date(),
+                "start_time": req_start_dt.time(), "end_time": req_end_dt.time(),
+                "old_date": event[3], "old_start_time": event[4], "old_end_time": event[5]})
             conn.commit()
+            outbox.wake()
+            shared_cache.invalidate()
+            audit_log.record("update_event_details", {"event_id": event_id, "field": "date/time"},
+                             before={"date": event[3], "start_time": event[4], "end_time": event[5]},
+                             after={"date": req_date_str, "start_time": req_start_str, "end_time": req_end_str},
+                             started=started)
+            event_search.reindex(cursor, event_id)
             print("✅ Event time updated.")
             
         elif choice == "3":
@@ -575,6 +914,7 @@ def update_event_details(cursor, conn):
             for v in venues:
                 if v[0] == new_location_id:
                     venue_capacity = v[3]
+                    new_venue_name = v[1]
                     break
             if venue_capacity is None:
                 print("Error: Invalid new venue ID.")
@@ -598,9 +938,22 @@ def update_event_details(cursor, conn):
                 print("❌ CONFLICT: The new venue is booked by another event at this time.")
                 return
                 
+            cursor.execute("SELECT name FROM tbl_venues WHERE id = %s", (event[6],))
+            old_venue = cursor.fetchone()
             sql_update = "UPDATE tbl_events SET location_id = %s WHERE id = %s"
+            started = time.perf_counter()
             cursor.execute(sql_update, (new_location_id, event_id))
+            student_registrations.refresh_event(cursor, event_id)
+            outbox.enqueue(cursor, "event_relocated", event_id, {
+                "event_id": event_id, "event_name": event[1], "venue": new_venue_name,
+                "old_venue": old_venue[0] if old_venue else "no venue"})
             conn.commit()
+            outbox.wake()
+            shared_cache.invalidate()
+            audit_log.record("update_event_details", {"event_id": event_id, "field": "location"},
+                             before={"location_id": event[6]}, after={"location_id": new_location_id},
+                             started=started)
+            event_search.reindex(cursor, event_id)
             print("✅ Event location updated.")
         
         else:
@@ -614,20 +967,27 @@ def update_event_details(cursor, conn):
 
 
 # *** NEW FEATURE: Manage Tickets ***
+@action_profiler.profiled
 def manage_event_tickets(cursor, conn):
     """(Host) Add new ticket types or update quantities for an event."""
     print("\n--- manage_event_tickets (Host Only) ---")
     try:
-        cursor.execute("SELECT id, name FROM tbl_events")
-        for row in cursor.fetchall(): print(f"ID: {row[0]}, Name: {row[1]}")
-        event_id = int(input("\nEnter the Event ID to manage tickets for: "))
+        event_id = event_picker.pick_event(cursor, "Enter the Event ID to manage tickets for")
+        if event_id is None:
+            return
         
         # Show existing tickets
         print("\n--- Existing Tickets for this Event ---")
-        query_tickets = "SELECT id, ticket_type, price, quantity FROM tbl_tickets WHERE event_id = %s"
+        query_tickets = """
+            SELECT t.id, t.ticket_type, t.price, t.quantity, COALESCE(SUM(s.quantity), 0)
+            FROM tbl_tickets t
+            LEFT JOIN tbl_ticket_slots s ON s.ticket_id = t.id
+            WHERE t.event_id = %s
+            GROUP BY t.id, t.ticket_type, t.price, t.quantity
+        """
         cursor.execute(query_tickets, (event_id,))
         tickets = cursor.fetchall()
-        for t in tickets: print(f"ID: {t[0]:<5} | {t[1]:<25} | ${t[2]:<9} | Qty: {t[3]:<10}")
+        for t in tickets: print(f"ID: {t[0]:<5} | {t[1]:<25} | ${t[2]:<9} | Issued: {t[3]:<6} | Remaining: {t[4]:<6}")
 
         print("\n1. Add a new ticket type")
         print("2. Update an existing ticket")
@@ -639,8 +999,16 @@ def manage_event_tickets(cursor, conn):
             quantity = int(input("Enter total quantity available: "))
             
             sql_insert = "INSERT INTO tbl_tickets (event_id, ticket_type, price, quantity) VALUES (%s, %s, %s, %s)"
+            started = time.perf_counter()
             cursor.execute(sql_insert, (event_id, ticket_type, price, quantity))
+            new_ticket_id = cursor.lastrowid
+            ticket_inventory.init_slots(cursor, new_ticket_id, quantity)
             conn.commit()
+            shared_cache.invalidate()
+            availability_feed.announce(cursor, conn, [new_ticket_id])
+            audit_log.record("manage_event_tickets", {"event_id": event_id, "action": "add"},
+                             after={"ticket_id": new_ticket_id, "ticket_type": ticket_type,
+                                    "price": price, "quantity": quantity}, started=started)
             print("✅ New ticket type added.")
         
         elif choice == "2":
@@ -654,20 +1022,40 @@ def manage_event_tickets(cursor, conn):
             if new_price >= 0:
                 updates.append("price = %s")
                 params.append(new_price)
-            if new_qty >= 0:
-                updates.append("quantity = %s")
-                params.append(new_qty)
             
-            if not updates:
+            old = next((t for t in tickets if t[0] == ticket_id), None)
+            if old is None:
+                print("Error: Invalid Ticket ID for this event.")
+                return
+            if not updates and new_qty < 0:
                 print("No changes specified.")
                 return
 
-            params.append(ticket_id)
-            params.append(event_id)
-            
-            sql_update = f"UPDATE tbl_tickets SET {', '.join(updates)} WHERE id = %s AND event_id = %s"
-            cursor.execute(sql_update, tuple(params))
+            started = time.perf_counter()
+            if updates:
+                params.append(ticket_id)
+                params.append(event_id)
+                sql_update = f"UPDATE tbl_tickets SET {', '.join(updates)} WHERE id = %s AND event_id = %s"
+                cursor.execute(sql_update, tuple(params))
+
+            # Quantity changes re-spread the unsold stock across the ticket's slots
+            if new_qty >= 0:
+                result = ticket_inventory.rebalance(cursor, ticket_id, new_qty)
+                if result is None:
+                    conn.rollback()
+                    print(f"❌ Error: More than {new_qty} tickets of this type are already sold or held by buyers.")
+                    return
+                print(f"{result[0]} already sold; {result[1]} now remaining.")
+
             conn.commit()
+            shared_cache.invalidate()
+            if new_qty >= 0:
+                availability_feed.announce(cursor, conn, [ticket_id])
+            audit_log.record("manage_event_tickets", {"event_id": event_id, "ticket_id": ticket_id, "action": "update"},
+                             before={"price": old[2], "issued": old[3], "remaining": old[4]},
+                             after={"price": new_price if new_price >= 0 else None,
+                                    "issued": new_qty if new_qty >= 0 else None},
+                             started=started)
             print("✅ Ticket updated.")
 
     except mysql.connector.Error as err:
@@ -677,6 +1065,7 @@ def manage_event_tickets(cursor, conn):
         print("Invalid input. IDs, prices, and quantities must be numbers.")
 
 
+@action_profiler.profiled
 def toggle_venue_availability(cursor, conn):
     """(Host) Manually marks a venue as available or not available."""
     print("\n--- 🔄 Update Venue Availability (Host Only) ---")
@@ -690,14 +1079,35 @@ def toggle_venue_availability(cursor, conn):
             print("Error: Invalid status. Must be 0 or 1.")
             return
             
+        started = time.perf_counter()
+        cursor.execute("SELECT is_available, name FROM tbl_venues WHERE id = %s", (venue_id,))
+        old = cursor.fetchone()
+
         sql_update = "UPDATE tbl_venues SET is_available = %s WHERE id = %s"
         cursor.execute(sql_update, (new_status, venue_id))
         
-        if cursor.rowcount == 0:
+        if old is None:
             print("Error: No matching venue ID found.")
         else:
+            affected = []
+            if old[0] == 1 and new_status == 0:
+                # Closing a venue: queue a notice for every upcoming event held there, in this transaction
+                cursor.execute("SELECT id, name FROM tbl_events WHERE location_id = %s AND date >= CURDATE()",
+                               (venue_id,))
+                affected = cursor.fetchall()
+                for event_id, event_name in affected:
+                    outbox.enqueue(cursor, "venue_closed", event_id,
+                                   {"event_id": event_id, "event_name": event_name, "venue": old[1]})
             conn.commit()
+            if affected:
+                outbox.wake()
+            audit_log.record("toggle_venue_availability", {"venue_id": venue_id},
+                             before={"is_available": old[0]}, after={"is_available": new_status,
+                                                                      "events_notified": [e[0] for e in affected]},
+                             started=started)
             print("✅ Venue availability updated successfully.")
+            if affected:
+                print(f"Participants of {len(affected)} upcoming event(s) at this venue will be notified.")
 
     except mysql.connector.Error as err:
         conn.rollback()
@@ -706,21 +1116,15 @@ def toggle_venue_availability(cursor, conn):
         print("Invalid input. IDs must be numbers.")
 
 
+@action_profiler.profiled
 def mark_attendance(cursor, conn):
     """(Host) Marks a registered student's attendance as 1."""
     print("\n--- 🧑‍💼 Mark Event Attendance (Host Only) ---")
     try:
         # 1. Select an event
-        cursor.execute("SELECT id, name FROM tbl_events ORDER BY date DESC")
-        events = cursor.fetchall()
-        if not events:
-            print("No events found.")
+        event_id = event_picker.pick_event(cursor, "Enter Event ID to mark attendance for")
+        if event_id is None:
             return
-            
-        print("--- All Events ---")
-        for row in events:
-            print(f"ID: {row[0]}, Name: {row[1]}")
-        event_id = int(input("\nEnter Event ID to mark attendance for: "))
 
         # 2. List registered students for that event
         query = """
@@ -738,23 +1142,25 @@ def mark_attendance(cursor, conn):
             return
 
         print(f"\n--- Registered Students for Event ID {event_id} ---")
-        print(f"{'Student ID':<12} | {'Name':<25} | {'SRN':<17} | {'Attended?':<10}")
-        print("-" * 68)
-        for row in participants:
-            attended_text = "Yes" if row[3] == 1 else "No"
-            print(f"{row[0]:<12} | {row[1]:<25} | {row[2]:<17} | {attended_text:<10}")
+        table_output.render(table_output.columns(
+            "Student ID", "Name", "SRN", ("Attended?", lambda row: "Yes" if row[3] == 1 else "No")), participants)
         
         # 3. Get student to mark
         user_id = int(input("\nEnter Student ID to mark as 'Attended' (1): "))
 
         # 4. Update the database
         sql_update = "UPDATE tbl_event_participants SET attendance_status = 1 WHERE event_id = %s AND user_id = %s"
+        started = time.perf_counter()
         cursor.execute(sql_update, (event_id, user_id))
         
         if cursor.rowcount == 0:
             print("Error: No matching student registration found for that event. No changes made.")
         else:
             conn.commit()
+            old = next((p[3] for p in participants if p[0] == user_id), None)
+            audit_log.record("mark_attendance", {"event_id": event_id, "user_id": user_id},
+                             before={"attendance_status": old}, after={"attendance_status": 1},
+                             started=started)
             print(f"✅ Successfully marked Student {user_id} as attended for Event {event_id}.")
 
     except mysql.connector.Error as err:
@@ -763,6 +1169,7 @@ def mark_attendance(cursor, conn):
     except ValueError:
         print("Invalid input. IDs must be numbers.")
 
+@action_profiler.profiled
 def list_all_participants(cursor):
     """(Host) Shows a detailed list of all participants for all events."""
     print("\n--- 👥 All Event Participants (Detailed) ---")
@@ -775,21 +1182,15 @@ def list_all_participants(cursor):
             ORDER BY e.name, s.name
         """
         cursor.execute(query)
-        records = cursor.fetchall()
-        
-        if not records:
-            print("No participant records found.")
-            return
-            
-        print(f"{'Event Name':<25} | {'Student Name':<25} | {'SRN':<17} | {'Attended?':<10}")
-        print("-" * 81)
-        for row in records:
-            attended_text = "Yes" if row[4] == 1 else "No"
-            print(f"{row[0]:<25} | {row[1]:<25} | {row[2]:<17} | {attended_text:<10}")
+        # Streamed: this listing can run to hundreds of thousands of rows
+        table_output.render(table_output.columns(
+            "Event Name", "Student Name", "SRN", ("Attended?", lambda row: "Yes" if row[4] == 1 else "No")),
+            table_output.stream(cursor), empty_message="No participant records found.")
 
     except mysql.connector.Error as err:
         print(f"Error listing participants: {err}")
 
+@action_profiler.profiled
 def list_participant_counts(cursor):
     """(Host) Shows a summary of participant counts for each event."""
     print("\n--- 📊 Participant Count by Event (Summary) ---")
@@ -802,20 +1203,13 @@ def list_participant_counts(cursor):
             ORDER BY participant_count DESC
         """
         cursor.execute(query)
-        records = cursor.fetchall()
-        
-        if not records:
-            print("No participant records found.")
-            return
-
-        print(f"{'Event Name':<30} | {'Total Registered':<20}")
-        print("-" * 55)
-        for row in records:
-            print(f"{row[0]:<30} | {row[1]:<20}")
+        table_output.render(table_output.columns("Event Name", "Total Registered"),
+                            table_output.stream(cursor), empty_message="No participant records found.")
 
     except mysql.connector.Error as err:
         print(f"Error listing participant counts: {err}")
 
+@action_profiler.profiled
 def list_all_resources(cursor):
     """Fetches and prints all resources."""
     print("\n--- 📦 All Resources ---")
@@ -827,16 +1221,14 @@ def list_all_resources(cursor):
             print("No resources found.")
             return None
         
-        print(f"{'ID':<5} | {'Name':<25} | {'Type':<15} | {'Total Qty':<10} | {'Status':<15}")
-        print("-" * 75)
-        for row in resources:
-            print(f"{row[0]:<5} | {row[1]:<25} | {row[2]:<15} | {row[3]:<10} | {row[4]:<15}")
+        table_output.render(table_output.columns("ID", "Name", "Type", "Total Qty", "Status"), resources)
         return resources
             
     except mysql.connector.Error as err:
         print(f"Error listing resources: {err}")
         return None
 
+@action_profiler.profiled
 def add_new_resource(cursor, conn):
     """(Host) Adds a new resource to the tbl_resources."""
     print("\n--- 📦 Add New Resource (Host Only) ---")
@@ -856,8 +1248,11 @@ def add_new_resource(cursor, conn):
         """
         val_insert = (name, type, quantity, description)
         
+        started = time.perf_counter()
         cursor.execute(sql_insert, val_insert)
         conn.commit()
+        audit_log.record("add_new_resource", {"name": name, "type": type, "quantity": quantity},
+                         after={"resource_id": cursor.lastrowid}, started=started)
         print(f"✅ Success! Resource '{name}' has been added.")
 
     except mysql.connector.Error as err:
@@ -866,6 +1261,7 @@ def add_new_resource(cursor, conn):
     except ValueError:
         print("Invalid input. Quantity must be a number.")
 
+@action_profiler.profiled
 def toggle_resource_status(cursor, conn):
     """(Host) Manually updates a resource's status."""
     print("\n--- 🔄 Update Resource Status (Host Only) ---")
@@ -880,13 +1276,21 @@ def toggle_resource_status(cursor, conn):
         # is_available is 1 only if the new status is 'Available'
         is_available = 1 if new_status.lower() == 'available' else 0
         
+        started = time.perf_counter()
+        cursor.execute("SELECT maintenance_status, is_available FROM tbl_resources WHERE id = %s", (resource_id,))
+        old = cursor.fetchone()
+
         sql_update = "UPDATE tbl_resources SET maintenance_status = %s, is_available = %s WHERE id = %s"
         cursor.execute(sql_update, (new_status, is_available, resource_id))
         
-        if cursor.rowcount == 0:
+        if old is None:
             print("Error: No matching resource ID found.")
         else:
             conn.commit()
+            audit_log.record("toggle_resource_status", {"resource_id": resource_id},
+                             before={"maintenance_status": old[0], "is_available": old[1]},
+                             after={"maintenance_status": new_status, "is_available": is_available},
+                             started=started)
             print("✅ Resource status updated successfully.")
 
     except mysql.connector.Error as err:
@@ -895,65 +1299,100 @@ def toggle_resource_status(cursor, conn):
     except ValueError:
         print("Invalid input. IDs must be numbers.")
 
+@action_profiler.profiled
 def add_resource_maintenance(cursor, conn):
     """(Host) Schedules resource maintenance, checking for booking conflicts."""
     print("\n--- 🛠️ Schedule Resource Maintenance (Host Only) ---")
     try:
         if not list_all_resources(cursor):
             return
-        resource_id = int(input("\nEnter Resource ID to schedule maintenance for: "))
+        resource_id = input("\nEnter Resource ID to schedule maintenance for: ")
         
         print("\nEnter maintenance start and end times in 'YYYY-MM-DD HH:MM:SS' format.")
         start_str = input("Enter maintenance start: ")
         end_str = input("Enter maintenance end: ")
         description = input("Enter maintenance description: ")
         
-        req_start = datetime.datetime.strptime(start_str, '%Y-%m-%d %H:%M:%S')
-        req_end = datetime.datetime.strptime(end_str, '%Y-%m-%d %H:%M:%S')
-
-        if req_end <= req_start:
-            print("Error: Maintenance end time must be after the start time.")
-            return
+        window = maintenance_planner.parse_window(resource_id, start_str, end_str, description)
             
-        # Conflict Check: See if this resource is already booked for an event
-        query_conflict = """
-            SELECT e.name
-            FROM tbl_event_resources er
-            JOIN tbl_events e ON er.event_id = e.id
-            WHERE er.resource_id = %s
-            AND (er.booking_start < %s) AND (er.booking_end > %s)
-        """
-        cursor.execute(query_conflict, (resource_id, req_end, req_start))
-        conflicting_booking = cursor.fetchone()
-        
-        if conflicting_booking:
-            print(f"\n❌ CONFLICT: Cannot schedule. This resource is booked for '{conflicting_booking[0]}' during this time.")
+        # Conflict Check: every booking of this resource during the window
+        scheduled, impacted, unknown = maintenance_planner.schedule(cursor, conn, [window])
+        if unknown:
+            print("Error: No matching resource ID found.")
+            return
+        if impacted:
+            print("\n❌ CONFLICT: Cannot schedule. This resource is booked during this time:")
+            for _, _, event_name, quantity, booking_start, booking_end in impacted[0]:
+                print(f"  - {quantity} for '{event_name}' from {booking_start} to {booking_end}")
             return
 
-        # All clear, schedule maintenance
-        print("\n✅ No conflicts found. Scheduling maintenance...")
-        sql_insert = """
-            INSERT INTO tbl_resource_maintenance (resource_id, maintenance_start, maintenance_end, description)
-            VALUES (%s, %s, %s, %s)
-        """
-        val_insert = (resource_id, req_start, req_end, description)
-        
-        cursor.execute(sql_insert, val_insert)
-        
-        # Also update the resource status
-        sql_update = "UPDATE tbl_resources SET is_available = 0, maintenance_status = 'Under Maintenance' WHERE id = %s"
-        cursor.execute(sql_update, (resource_id,))
-        
-        conn.commit()
-        print("✅ Success! Resource maintenance scheduled and status updated.")
+        # The resource goes 'Under Maintenance' when the window starts, not now
+        maintenance_planner.apply_due(cursor, conn, actor=None)
+        print(f"✅ Success! Maintenance scheduled from {window[1]} to {window[2]}.")
 
     except mysql.connector.Error as err:
-        conn.rollback()
         print(f"An error occurred: {err}")
     except ValueError:
-        print("Invalid input. Please enter a valid date/time format.")
+        print("Invalid input. Please enter a valid ID and date/time format, with the end after the start.")
         
 
+@action_profiler.profiled
+def plan_bulk_maintenance(cursor, conn):
+    """(Host) Plans maintenance windows for many resources at once and schedules the conflict-free ones."""
+    print("\n--- 🧰 Bulk Maintenance Planner (Host Only) ---")
+    try:
+        resources = list_all_resources(cursor)
+        if not resources:
+            return
+        names = {r[0]: r[1] for r in resources}
+        chosen = input("\nResource IDs (comma-separated) or a resource type (e.g. 'type:AV'): ").strip()
+        if chosen.lower().startswith("type:"):
+            wanted = chosen[5:].strip().lower()
+            resource_ids = [r[0] for r in resources if (r[2] or "").lower() == wanted]
+        else:
+            resource_ids = [int(part) for part in chosen.split(",") if part.strip()]
+        if not resource_ids:
+            print("No resources selected.")
+            return
+
+        print("\nEnter windows as 'YYYY-MM-DD HH:MM:SS, YYYY-MM-DD HH:MM:SS' (start, end), one per line; blank to finish.")
+        spans = []
+        while True:
+            line = input(f"Window {len(spans) + 1}: ").strip()
+            if not line:
+                break
+            start_str, end_str = line.split(",")
+            spans.append((start_str, end_str))
+        if not spans:
+            print("No windows entered.")
+            return
+        description = input("Maintenance description: ")
+        windows = [maintenance_planner.parse_window(resource_id, start_str, end_str, description)
+                   for resource_id in resource_ids for start_str, end_str in spans]
+
+        clear, impacted, unknown = maintenance_planner.plan(cursor, windows)
+        print(f"\nImpact of {len(windows)} window(s) over {len(resource_ids)} resource(s):")
+        maintenance_planner.print_plan(windows, clear, impacted, unknown, names)
+        if not clear:
+            return
+        if input(f"Schedule the {len(clear)} conflict-free window(s)? (y/n): ").strip().lower() != "y":
+            print("Nothing scheduled.")
+            return
+
+        # Re-plans inside the scheduling transaction, so a booking made meanwhile still blocks its window
+        scheduled, impacted, _ = maintenance_planner.schedule(cursor, conn, windows)
+        maintenance_planner.apply_due(cursor, conn, actor=None)
+        print(f"✅ Scheduled {len(scheduled)} window(s) in one transaction.")
+        if len(scheduled) < len(clear):
+            print(f"{len(clear) - len(scheduled)} window(s) were booked over meanwhile and were left out.")
+
+    except mysql.connector.Error as err:
+        print(f"An error occurred: {err}")
+    except ValueError:
+        print("Invalid input. Use numeric IDs and 'start, end' windows in 'YYYY-MM-DD HH:MM:SS' format, end after start.")
+
+
+@action_profiler.profiled
 def book_event_resource(cursor, conn):
     """(Host) Books a resource for an event, checking for conflicts."""
     print("\n--- 📦 Book a Resource for an Event (Host Only) ---")
@@ -989,7 +1428,13 @@ def book_event_resource(cursor, conn):
             print("Error: You must book at least 1.")
             return
 
-        # 4. Get Booking Times
+        # 4. Show what is free on the event's day, then get booking times
+        cursor.execute("SELECT date FROM tbl_events WHERE id = %s", (event_id,))
+        event_day = cursor.fetchone()
+        if event_day:
+            print(f"\nAvailability of '{r[1]}' on {event_day[0]}:")
+            for line in resource_calendar.day_view(cursor, resource_id, event_day[0]):
+                print(f"  {line}")
         print("\nEnter booking start and end times in 'YYYY-MM-DD HH:MM:SS' format.")
         book_start_str = input("Enter booking start: ")
         book_end_str = input("Enter booking end: ")
@@ -1014,17 +1459,10 @@ def book_event_resource(cursor, conn):
                 print("\n❌ CONFLICT: This resource is scheduled for maintenance during this time.")
                 return
 
-            # Check 3: Booking Conflict (Quantity Overlap)
-            query_booked = """
-                SELECT SUM(quantity_booked)
-                FROM tbl_event_resources
-                WHERE resource_id = %s
-                AND (booking_start < %s) AND (booking_end > %s)
-            """
-            cursor.execute(query_booked, (resource_id, req_end, req_start))
-            total_booked_during_slot = cursor.fetchone()[0] or 0
-            
-            remaining_qty = total_available_quantity - total_booked_during_slot
+            # Check 3: Booking Conflict (fewest units free at any moment of the slot)
+            calendar, _ = resource_calendar.availability(cursor, req_start, req_end, [resource_id])
+            remaining_qty = resource_calendar.min_free(calendar[resource_id], req_start, req_end)
+            total_booked_during_slot = total_available_quantity - remaining_qty
             
             if quantity_to_book > remaining_qty:
                 print(f"\n❌ CONFLICT: {total_booked_during_slot} units are already booked during this slot.")
@@ -1040,8 +1478,14 @@ def book_event_resource(cursor, conn):
             """
             val_insert = (event_id, resource_id, quantity_to_book, req_start, req_end)
             
+            started = time.perf_counter()
             cursor.execute(sql_insert, val_insert)
             conn.commit()
+            audit_log.record("book_event_resource", {"event_id": event_id, "resource_id": resource_id,
+                                                     "quantity": quantity_to_book, "start": req_start, "end": req_end},
+                             before={"units_booked_in_slot": total_booked_during_slot},
+                             after={"units_booked_in_slot": total_booked_during_slot + quantity_to_book},
+                             started=started)
             print("✅ Success! Resource has been booked for the event.")
 
         except mysql.connector.Error as err:
@@ -1053,6 +1497,23 @@ def book_event_resource(cursor, conn):
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
 
+@action_profiler.profiled
+def resource_week_view(cursor):
+    """(Host) Shows free units of every resource for each day of a week."""
+    print("\n--- 📅 Resource Availability (Week View) ---")
+    try:
+        start_str = input("Week starting (YYYY-MM-DD, blank = today): ").strip()
+        first_day = (datetime.datetime.strptime(start_str, '%Y-%m-%d').date() if start_str
+                     else datetime.date.today())
+        type_filter = input("Only resources of type (blank = all): ").strip() or None
+        print("\nFewest units free at any time of the day ('none' = fully booked or in maintenance):")
+        print(resource_calendar.week_view(cursor, first_day, type_filter=type_filter))
+    except ValueError:
+        print("Invalid date. Use YYYY-MM-DD.")
+    except mysql.connector.Error as err:
+        print(f"Error reading resource availability: {err}")
+
+@action_profiler.profiled
 def list_all_hosts(cursor):
     """Fetches and prints all hosts."""
     print("\n--- 🧑‍💼 All Hosts ---")
@@ -1064,16 +1525,14 @@ def list_all_hosts(cursor):
             print("No hosts found.")
             return None
         
-        print(f"{'ID':<5} | {'Name':<25} | {'Department':<25} | {'Role':<20}")
-        print("-" * 80)
-        for row in hosts:
-            print(f"{row[0]:<5} | {row[1]:<25} | {row[2]:<25} | {row[3]:<20}")
+        table_output.render(table_output.columns("ID", "Name", "Department", "Role"), hosts)
         return hosts
             
     except mysql.connector.Error as err:
         print(f"Error listing hosts: {err}")
         return None
 
+@action_profiler.profiled
 def add_new_host(cursor, conn):
     """(Host) Adds a new host to the tbl_hosts."""
     print("\n--- 🧑‍💼 Add New Host (Host Only) ---")
@@ -1093,8 +1552,11 @@ def add_new_host(cursor, conn):
         """
         val_insert = (name, email, phone, role, department)
         
+        started = time.perf_counter()
         cursor.execute(sql_insert, val_insert)
         conn.commit()
+        audit_log.record("add_new_host", {"name": name, "email": email, "role": role},
+                         after={"host_id": cursor.lastrowid}, started=started)
         print(f"✅ Success! Host '{name}' has been added.")
 
     except mysql.connector.Error as err:
@@ -1106,6 +1568,7 @@ def add_new_host(cursor, conn):
     except ValueError:
         print("Invalid input.")
 
+@action_profiler.profiled
 def show_server_time(cursor):
     """Prints the current timestamp from the MySQL server."""
     print("\n--- 🕒 Checking Server Time ---")
@@ -1116,35 +1579,96 @@ def show_server_time(cursor):
     except mysql.connector.Error as err:
         print(f"Error checking server time: {err}")
 
+@action_profiler.profiled
+def show_outbox_status(cursor):
+    """(Admin) Shows queued, sent and failed participant notifications."""
+    print("\n--- 📬 Notification Outbox ---")
+    try:
+        outbox.print_status(cursor)
+    except mysql.connector.Error as err:
+        print(f"Error reading the outbox: {err}")
+
+@action_profiler.profiled
+def export_listing(cursor):
+    """(Admin) Streams one of the listings to a CSV or JSON file instead of the screen."""
+    print("\n--- 💾 Export a Listing ---")
+    listings = [
+        ("All Event Participants (Detail)", list_all_participants),
+        ("Participant Counts (Summary)", list_participant_counts),
+        ("All Students", list_all_students),
+        ("All Hosts", list_all_hosts),
+        ("All Resources", list_all_resources),
+        ("All Venues", list_all_venues),
+        ("Upcoming Events", list_scheduled_events),
+        ("Completed Events (including archive)", lambda c: list_completed_events(c, include_archive=True)),
+    ]
+    for number, (title, _) in enumerate(listings, start=1):
+        print(f"{number}. {title}")
+    try:
+        choice = int(input("Which listing? "))
+        if not 1 <= choice <= len(listings):
+            print("Invalid choice.")
+            return
+        path = input("Export to file (.csv, .json or .jsonl): ").strip()
+        with table_output.export_to(path):
+            listings[choice - 1][1](cursor)
+    except ValueError as err:
+        print(f"Invalid input: {err}")
+    except OSError as err:
+        print(f"Could not write the export: {err}")
+
+@action_profiler.profiled
+def archive_old_events(cursor, conn):
+    """(Admin) Moves events older than a cutoff, with their orders and participation, to the archive tables."""
+    print("\n--- 🗄️ Archive Old Events (Admin Only) ---")
+    try:
+        days = int(input(f"Archive events older than how many days? ({archival.ARCHIVE_AFTER_DAYS}): ")
+                   or archival.ARCHIVE_AFTER_DAYS)
+        if days < 1:
+            print("Error: Only events at least one day old can be archived.")
+            return
+        cutoff = datetime.date.today() - datetime.timedelta(days=days)
+        totals = archival.archive_before(cursor, conn, cutoff, verbose=True)
+        print(f"✅ Archived {totals['tbl_events']} events, {totals['tbl_orders']} orders, "
+              f"{totals['tbl_event_participants']} registrations and {totals['tbl_event_feedback']} feedback entries.")
+    except ValueError:
+        print("Invalid input. Please enter a number of days.")
+    except mysql.connector.Error as err:
+        print(f"Archival stopped: {err}. Batches already moved stay archived; run it again to continue.")
+
+@action_profiler.profiled
+def venue_kiosk_mode(cursor):
+    """(Host) Runs an offline-capable attendance & feedback kiosk for one event."""
+    print("\n--- 📟 Venue Kiosk Mode (Host Only) ---")
+    if not list_scheduled_events(cursor):
+        print("No upcoming or ongoing events to run a kiosk for.")
+        return
+    try:
+        event_id = int(input("\nEnter the Event ID to run the kiosk for: "))
+    except ValueError:
+        print("Invalid input. Event ID must be a number.")
+        return
+    kiosk.run_kiosk(db_profiles.connector("kiosk"), event_id)
+
 # --- Student Portal Functions ---
 
 # *** NEW FEATURE: My Registrations ***
+@action_profiler.profiled
 def my_registrations(cursor, user_id):
     """(Student) Shows upcoming events the student is registered for."""
     print("\n--- 🎫 My Upcoming Registrations ---")
-    query = """
-        SELECT e.id, e.name, e.date, e.start_time, v.name
-        FROM tbl_event_participants p
-        JOIN tbl_events e ON p.event_id = e.id
-        LEFT JOIN tbl_venues v ON e.location_id = v.id
-        WHERE p.user_id = %s
-        AND CONCAT(e.date, ' ', e.end_time) > NOW()
-        ORDER BY e.date
-    """
-    cursor.execute(query, (user_id,))
-    registrations = cursor.fetchall()
+    registrations = student_registrations.upcoming(cursor, user_id)
     
     if not registrations:
         print("You are not registered for any upcoming events.")
         return False
 
-    print(f"{'Event ID':<10} | {'Event Name':<25} | {'Date':<12} | {'Venue':<25}")
-    print("-" * 75)
-    for row in registrations:
-        print(f"{row[0]:<10} | {row[1]:<25} | {str(row[2]):<12} | {row[4] or 'N/A':<25}")
+    table_output.render(table_output.columns("Event ID", "Event Name", "Date", ("Venue", lambda row: row[4] or "N/A")),
+                        registrations)
     return True
         
 # *** NEW FEATURE: Cancel Registration ***
+@action_profiler.profiled
 def cancel_registration(cursor, conn, user_id):
     """(Student) Cancels a registration for an event."""
     print("\n--- 🚫 Cancel Registration ---")
@@ -1157,6 +1681,7 @@ def cancel_registration(cursor, conn, user_id):
         event_id = int(input("\nEnter the Event ID to cancel your registration for: "))
         
         # We must perform this as a transaction
+        started = time.perf_counter()
         try:
             # 1. Delete them from the participants list
             sql_delete_part = "DELETE FROM tbl_event_participants WHERE event_id = %s AND user_id = %s"
@@ -1166,8 +1691,20 @@ def cancel_registration(cursor, conn, user_id):
                 print("Error: You are not registered for that event.")
                 conn.rollback()
                 return
+            student_registrations.remove(cursor, event_id, user_id)
+
+            # 2. Delete their order(s) for that event, remembering how many per ticket type
+            query_orders = """
+                SELECT o.ticket_id, COUNT(*)
+                FROM tbl_orders o
+                JOIN tbl_tickets t ON o.ticket_id = t.id
+                WHERE o.user_id = %s AND t.event_id = %s
+                AND o.payment_status NOT IN ('Expired', 'Failed')
+                GROUP BY o.ticket_id
+            """
+            cursor.execute(query_orders, (user_id, event_id))
+            refunds = cursor.fetchall()
 
-            # 2. Delete their order(s) for that event
             # This finds the ticket IDs for the event and deletes orders matching
             sql_delete_order = """
                 DELETE FROM tbl_orders 
@@ -1175,25 +1712,28 @@ def cancel_registration(cursor, conn, user_id):
                 AND ticket_id IN (SELECT id FROM tbl_tickets WHERE event_id = %s)
             """
             cursor.execute(sql_delete_order, (user_id, event_id))
+            orders_deleted = cursor.rowcount
             
-            # 3. Add quantity back to tickets. This is tricky.
-            # We'll add +1 to the *first* ticket type for that event as a simple refund.
-            # A real system would need a link between tbl_orders and tbl_event_participants.
-            sql_refund_ticket = """
-                UPDATE tbl_tickets 
-                SET quantity = quantity + 1 
-                WHERE event_id = %s 
-                ORDER BY id 
-                LIMIT 1
-            """
-            cursor.execute(sql_refund_ticket, (event_id,))
+            # 3. Return every cancelled ticket to the stock of its own ticket type
+            for ticket_id, count in refunds:
+                ticket_inventory.release(cursor, ticket_id, count)
+            tickets_refunded = sum(count for _, count in refunds)
             
             conn.commit()
-            print("✅ Your registration has been cancelled. One ticket has been refunded to the pool.")
+            availability_feed.announce(cursor, conn, [ticket_id for ticket_id, _ in refunds])
+            audit_log.record("cancel_registration", {"event_id": event_id, "user_id": user_id},
+                             before={"registered": True},
+                             after={"registered": False, "orders_deleted": orders_deleted,
+                                    "tickets_refunded": tickets_refunded},
+                             started=started)
+            db_router.note_write(user_id)
+            print(f"✅ Your registration has been cancelled. {tickets_refunded} ticket(s) have been refunded to the pool.")
             
         except mysql.connector.Error as err:
             conn.rollback()
-            print(f"Error during cancellation: {err}")
+            audit_log.record("cancel_registration", {"event_id": event_id, "user_id": user_id},
+                             after={"error": str(err)}, started=started, outcome="rolled_back")
+            print(admission.BUSY_MESSAGE if admission.is_lock_timeout(err) else f"Error during cancellation: {err}")
             
     except ValueError:
         print("Invalid Event ID.")
@@ -1217,6 +1757,7 @@ def student_portal(cursor, conn):
             return
         
         print(f"Welcome, {student[0]}!")
+        audit_log.set_actor(f"student:{user_id}")
         
         while True:
             print("\n--- Student Menu ---")
@@ -1226,22 +1767,36 @@ def student_portal(cursor, conn):
             print("4. List All Upcoming Events")
             print("5. List All Completed Events")
             print("6. Write Event Feedback")
+            print("7. Search Events")
+            print("8. Browse All Past Events (including archive)")
+            print("9. Register a Group (one ticket per attendee)")
             print("0. Log Out (Return to Main Menu)")
             
             choice = input("Enter your choice: ")
             
             if choice == "1":
-                my_registrations(cursor, user_id)
+                my_registrations(db_router.read_cursor(cursor, user_id), user_id)
             elif choice == "2":
                 cancel_registration(cursor, conn, user_id)
             elif choice == "3":
-                order_ticket_and_register(cursor, conn)
+                order_ticket_and_register(cursor, conn, user_id)
             elif choice == "4":
-                list_scheduled_events(cursor)
+                try:
+                    admission.check_rate(user_id)
+                except admission.Rejected as err:
+                    print(err)
+                    continue
+                list_scheduled_events(db_router.read_cursor(cursor, user_id))
             elif choice == "5":
-                list_completed_events(cursor)
+                list_completed_events(db_router.read_cursor(cursor, user_id))
             elif choice == "6":
                 write_event_feedback(cursor, conn)
+            elif choice == "7":
+                search_events(db_router.read_cursor(cursor, user_id))
+            elif choice == "8":
+                list_completed_events(db_router.read_cursor(cursor, user_id), include_archive=True)
+            elif choice == "9":
+                register_group(cursor, conn, user_id)
             elif choice == "0":
                 print("Logging out...")
                 break
@@ -1250,9 +1805,12 @@ def student_portal(cursor, conn):
                 
     except ValueError:
         print("Invalid ID. Please enter a number.")
+    finally:
+        audit_log.set_actor("anonymous")
     
 def admin_portal(cursor, conn):
     """Shows the menu for a host or admin."""
+    audit_log.set_actor("admin")
     while True:
         print("\n========== 🧑‍💼 Host & Admin Portal ==========")
         print("--- Event Management ---")
@@ -1279,6 +1837,13 @@ def admin_portal(cursor, conn):
         
         print("\n--- System ---")
         print("17. Check Server Time")
+        print("18. Venue Kiosk Mode (offline attendance & feedback)")
+        print("19. Search Events")
+        print("20. Archive Old Events")
+        print("21. Notification Outbox Status")
+        print("22. Resource Availability Calendar (week view)")
+        print("23. Bulk Maintenance Planner")
+        print("24. Export a Listing (CSV/JSON)")
         print(" 0. Log Out (Return to Main Menu)")
 
         choice = input("Enter your choice: ")
@@ -1292,11 +1857,11 @@ def admin_portal(cursor, conn):
         elif choice == "4":
             mark_attendance(cursor, conn)
         elif choice == "5":
-            list_all_participants(cursor)
+            list_all_participants(db_router.read_cursor(cursor))
         elif choice == "6":
-            list_participant_counts(cursor)
+            list_participant_counts(db_router.read_cursor(cursor))
         elif choice == "7":
-            list_all_venues(cursor)
+            list_all_venues(db_router.read_cursor(cursor))
         elif choice == "8":
             toggle_venue_availability(cursor, conn)
         elif choice == "9":
@@ -1310,41 +1875,36 @@ def admin_portal(cursor, conn):
         elif choice == "13":
             add_new_host(cursor, conn)
         elif choice == "14":
-            list_all_hosts(cursor)
+            list_all_hosts(db_router.read_cursor(cursor))
         elif choice == "15":
-            list_all_students(cursor)
+            list_all_students(db_router.read_cursor(cursor))
         elif choice == "16":
             add_new_student(cursor, conn)
         elif choice == "17":
             show_server_time(cursor)
+        elif choice == "18":
+            venue_kiosk_mode(cursor)
+        elif choice == "19":
+            search_events(db_router.read_cursor(cursor))
+        elif choice == "20":
+            archive_old_events(cursor, conn)
+        elif choice == "21":
+            show_outbox_status(cursor)
+        elif choice == "22":
+            resource_week_view(db_router.read_cursor(cursor))
+        elif choice == "23":
+            plan_bulk_maintenance(cursor, conn)
+        elif choice == "24":
+            export_listing(db_router.read_cursor(cursor))
         elif choice == "0":
             print("Logging out...")
+            audit_log.set_actor("anonymous")
             break
         else:
             print("Invalid Choice. Try Again.")
 
-def main():
-    """Main function to run the application."""
-    try:
-        conn = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="root",  # <-- IMPORTANT: Change to your MySQL password
-            database="pesu_proj" # Make sure this matches your database name
-        )
-        cursor = conn.cursor()
-        print("\n✅ Successfully connected to 'pesu_project'")
-
-    except mysql.connector.Error as err:
-        if err.errno == errorcode.ER_BAD_DB_ERROR:
-            print(f"Error: Database '{'pesu_project'}' does not exist.")
-        elif err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
-            print("Error: Invalid MySQL username or password.")
-        else:
-            print(f"Error connecting to database: {err}")
-        return
-
-    # --- Main Application Loop ---
+def main_menu(cursor, conn):
+    """The top-level menu loop; returns when the user exits."""
     while True:
         print("\n====== University Event Management System ======")
         print("1. Student Portal")
@@ -1359,17 +1919,78 @@ def main():
         elif choice == "2":
             admin_portal(cursor, conn)
         elif choice == "3":
-            view_event_feedback(cursor) # Public can view feedback
+            view_event_feedback(db_router.read_cursor(cursor)) # Public can view feedback
         elif choice == "0":
             print("Exiting Program...")
             break
         else:
             print("Invalid Choice. Try Again.")
 
+def main():
+    """Main function to run the application."""
+    try:
+        profile = db_profiles.load_profile()
+        conn = db_profiles.connect(profile)
+        cursor = conn.cursor()
+        print("\n✅ Successfully connected to 'pesu_project'")
+        # Schema changes are an explicit step (python migrations.py migrate); never run them on start-up
+        pending = migrations.pending_migrations(cursor)
+        if pending:
+            print(f"❌ The database schema is behind: {len(pending)} migration(s) pending, starting with "
+                  f"{pending[0][0]} ({pending[0][1]}). Run 'python migrations.py migrate' first.")
+            cursor.close()
+            conn.close()
+            return
+        audit_log.start()
+        ticket_inventory.backfill_slots(cursor, conn)
+        sweeper = ticket_holds.HoldSweeper(db_profiles.connector("batch"))
+        sweeper.start()
+        dispatcher = outbox.OutboxDispatcher(db_profiles.connector("batch"))
+        dispatcher.start()
+        scheduler = maintenance_planner.MaintenanceScheduler(db_profiles.connector("batch"))
+        scheduler.start()
+        # Live availability over server-sent events, only when PESU_FEED_PORT is set
+        feed_server = availability_feed.server_from_env(db_profiles.connector("batch"))
+        if feed_server:
+            feed_server.start()
+            print(f"📡 Ticket availability feed on port {feed_server.httpd.server_address[1]}")
+        # Listing reads go to replicas when PESU_REPLICA_HOSTS is set; writes always use `cursor`
+        replicas = db_router.replicas_from_env(profile.connect_args())
+        if replicas:
+            db_router.install(db_router.Router(cursor, replicas))
+
+    except mysql.connector.Error as err:
+        if err.errno == errorcode.ER_BAD_DB_ERROR:
+            print(f"Error: Database '{'pesu_project'}' does not exist.")
+        elif err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
+            print("Error: Invalid MySQL username or password.")
+        else:
+            print(f"Error connecting to database: {err}")
+        return
+    except ValueError as err:
+        print(f"Error in connection profile: {err}")
+        return
+    except OSError as err:
+        print(f"Error starting the availability feed: {err}")
+        return
+
+    # --- Main Application Loop ---
+    session_trace.start_recording()   # only when PESU_TRACE names a file
+    main_menu(cursor, conn)
+    session_trace.stop_recording()
+
     # Close Connection
+    sweeper.stop()
+    dispatcher.stop()
+    scheduler.stop()
+    if feed_server:
+        feed_server.stop()
+    db_router.uninstall()
     cursor.close()
     conn.close()
+    audit_log.shutdown()
     print("Database connection closed.")
+    action_profiler.report()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,406 @@
+"""
+Transactional outbox for participant notifications.
+
+A change that participants must hear about (an event moved to another time
+or venue, a venue closed under its events) calls enqueue() with the same
+cursor, before the same commit, so the notification exists exactly when
+the change does. The admin's transaction gains one INSERT, not one send per
+participant.
+
+OutboxDispatcher runs a small pool of worker threads, each on its own
+connection. A worker claims due outbox rows (a lease in claimed_until lets
+another worker take over a row whose worker died), reads the event's
+participants from tbl_event_participants and hands them to the sender in
+batches of SEND_BATCH. Before each batch the worker extends its lease with a
+conditional UPDATE on claimed_by; if another worker has taken the row over,
+it stops without sending. Every batch that went out is recorded in
+tbl_outbox_deliveries, so a retry only sends to the participants who have
+not had the message yet. A failed row is retried with exponential backoff
+and marked 'Failed' after MAX_ATTEMPTS.
+
+The sender is pluggable (PESU_NOTIFY_SENDER):
+
+    file:<path>          append JSON lines to a file (default: notifications.jsonl)
+    smtp://host[:port]   send mail, one SMTP session per batch
+
+    python outbox.py --status
+    python outbox.py --drain          # deliver everything due, then exit
+    python outbox.py --retry-failed
+"""
+import argparse
+import collections
+import datetime
+import json
+import os
+import smtplib
+import sys
+import threading
+import time
+from email.message import EmailMessage
+
+import mysql.connector
+
+import audit_log
+import db_profiles
+import table_output
+
+OUTBOX_WORKERS = int(os.environ.get("PESU_OUTBOX_WORKERS", "2"))
+CLAIM_BATCH = 20          # outbox rows claimed per pass
+SEND_BATCH = 100          # recipients per sender call
+POLL_INTERVAL = 5         # seconds a worker sleeps when nothing is due (enqueue wakes it earlier)
+LEASE_SECONDS = 120       # a claimed row is handed to another worker after this long without a renewal
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 10   # backoff: 10s, 20s, 40s, ... capped at RETRY_MAX_SECONDS
+RETRY_MAX_SECONDS = 3600
+NOTIFY_SENDER = os.environ.get("PESU_NOTIFY_SENDER", "file:notifications.jsonl")
+NOTIFY_FROM = os.environ.get("PESU_NOTIFY_FROM", "events@pesu.edu")
+STUDENT_MAIL_DOMAIN = os.environ.get("PESU_STUDENT_MAIL_DOMAIN", "pesu.pes.edu")
+
+_wake = threading.Event()
+_metrics_lock = threading.Lock()
+_metrics = collections.Counter()
+_lag_seconds = collections.deque(maxlen=1000)   # enqueue -> fully delivered, for recent rows
+
+
+# --- Producer side (runs inside the caller's transaction) ---
+
+def enqueue(cursor, kind, event_id, payload):
+    """Queues a notification in the caller's transaction. Call wake() after the commit."""
+    now = datetime.datetime.now()
+    cursor.execute("""
+        INSERT INTO tbl_outbox (kind, event_id, payload, created_at, status, attempts, next_attempt_at)
+        VALUES (%s, %s, %s, %s, 'Pending', 0, %s)
+    """, (kind, event_id, json.dumps(payload, default=str), now, now))
+    return cursor.lastrowid
+
+
+def wake():
+    """Tells idle workers there is new work."""
+    _wake.set()
+
+
+# --- Senders ---
+
+class FileSender:
+    """Local stand-in for a mail server: one JSON line per message."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, messages):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            for message in messages:
+                f.write(json.dumps(message) + "\n")
+
+
+class SmtpSender:
+    def __init__(self, host, port=25, sender=NOTIFY_FROM):
+        self.host = host
+        self.port = port
+        self.sender = sender
+
+    def send(self, messages):
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            for message in messages:
+                mail = EmailMessage()
+                mail["From"] = self.sender
+                mail["To"] = message["to"]
+                mail["Subject"] = message["subject"]
+                mail.set_content(message["body"])
+                smtp.send_message(mail)
+
+
+def get_sender(spec=NOTIFY_SENDER):
+    if spec.startswith("smtp://"):
+        host, _, port = spec[len("smtp://"):].partition(":")
+        return SmtpSender(host, int(port or 25))
+    if spec.startswith("file:"):
+        return FileSender(spec[len("file:"):])
+    raise ValueError(f"Unknown notification sender '{spec}' (expected file:<path> or smtp://host[:port])")
+
+
+def render(kind, payload, recipient_name):
+    """Subject and body of one notification."""
+    name = payload.get("event_name", f"event {payload.get('event_id')}")
+    if kind == "event_rescheduled":
+        subject = f"{name} has been rescheduled"
+        change = (f"It now takes place on {payload['date']} from {payload['start_time']} to {payload['end_time']} "
+                  f"(was {payload['old_date']} {payload['old_start_time']}-{payload['old_end_time']}).")
+    elif kind == "event_relocated":
+        subject = f"{name} has moved to a new venue"
+        change = f"It now takes place at {payload['venue']} (was {payload['old_venue']})."
+    elif kind == "venue_closed":
+        subject = f"The venue for {name} is no longer available"
+        change = (f"{payload['venue']} has been closed. The organisers will confirm a new venue; "
+                  f"watch your registrations for updates.")
+    else:
+        subject = f"Update to {name}"
+        change = json.dumps(payload)
+    return subject, f"Hello {recipient_name},\n\n{change}\n\nYou are receiving this because you registered for {name}."
+
+
+# --- Worker side ---
+
+class LeaseLost(Exception):
+    """Another worker has claimed the outbox row this worker was delivering."""
+
+
+def _record(**counts):
+    with _metrics_lock:
+        _metrics.update(counts)
+
+
+def metrics():
+    """Delivery counters for this process, plus the enqueue-to-delivered lag of recent rows."""
+    with _metrics_lock:
+        result = dict(_metrics)
+        lags = sorted(_lag_seconds)
+    if lags:
+        result["lag_p50_s"] = round(lags[len(lags) // 2], 3)
+        result["lag_max_s"] = round(lags[-1], 3)
+    return result
+
+
+def claim(cursor, conn, worker_name, limit=CLAIM_BATCH):
+    """Claims up to `limit` due rows for `worker_name`. Returns [(id, kind, event_id, payload, attempts, created_at)]."""
+    now = datetime.datetime.now()
+    cursor.execute("""
+        SELECT id FROM tbl_outbox
+        WHERE (status = 'Pending' AND next_attempt_at <= %s)
+        OR (status = 'Sending' AND claimed_until < %s)
+        ORDER BY id
+        LIMIT %s
+    """, (now, now, limit))
+    candidates = [row[0] for row in cursor.fetchall()]
+    claimed = []
+    until = now + datetime.timedelta(seconds=LEASE_SECONDS)
+    for outbox_id in candidates:
+        # Conditional update: another worker may have taken the row since the SELECT
+        cursor.execute("""
+            UPDATE tbl_outbox SET status = 'Sending', claimed_by = %s, claimed_until = %s
+            WHERE id = %s
+            AND ((status = 'Pending' AND next_attempt_at <= %s) OR (status = 'Sending' AND claimed_until < %s))
+        """, (worker_name, until, outbox_id, now, now))
+        if cursor.rowcount == 1:
+            claimed.append(outbox_id)
+    conn.commit()
+    if not claimed:
+        return []
+    placeholders = ", ".join(["%s"] * len(claimed))
+    cursor.execute(f"SELECT id, kind, event_id, payload, attempts, created_at FROM tbl_outbox "
+                   f"WHERE id IN ({placeholders}) ORDER BY id", tuple(claimed))
+    rows = cursor.fetchall()
+    _record(claimed=len(rows))
+    return rows
+
+
+def pending_recipients(cursor, outbox_id, event_id):
+    """Participants of the event who have not been sent this notification yet."""
+    cursor.execute("""
+        SELECT p.user_id, s.srn, s.name
+        FROM tbl_event_participants p
+        JOIN tbl_students s ON s.id = p.user_id
+        LEFT JOIN tbl_outbox_deliveries d ON d.outbox_id = %s AND d.user_id = p.user_id
+        WHERE p.event_id = %s AND d.user_id IS NULL
+        ORDER BY p.user_id
+    """, (outbox_id, event_id))
+    return cursor.fetchall()
+
+
+def renew_lease(cursor, conn, outbox_id, worker_name):
+    """Extends `worker_name`'s lease on the row by LEASE_SECONDS. Raises LeaseLost if it no longer holds it."""
+    cursor.execute("""
+        UPDATE tbl_outbox SET claimed_until = %s
+        WHERE id = %s AND status = 'Sending' AND claimed_by = %s
+    """, (datetime.datetime.now() + datetime.timedelta(seconds=LEASE_SECONDS), outbox_id, worker_name))
+    lost = cursor.rowcount != 1
+    conn.commit()
+    if lost:
+        raise LeaseLost(f"outbox row {outbox_id} was taken over by another worker")
+
+
+def deliver(cursor, conn, sender, row, worker_name):
+    """Sends one outbox row to every remaining recipient, recording each batch. Returns messages sent."""
+    outbox_id, kind, event_id, payload, _, _ = row
+    payload = json.loads(payload)
+    recipients = pending_recipients(cursor, outbox_id, event_id)
+    sent = 0
+    for start in range(0, len(recipients), SEND_BATCH):
+        batch = recipients[start:start + SEND_BATCH]
+        renew_lease(cursor, conn, outbox_id, worker_name)
+        messages = []
+        for user_id, srn, name in batch:
+            subject, body = render(kind, payload, name)
+            messages.append({"outbox_id": outbox_id, "user_id": user_id,
+                             "to": f"{srn.lower()}@{STUDENT_MAIL_DOMAIN}", "subject": subject, "body": body})
+        sender.send(messages)
+        now = datetime.datetime.now()
+        cursor.execute("INSERT INTO tbl_outbox_deliveries (outbox_id, user_id, delivered_at) VALUES "
+                       + ", ".join(["(%s, %s, %s)"] * len(batch)),
+                       tuple(value for user_id, _, _ in batch for value in (outbox_id, user_id, now)))
+        conn.commit()
+        sent += len(batch)
+        _record(messages_sent=len(batch), send_batches=1)
+    return sent
+
+
+def _finish(cursor, conn, row, sent, worker_name):
+    outbox_id, kind, event_id, _, _, created_at = row
+    now = datetime.datetime.now()
+    cursor.execute("UPDATE tbl_outbox SET status = 'Sent', sent_at = %s, claimed_until = NULL, last_error = NULL "
+                   "WHERE id = %s AND status = 'Sending' AND claimed_by = %s", (now, outbox_id, worker_name))
+    finished = cursor.rowcount == 1
+    conn.commit()
+    if not finished:
+        raise LeaseLost(f"outbox row {outbox_id} was taken over by another worker")
+    if isinstance(created_at, str):
+        created_at = datetime.datetime.fromisoformat(created_at)
+    with _metrics_lock:
+        _metrics["rows_sent"] += 1
+        _lag_seconds.append((now - created_at).total_seconds())
+    audit_log.record("outbox_delivered", {"outbox_id": outbox_id, "kind": kind, "event_id": event_id},
+                     after={"messages": sent}, actor="system:outbox")
+
+
+def _fail(cursor, conn, row, err, worker_name):
+    outbox_id, attempts = row[0], row[4] + 1
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    status = "Failed" if attempts >= MAX_ATTEMPTS else "Pending"
+    # Conditional on the lease, so a worker that lost the row cannot reset it under its new owner
+    cursor.execute("""
+        UPDATE tbl_outbox SET status = %s, attempts = %s, next_attempt_at = %s, claimed_until = NULL, last_error = %s
+        WHERE id = %s AND status = 'Sending' AND claimed_by = %s
+    """, (status, attempts, datetime.datetime.now() + datetime.timedelta(seconds=delay), str(err)[:255],
+          outbox_id, worker_name))
+    conn.commit()
+    _record(**({"rows_failed": 1} if status == "Failed" else {"retries": 1}))
+
+
+def process_due(cursor, conn, sender, worker_name):
+    """One worker pass: claims due rows and delivers them. Returns the number of rows handled."""
+    rows = claim(cursor, conn, worker_name)
+    for row in rows:
+        try:
+            _finish(cursor, conn, row, deliver(cursor, conn, sender, row, worker_name), worker_name)
+        except LeaseLost:
+            conn.rollback()
+            _record(leases_lost=1)
+        except Exception as err:
+            # smtplib errors are OSErrors, a bad payload a KeyError; sent batches stay recorded,
+            # so the retry skips them
+            conn.rollback()
+            _fail(cursor, conn, row, err, worker_name)
+    return len(rows)
+
+
+class OutboxWorker(threading.Thread):
+    """Delivers outbox rows on its own connection until stopped."""
+
+    def __init__(self, connect, sender, name, interval=POLL_INTERVAL):
+        super().__init__(name=name, daemon=True)
+        self.connect = connect
+        self.sender = sender
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        conn = None
+        while not self._stop_event.is_set():
+            handled = 0
+            try:
+                if conn is None:
+                    conn = self.connect()
+                cursor = conn.cursor()
+                handled = process_due(cursor, conn, self.sender, self.name)
+                cursor.close()
+            except Exception:
+                # Drop the connection and try again on the next pass; one bad row must not stop the worker
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except mysql.connector.Error:
+                        pass
+                conn = None
+            if not handled:
+                _wake.wait(self.interval)
+                _wake.clear()
+        if conn is not None:
+            conn.close()
+
+    def stop(self):
+        self._stop_event.set()
+        _wake.set()
+
+
+class OutboxDispatcher:
+    """A pool of OutboxWorkers sharing one sender."""
+
+    def __init__(self, connect, workers=OUTBOX_WORKERS, sender=None):
+        sender = sender or get_sender()
+        self.workers = [OutboxWorker(connect, sender, f"outbox-{n}") for n in range(workers)]
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self, timeout=5):
+        for worker in self.workers:
+            worker.stop()
+        for worker in self.workers:
+            worker.join(timeout)
+
+
+def status_counts(cursor):
+    cursor.execute("SELECT status, COUNT(*), MIN(created_at) FROM tbl_outbox GROUP BY status ORDER BY status")
+    return cursor.fetchall()
+
+
+def retry_failed(cursor, conn):
+    cursor.execute("UPDATE tbl_outbox SET status = 'Pending', attempts = 0, next_attempt_at = %s WHERE status = 'Failed'",
+                   (datetime.datetime.now(),))
+    count = cursor.rowcount
+    conn.commit()
+    return count
+
+
+def print_status(cursor):
+    table_output.render(table_output.columns("Status", "Rows", "Oldest"), status_counts(cursor),
+                        empty_message="The outbox is empty.")
+    current = metrics()
+    if current:
+        print("This process: " + ", ".join(f"{key} {value}" for key, value in sorted(current.items())))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="only print outbox row counts")
+    parser.add_argument("--drain", action="store_true", help="deliver everything due now, then exit")
+    parser.add_argument("--retry-failed", action="store_true", help="requeue rows that gave up")
+    args = parser.parse_args(argv)
+
+    conn = db_profiles.connect("batch")
+    cursor = conn.cursor()
+    try:
+        if args.retry_failed:
+            print(f"Requeued {retry_failed(cursor, conn)} failed notifications.")
+        if args.drain:
+            audit_log.start()
+            sender = get_sender()
+            started = time.perf_counter()
+            while process_due(cursor, conn, sender, "outbox-cli"):
+                pass
+            print(f"Drained in {time.perf_counter() - started:.2f}s")
+        print_status(cursor)
+    except mysql.connector.Error as err:
+        print(f"Outbox command failed: {err}")
+        return 1
+    finally:
+        audit_log.shutdown()
+        cursor.close()
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Payment reconciliation for Pending orders.
+
+Streams a payment-provider settlement file (CSV with columns
+order_id, amount, status, settled_at, provider_ref) in fixed-size chunks.
+Each chunk is matched against Pending orders through the tbl_orders primary
+key. Settled orders are promoted to 'Completed' and their buyers registered
+with multi-row inserts, one transaction per chunk. Failed payments release
+their tickets back to stock. Memory use depends on the chunk size, not on
+the file size. A separate pass expires Pending orders that never settled.
+
+    python reconciliation.py settlement.csv
+    python reconciliation.py --make-fixture settlement.csv --lines 1000000
+"""
+import argparse
+import csv
+import datetime
+import random
+import time
+
+import mysql.connector
+
+import audit_log
+import db_profiles
+import student_registrations
+import ticket_inventory
+
+CHUNK_SIZE = 5000
+EXPIRE_AFTER_HOURS = 48
+EXPIRE_BATCH_SIZE = 1000
+SETTLED_STATUSES = {"SETTLED", "SUCCESS", "CAPTURED"}
+FAILED_STATUSES = {"FAILED", "DECLINED", "REVERSED"}
+
+
+def read_settlements(path, chunk_size=CHUNK_SIZE, stats=None):
+    """
+    Yields lists of at most `chunk_size` (order_id, amount, status) tuples.
+    Malformed lines are skipped and counted in stats["malformed"] when given.
+    """
+    chunk = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                chunk.append((int(row["order_id"]), round(float(row["amount"]), 2), row["status"].strip().upper()))
+            except (KeyError, ValueError, AttributeError):
+                if stats is not None:
+                    stats["malformed"] += 1
+                continue
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def _release_orders(cursor, orders):
+    """Returns the tickets of (order_id, ticket_id) pairs to stock, grouped per ticket."""
+    per_ticket = {}
+    for _, ticket_id in orders:
+        per_ticket[ticket_id] = per_ticket.get(ticket_id, 0) + 1
+    for ticket_id, count in per_ticket.items():
+        ticket_inventory.release(cursor, ticket_id, count)
+
+
+def reconcile_chunk(cursor, conn, chunk, stats):
+    """Matches one chunk of settlement lines against Pending orders and applies it in one transaction."""
+    order_ids = list({line[0] for line in chunk})
+    placeholders = ", ".join(["%s"] * len(order_ids))
+    counts = {"registered": 0, "unmatched": 0, "amount_mismatch": 0, "unknown_status": 0}
+    try:
+        cursor.execute(f"""
+            SELECT o.id, o.ticket_id, o.user_id, t.event_id, t.price
+            FROM tbl_orders o
+            JOIN tbl_tickets t ON o.ticket_id = t.id
+            WHERE o.id IN ({placeholders}) AND o.payment_status = 'Pending'
+            FOR UPDATE
+        """, tuple(order_ids))
+        pending = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        paid, failed, seen = [], [], set()
+        for order_id, amount, status in chunk:
+            if order_id in seen or order_id not in pending:
+                counts["unmatched"] += 1
+                continue
+            seen.add(order_id)
+            ticket_id, user_id, event_id, price = pending[order_id]
+            if status in SETTLED_STATUSES:
+                if round(float(price), 2) != amount:
+                    counts["amount_mismatch"] += 1
+                    continue
+                paid.append((order_id, ticket_id, user_id, event_id))
+            elif status in FAILED_STATUSES:
+                failed.append((order_id, ticket_id))
+            else:
+                counts["unknown_status"] += 1
+
+        now = datetime.datetime.now()
+        if paid:
+            placeholders = ", ".join(["%s"] * len(paid))
+            cursor.execute(f"UPDATE tbl_orders SET payment_status = 'Completed' WHERE id IN ({placeholders})",
+                           tuple(p[0] for p in paid))
+            registrations = sorted({(p[3], p[2]) for p in paid})
+            cursor.executemany(
+                "INSERT IGNORE INTO tbl_event_participants (event_id, user_id, registration_time) VALUES (%s, %s, %s)",
+                [(event_id, user_id, now) for event_id, user_id in registrations],
+            )
+            counts["registered"] = cursor.rowcount
+            student_registrations.add(cursor, registrations)
+        if failed:
+            placeholders = ", ".join(["%s"] * len(failed))
+            cursor.execute(f"UPDATE tbl_orders SET payment_status = 'Failed' WHERE id IN ({placeholders})",
+                           tuple(f[0] for f in failed))
+            _release_orders(cursor, failed)
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    for key, value in counts.items():
+        stats[key] += value
+    stats["promoted"] += len(paid)
+    stats["failed"] += len(failed)
+
+
+def reconcile_file(cursor, conn, path, chunk_size=CHUNK_SIZE):
+    """Runs the whole settlement file through reconcile_chunk(). Returns the stats dict."""
+    stats = {"lines": 0, "malformed": 0, "promoted": 0, "registered": 0, "failed": 0,
+             "unmatched": 0, "amount_mismatch": 0, "unknown_status": 0}
+    for chunk in read_settlements(path, chunk_size, stats):
+        stats["lines"] += len(chunk)
+        reconcile_chunk(cursor, conn, chunk, stats)
+    return stats
+
+
+def expire_stale_pending(cursor, conn, older_than_hours=EXPIRE_AFTER_HOURS, batch_size=EXPIRE_BATCH_SIZE):
+    """Marks Pending orders older than the cutoff as 'Expired' and returns their tickets, in batches."""
+    cutoff = datetime.datetime.now() - datetime.timedelta(hours=older_than_hours)
+    expired = 0
+    while True:
+        cursor.execute("""
+            SELECT id, ticket_id FROM tbl_orders
+            WHERE payment_status = 'Pending' AND order_time < %s
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (cutoff, batch_size))
+        batch = cursor.fetchall()
+        if not batch:
+            conn.rollback()
+            break
+        try:
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(f"UPDATE tbl_orders SET payment_status = 'Expired' WHERE id IN ({placeholders})",
+                           tuple(row[0] for row in batch))
+            _release_orders(cursor, batch)
+            conn.commit()
+        except mysql.connector.Error:
+            conn.rollback()
+            raise
+        expired += len(batch)
+        if len(batch) < batch_size:
+            break
+    return expired
+
+
+def write_fixture(path, lines, cursor=None, fail_rate=0.05):
+    """
+    Writes a settlement CSV with `lines` rows. When a cursor is given, real
+    Pending orders are streamed in first (mostly settled at the right price);
+    the rest are random order ids that match nothing.
+    """
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["order_id", "amount", "status", "settled_at", "provider_ref"])
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        if cursor is not None:
+            cursor.execute("""
+                SELECT o.id, t.price FROM tbl_orders o
+                JOIN tbl_tickets t ON o.ticket_id = t.id
+                WHERE o.payment_status = 'Pending'
+                ORDER BY o.id
+            """)
+            while written < lines:
+                rows = cursor.fetchmany(CHUNK_SIZE)
+                if not rows:
+                    break
+                for order_id, price in rows[:lines - written]:
+                    status = "FAILED" if random.random() < fail_rate else "SETTLED"
+                    writer.writerow([order_id, f"{price:.2f}", status, now, f"PAY{order_id:012d}"])
+                    written += 1
+        while written < lines:
+            order_id = random.randint(10_000_000, 2_000_000_000)
+            writer.writerow([order_id, f"{random.randint(0, 500):.2f}", "SETTLED", now, f"PAY{order_id:012d}"])
+            written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("settlement_file", help="settlement CSV to reconcile (or to write with --make-fixture)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--expire-after-hours", type=float, default=EXPIRE_AFTER_HOURS,
+                        help="expire Pending orders older than this after reconciling (0 to skip)")
+    parser.add_argument("--make-fixture", action="store_true", help="write a settlement file instead of reading one")
+    parser.add_argument("--lines", type=int, default=1000, help="fixture size")
+    args = parser.parse_args()
+
+    conn = db_profiles.connect("batch")
+    cursor = conn.cursor()
+    try:
+        if args.make_fixture:
+            written = write_fixture(args.settlement_file, args.lines, cursor)
+            print(f"✅ Wrote {written} settlement lines to {args.settlement_file}")
+            return
+
+        start = time.perf_counter()
+        stats = reconcile_file(cursor, conn, args.settlement_file, args.chunk_size)
+        if args.expire_after_hours > 0:
+            stats["expired"] = expire_stale_pending(cursor, conn, args.expire_after_hours)
+        elapsed = time.perf_counter() - start
+        audit_log.record("reconcile_payments", {"file": args.settlement_file}, after=stats,
+                         actor="system:reconciliation")
+
+        print("\n--- 💳 Payment Reconciliation Summary ---")
+        for key, value in stats.items():
+            print(f"{key.replace('_', ' ').title():<20} | {value}")
+        print(f"{'Elapsed':<20} | {elapsed:.2f}s ({stats['lines'] / max(elapsed, 1e-9):,.0f} lines/s)")
+    except mysql.connector.Error as err:
+        print(f"❌ Reconciliation stopped: {err}")
+    finally:
+        cursor.close()
+        conn.close()
+        audit_log.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Resource availability calendar.
+
+availability() answers "how many units of each resource are free, when"
+for one or many resources over a time range. It reads every booking and
+maintenance window overlapping the range in one UNION ALL query, then
+sweeps each resource's start/end points in time order. The result is a step
+function per resource: a list of (from, units_free) pairs, each value
+holding until the next pair (the last one until the end of the range).
+
+Bookings take their quantity away while they run. A maintenance window
+takes the whole resource out. Intervals are half-open, so a booking
+ending at 12:00 and one starting at 12:00 do not overlap.
+
+The range query is served by the (end, start) indexes of migration 8
+(migrations.CALENDAR_INDEXES). The week view for 1,000 resources is one
+query plus a linear sweep (see benchmarks/bench_calendar.py).
+"""
+import collections
+import datetime
+
+# NULL units marks a maintenance window (the whole resource is out)
+INTERVALS_QUERY = """
+    SELECT resource_id, booking_start, booking_end, quantity_booked
+    FROM tbl_event_resources
+    WHERE booking_end > %s AND booking_start < %s
+    UNION ALL
+    SELECT resource_id, maintenance_start, maintenance_end, NULL
+    FROM tbl_resource_maintenance
+    WHERE maintenance_end > %s AND maintenance_start < %s
+"""
+
+WEEK_DAYS = 7
+
+
+def fetch_resources(cursor, resource_ids=None):
+    """{id: (name, type, quantity)} for the given resources, or all of them."""
+    if resource_ids:
+        placeholders = ", ".join(["%s"] * len(resource_ids))
+        cursor.execute(f"SELECT id, name, type, quantity FROM tbl_resources WHERE id IN ({placeholders})",
+                       tuple(resource_ids))
+    else:
+        cursor.execute("SELECT id, name, type, quantity FROM tbl_resources")
+    return {row[0]: row[1:] for row in cursor.fetchall()}
+
+
+def fetch_intervals(cursor, start, end, resource_ids=None):
+    """Every booking and maintenance window overlapping [start, end), in one query."""
+    if not resource_ids:
+        cursor.execute(INTERVALS_QUERY, (start, end, start, end))
+        return cursor.fetchall()
+    placeholders = ", ".join(["%s"] * len(resource_ids))
+    cursor.execute(f"""
+        SELECT resource_id, booking_start, booking_end, quantity_booked
+        FROM tbl_event_resources
+        WHERE resource_id IN ({placeholders}) AND booking_end > %s AND booking_start < %s
+        UNION ALL
+        SELECT resource_id, maintenance_start, maintenance_end, NULL
+        FROM tbl_resource_maintenance
+        WHERE resource_id IN ({placeholders}) AND maintenance_end > %s AND maintenance_start < %s
+    """, (*resource_ids, start, end, *resource_ids, start, end))
+    return cursor.fetchall()
+
+
+def sweep(quantity, intervals, start, end):
+    """
+    Step function of free units for one resource with `quantity` units,
+    given its (interval_start, interval_end, units or None) intervals.
+    """
+    if not intervals:
+        return [(start, quantity)]
+    points = []
+    for interval_start, interval_end, units in intervals:
+        interval_start, interval_end = max(interval_start, start), min(interval_end, end)
+        if interval_start >= interval_end:
+            continue
+        # Ends sort before starts at the same instant (half-open intervals)
+        points.append((interval_start, 1, units))
+        if interval_end < end:   # an interval running past the range leaves no step at its end
+            points.append((interval_end, 0, units))
+    points.sort(key=lambda point: (point[0], point[1]))
+
+    booked = maintenance = 0
+    steps = [(start, quantity)]
+    for at, is_start, units in points:
+        sign = 1 if is_start else -1
+        if units is None:
+            maintenance += sign
+        else:
+            booked += sign * units
+        free = 0 if maintenance else max(quantity - booked, 0)
+        if steps[-1][0] == at:
+            steps[-1] = (at, free)
+        elif steps[-1][1] != free:
+            steps.append((at, free))
+    # Collapse steps that an end/start pair at the same instant left equal to their predecessor
+    return [step for i, step in enumerate(steps) if i == 0 or step[1] != steps[i - 1][1]]
+
+
+def availability(cursor, start, end, resource_ids=None):
+    """
+    {resource_id: [(from, units_free), ...]} over [start, end) for the given
+    resources (default: all). Returns (calendar, resources) where resources
+    is fetch_resources()' {id: (name, type, quantity)}.
+    """
+    resources = fetch_resources(cursor, resource_ids)
+    per_resource = collections.defaultdict(list)
+    for resource_id, interval_start, interval_end, units in fetch_intervals(cursor, start, end, resource_ids):
+        per_resource[resource_id].append((interval_start, interval_end, units))
+    calendar = {resource_id: sweep(quantity, per_resource.get(resource_id, ()), start, end)
+                for resource_id, (_, _, quantity) in resources.items()}
+    return calendar, resources
+
+
+def min_free(steps, start, end):
+    """Fewest units free at any moment in [start, end)."""
+    lowest = None
+    for i, (at, free) in enumerate(steps):
+        until = steps[i + 1][0] if i + 1 < len(steps) else None
+        if at < end and (until is None or until > start):
+            lowest = free if lowest is None else min(lowest, free)
+    return lowest
+
+
+def day_starts(first_day, days):
+    """Midnight of each of `days` days starting at `first_day`, plus the midnight after the last."""
+    midnight = datetime.datetime.combine(first_day, datetime.time())
+    return [midnight + datetime.timedelta(days=n) for n in range(days + 1)]
+
+
+def daily_minimum(steps, boundaries):
+    """Fewest units free within each day delimited by day_starts() `boundaries`, in one pass over the steps."""
+    if len(steps) == 1:
+        return [steps[0][1]] * (len(boundaries) - 1)
+    minimum = []
+    i = 0
+    for day_start, day_end in zip(boundaries, boundaries[1:]):
+        while i + 1 < len(steps) and steps[i + 1][0] <= day_start:
+            i += 1
+        lowest = steps[i][1]
+        j = i + 1
+        while j < len(steps) and steps[j][0] < day_end:
+            lowest = min(lowest, steps[j][1])
+            j += 1
+        minimum.append(lowest)
+    return minimum
+
+
+def week_view(cursor, first_day, resource_ids=None, type_filter=None):
+    """The admin week view as text: free units per resource per day (the day's minimum) / total."""
+    start = datetime.datetime.combine(first_day, datetime.time())
+    end = start + datetime.timedelta(days=WEEK_DAYS)
+    calendar, resources = availability(cursor, start, end, resource_ids)
+
+    boundaries = day_starts(first_day, WEEK_DAYS)
+    days = boundaries[:-1]
+    header = f"{'ID':<6} | {'Name':<25} | {'Total':<5} | " + " | ".join(f"{day:%a %d}" for day in days)
+    lines = [header, "-" * len(header)]
+    for resource_id, (name, kind, quantity) in sorted(resources.items(), key=lambda item: item[1][0]):
+        if type_filter and (kind or "").lower() != type_filter.lower():
+            continue
+        cells = " | ".join(f"{free:<6}" if free else f"{'none':<6}"
+                           for free in daily_minimum(calendar[resource_id], boundaries))
+        lines.append(f"{resource_id:<6} | {name[:25]:<25} | {quantity:<5} | {cells}")
+    return "\n".join(lines)
+
+
+def day_view(cursor, resource_id, day):
+    """One resource's free units through one day, as text lines ('09:00-12:00  3 of 5 free')."""
+    start = datetime.datetime.combine(day, datetime.time())
+    end = start + datetime.timedelta(days=1)
+    calendar, resources = availability(cursor, start, end, [resource_id])
+    if resource_id not in resources:
+        return []
+    quantity = resources[resource_id][2]
+    steps = calendar[resource_id]
+    lines = []
+    for i, (at, free) in enumerate(steps):
+        until = steps[i + 1][0] if i + 1 < len(steps) else end
+        label = "24:00" if until == end else f"{until:%H:%M}"
+        lines.append(f"{at:%H:%M}-{label}  {free} of {quantity} free")
+    return lines
@@ -0,0 +1,353 @@
+"""
+Session trace recorder and load replayer.
+
+Recording: with PESU_TRACE=<file> the portal appends every input() it asks
+to a JSON-lines trace: which function asked, the prompt, the answer, and
+when the prompt appeared and was answered (seconds since the session
+started). Each session starts with a header carrying its wall-clock start,
+so traces from many consoles can be concatenated and replayed on one
+timeline.
+
+Replaying: `python session_trace.py replay trace.jsonl` re-drives every
+recorded session headlessly through mysqlconnector.main_menu against the
+database selected as usual (PESU_DB_BACKEND, PESU_DB_PROFILE, ...). Use a
+local or scratch database: replayed bookings and edits really happen.
+Sessions keep their relative start times and think times, divided by
+--speed (1 = real time, 100 = a hundred times faster). They are spread
+over --workers processes, one thread and one connection per session;
+--copies replays every session several times over to multiply the load.
+
+An operation is one menu choice, from the answer at a portal menu to the
+next menu prompt. Its latency excludes the (replayed) think time at the
+prompts inside it. Operations are named after the function the menu choice
+calls, read from mysqlconnector's menus. An operation whose output reports
+an error, a conflict or a busy system counts as an error. A session whose
+prompts stop matching the trace (the data differs from the recording) is
+reported as diverged. Its answers are still replayed in order.
+
+    PESU_TRACE=traces/9am.jsonl python mysqlconnector.py
+    python session_trace.py replay traces/9am.jsonl --speed 20 --workers 8
+    python session_trace.py summary traces/9am.jsonl
+"""
+import argparse
+import ast
+import builtins
+import collections
+import datetime
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+import audit_log
+
+TRACE_PATH = os.environ.get("PESU_TRACE", "")
+MENU_PROMPT = "Enter your choice: "
+MENU_FUNCTIONS = ("main_menu", "student_portal", "admin_portal")
+ERROR_MARKERS = ("error", "❌", "conflict", "failed", "busy")
+_SKIPPED_MODULES = {__name__, "action_profiler"}
+
+_trace_file = None
+_trace_lock = threading.Lock()
+
+
+def _asked_by():
+    """Name of the portal function that called input(), skipping wrappers around it."""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_globals.get("__name__") in _SKIPPED_MODULES:
+        frame = frame.f_back
+    return frame.f_code.co_name if frame is not None else "?"
+
+
+# --- Recording ---
+
+def start_recording(path=TRACE_PATH):
+    """Wraps builtins.input so every prompt and answer is appended to `path`. No-op if `path` is empty."""
+    global _trace_file
+    if not path or _trace_file is not None:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    _trace_file = open(path, "a", encoding="utf-8", buffering=1)
+    session = f"{socket.gethostname()}-{os.getpid()}-{time.time_ns()}"
+    started = time.perf_counter()
+    _write({"type": "session", "session": session, "start": datetime.datetime.now().isoformat()})
+    original_input = builtins.input
+
+    def recording_input(prompt=""):
+        asked_by = _asked_by()
+        asked = time.perf_counter() - started
+        answer = original_input(prompt)
+        _write({"type": "input", "session": session, "asked": round(asked, 4),
+                "answered": round(time.perf_counter() - started, 4), "asked_by": asked_by,
+                "prompt": prompt, "answer": answer})
+        return answer
+
+    builtins.input = recording_input
+
+
+def _write(record):
+    with _trace_lock:
+        _trace_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def stop_recording():
+    global _trace_file
+    if _trace_file is not None:
+        _trace_file.close()
+        _trace_file = None
+
+
+# --- Reading traces ---
+
+def load_sessions(path):
+    """Returns [{"session", "start" (datetime), "inputs": [record, ...]}] ordered by start."""
+    sessions = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["type"] == "session":
+                sessions[record["session"]] = {"session": record["session"],
+                                               "start": datetime.datetime.fromisoformat(record["start"]),
+                                               "inputs": []}
+            elif record["session"] in sessions:
+                sessions[record["session"]]["inputs"].append(record)
+    return sorted((s for s in sessions.values() if s["inputs"]), key=lambda s: s["start"])
+
+
+def menu_actions(source_path=None):
+    """
+    {(menu function, choice): called function} read from mysqlconnector's
+    `if choice == "N": some_action(...)` branches, for naming operations.
+    """
+    source_path = source_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), "mysqlconnector.py")
+    with open(source_path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    ignored = set(dir(builtins))
+    actions = {}
+    for func in tree.body:
+        if not isinstance(func, ast.FunctionDef) or func.name not in MENU_FUNCTIONS:
+            continue
+        for node in ast.walk(func):
+            test = getattr(node, "test", None) if isinstance(node, ast.If) else None
+            if not (isinstance(test, ast.Compare) and isinstance(test.left, ast.Name) and test.left.id == "choice"
+                    and isinstance(test.comparators[0], ast.Constant)):
+                continue
+            calls = (call for stmt in node.body for call in ast.walk(stmt)
+                     if isinstance(call, ast.Call) and isinstance(call.func, ast.Name) and call.func.id not in ignored)
+            called = next(calls, None)
+            if called is not None:
+                actions[(func.name, str(test.comparators[0].value))] = called.func.id
+    return actions
+
+
+def operation_name(actions, asked_by, answer):
+    return actions.get((asked_by, answer.strip()), f"{asked_by}:{answer.strip()}")
+
+
+# --- Replaying ---
+
+class _Driver:
+    """Feeds one session's answers to input() and times its operations."""
+
+    def __init__(self, inputs, speed, actions):
+        self.inputs = iter(inputs)
+        self.speed = speed
+        self.actions = actions
+        self.results = []            # (operation, latency seconds, error)
+        self.diverged = False
+        self.operation = None
+        self.op_started = 0.0
+        self.op_waited = 0.0
+        self.op_error = False
+
+    def _close_operation(self):
+        if self.operation is not None:
+            latency = time.perf_counter() - self.op_started - self.op_waited
+            self.results.append((self.operation, latency, self.op_error))
+            self.operation = None
+
+    def input(self, prompt, asked_by):
+        menu = prompt == MENU_PROMPT and asked_by in MENU_FUNCTIONS
+        if menu:
+            self._close_operation()
+        record = next(self.inputs, None)
+        if record is None:
+            raise EOFError("end of trace")
+        if record["prompt"] != prompt or record["asked_by"] != asked_by:
+            self.diverged = True
+        think = max(record["answered"] - record["asked"], 0.0) / self.speed
+        time.sleep(think)
+        if menu:
+            self.operation = operation_name(self.actions, asked_by, record["answer"])
+            self.op_started, self.op_waited, self.op_error = time.perf_counter(), 0.0, False
+        else:
+            self.op_waited += think
+        return record["answer"]
+
+    def write(self, text):
+        if self.operation is not None and not self.op_error:
+            lowered = text.lower()
+            self.op_error = any(marker in lowered for marker in ERROR_MARKERS)
+
+    def finish(self):
+        self._close_operation()
+
+
+_local = threading.local()
+
+
+def _routed_input(prompt=""):
+    return _local.driver.input(prompt, _asked_by())
+
+
+class _RoutedStdout(io.TextIOBase):
+    """stdout for replay threads: each thread's output goes to its own driver."""
+
+    def write(self, text):
+        driver = getattr(_local, "driver", None)
+        if driver is not None:
+            driver.write(text)
+        return len(text)
+
+
+def _replay_session(session, offset, speed, start_at, profile_name, actions, outcomes):
+    import db_profiles
+    import mysqlconnector
+
+    driver = _Driver(session["inputs"], speed, actions)
+    _local.driver = driver
+    time.sleep(max(start_at + offset / speed - time.time(), 0.0))
+    outcome = "completed"
+    conn = None
+    try:
+        conn = db_profiles.connect(profile_name)
+        cursor = conn.cursor()
+        mysqlconnector.main_menu(cursor, conn)
+    except EOFError:
+        pass                          # the trace ended without an explicit exit
+    except Exception as err:          # a crash ends the session, not the replay
+        outcome = f"aborted: {type(err).__name__}: {err}"
+    finally:
+        driver.finish()
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+    outcomes.append((outcome, driver.diverged, driver.results))
+
+
+def _replay_worker(sessions, speed, start_at, profile_name):
+    """Runs in a worker process: one thread per (session, offset)."""
+    actions = menu_actions()
+    builtins.input = _routed_input
+    sys.stdout = _RoutedStdout()
+    outcomes = []
+    threads = [threading.Thread(target=_replay_session,
+                                args=(session, offset, speed, start_at, profile_name, actions, outcomes))
+               for session, offset in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    audit_log.shutdown()
+    return outcomes
+
+
+def replay(sessions, speed=1.0, workers=4, copies=1, profile_name=None, stagger=0.0):
+    """Replays `sessions` and returns (outcomes, wall seconds)."""
+    first = sessions[0]["start"]
+    planned = []
+    for copy in range(copies):
+        for session in sessions:
+            planned.append((session, (session["start"] - first).total_seconds() + copy * stagger))
+    batches = [planned[n::workers] for n in range(workers)]
+    batches = [batch for batch in batches if batch]
+    start_at = time.time() + 1.0      # lets every worker process start before the first session
+    with multiprocessing.Pool(len(batches)) as pool:
+        results = pool.starmap(_replay_worker, [(batch, speed, start_at, profile_name) for batch in batches])
+    wall = time.time() - start_at
+    return [outcome for batch in results for outcome in batch], wall
+
+
+def _percentile(samples, fraction):
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+
+def report(outcomes, wall):
+    per_operation = collections.defaultdict(list)
+    errors = collections.Counter()
+    for _, _, results in outcomes:
+        for operation, latency, error in results:
+            per_operation[operation].append(latency * 1000)
+            errors[operation] += error
+    aborted = [outcome for outcome, _, _ in outcomes if outcome != "completed"]
+    diverged = sum(1 for _, was_diverged, _ in outcomes if was_diverged)
+    total_ops = sum(len(samples) for samples in per_operation.values())
+
+    print(f"\nReplayed {len(outcomes)} sessions in {wall:.1f}s: {len(outcomes) - len(aborted)} completed, "
+          f"{len(aborted)} aborted, {diverged} diverged from the trace. "
+          f"{total_ops} operations, {total_ops / wall if wall else 0:.1f} ops/s.")
+    header = (f"{'Operation':<28} | {'Count':<6} | {'Ops/s':<7} | {'Errors':<6} | {'Err %':<6} | "
+              f"{'p50 ms':<8} | {'p95 ms':<8} | {'p99 ms':<8} | {'Max ms':<8}")
+    print(header)
+    print("-" * len(header))
+    for operation, samples in sorted(per_operation.items(), key=lambda item: -len(item[1])):
+        samples.sort()
+        print(f"{operation:<28} | {len(samples):<6} | {len(samples) / wall if wall else 0:<7.2f} | "
+              f"{errors[operation]:<6} | {100 * errors[operation] / len(samples):<6.1f} | "
+              f"{statistics.median(samples):<8.2f} | {_percentile(samples, 0.95):<8.2f} | "
+              f"{_percentile(samples, 0.99):<8.2f} | {samples[-1]:<8.2f}")
+    for outcome in itertools.islice(sorted(set(aborted)), 5):
+        print(f"  {outcome}")
+
+
+def summarize(sessions):
+    actions = menu_actions()
+    counts = collections.Counter()
+    for session in sessions:
+        for record in session["inputs"]:
+            if record["prompt"] == MENU_PROMPT and record["asked_by"] in MENU_FUNCTIONS:
+                counts[operation_name(actions, record["asked_by"], record["answer"])] += 1
+    span = (sessions[-1]["start"] - sessions[0]["start"]).total_seconds() if sessions else 0
+    print(f"{len(sessions)} sessions starting over {span:.0f}s, "
+          f"{sum(len(s['inputs']) for s in sessions)} answered prompts")
+    for operation, count in counts.most_common():
+        print(f"{operation:<28} {count}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["replay", "summary"])
+    parser.add_argument("trace", help="JSON-lines trace written with PESU_TRACE")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression, 1 (real time) to 100")
+    parser.add_argument("--workers", type=int, default=4, help="replay processes")
+    parser.add_argument("--copies", type=int, default=1, help="replay every session this many times")
+    parser.add_argument("--stagger", type=float, default=0.0, help="seconds (trace time) between copies")
+    parser.add_argument("--profile", help="connection profile (default PESU_DB_PROFILE)")
+    args = parser.parse_args(argv)
+
+    sessions = load_sessions(args.trace)
+    if not sessions:
+        print("The trace has no sessions.")
+        return 1
+    if args.command == "summary":
+        summarize(sessions)
+        return 0
+    if not 1 <= args.speed <= 100:
+        parser.error("--speed must be between 1 and 100")
+    outcomes, wall = replay(sessions, args.speed, args.workers, args.copies, args.profile, args.stagger)
+    report(outcomes, wall)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Shared cross-process cache for event listings and ticket availability.
+
+Every console / worker process on the machine maps the same file. The file
+holds a small header with a global version counter and a fixed number of
+slots. A key hashes to one slot; a newer entry simply overwrites whatever
+was there. Readers are lock-free and use a per-slot sequence number (odd
+while a write is in progress) to detect torn reads. Writers serialise on
+a file lock.
+
+Invalidation is by version key: every cached name is stored as
+"<name>:v<version>", so bump_version() makes all old entries unreachable
+at once without touching them. get() returns the version it looked under,
+and put() stores under that same version: a write committed between the
+lookup and the store bumps the version, so the stale rows are filed under
+a version nobody reads any more.
+
+Entries are JSON (dates, times, decimals and tuples tagged so they come
+back as the same types), never pickle, and the file lives in a directory
+only the current user can open: by default <tmp>/pesu-cache-<uid>, created
+0700. A file or directory owned by someone else, or open to other users,
+is refused and the portal runs uncached.
+"""
+import datetime
+import decimal
+import json
+import mmap
+import os
+import stat
+import struct
+import tempfile
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CACHE_DISABLED = os.environ.get("PESU_CACHE_DISABLED") == "1"
+CACHE_DIR = os.path.join(tempfile.gettempdir(), f"pesu-cache-{os.getuid() if hasattr(os, 'getuid') else 'user'}")
+CACHE_PATH = os.environ.get("PESU_CACHE_PATH", os.path.join(CACHE_DIR, "event_cache.bin"))
+SLOT_COUNT = 128
+SLOT_SIZE = 128 * 1024
+EVENT_LIST_TTL = 30      # seconds; listings depend on NOW() so they must age out
+AVAILABILITY_TTL = 5     # seconds; purchases change availability without bumping the version
+
+_MAGIC = b"PESUCCH2"   # bumped when entries moved from pickle to JSON
+_HEADER = struct.Struct("<8sQII")          # magic, version, slot_count, slot_size
+_SLOT_HEADER = struct.Struct("<QIdI")      # seq, key_crc, expires_at, payload_len
+_HEADER_SIZE = 64
+
+
+def _check_private(path, st):
+    """Raises OSError unless `st` belongs to the current user and is closed to everyone else."""
+    if hasattr(os, "getuid") and (st.st_uid != os.getuid() or st.st_mode & 0o077):
+        raise OSError(f"refusing cache path {path}: not private to this user")
+
+
+def private_dir(path):
+    """Creates the cache directory 0700 if needed and checks that it is ours."""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        raise OSError(f"refusing cache path {path}: not a directory")
+    _check_private(path, st)
+
+
+def _encode(value):
+    if isinstance(value, tuple):
+        return {"__t": "tuple", "v": [_encode(item) for item in value]}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, datetime.datetime):
+        return {"__t": "datetime", "v": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"__t": "date", "v": value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {"__t": "timedelta", "v": value.total_seconds()}
+    if isinstance(value, datetime.time):
+        return {"__t": "time", "v": value.isoformat()}
+    if isinstance(value, decimal.Decimal):
+        return {"__t": "decimal", "v": str(value)}
+    return value
+
+
+_DECODERS = {
+    "tuple": tuple,
+    "datetime": datetime.datetime.fromisoformat,
+    "date": datetime.date.fromisoformat,
+    "timedelta": lambda seconds: datetime.timedelta(seconds=seconds),
+    "time": datetime.time.fromisoformat,
+    "decimal": decimal.Decimal,
+}
+
+
+def _decode(obj):
+    if "__t" in obj:
+        return _DECODERS[obj["__t"]](obj["v"])
+    return obj
+
+
+def dumps(key, value):
+    return json.dumps([key, _encode(value)], separators=(",", ":")).encode("utf-8")
+
+
+def loads(payload):
+    """(key, value) from a slot payload. Raises ValueError on anything malformed."""
+    try:
+        key, value = json.loads(payload.decode("utf-8"), object_hook=_decode)
+    except (KeyError, TypeError, UnicodeDecodeError) as err:
+        raise ValueError(f"bad cache entry: {err}") from err
+    return key, value
+
+
+class SharedCache:
+    """An mmap-backed key/value store shared by every process that opens the same file."""
+
+    def __init__(self, path=CACHE_PATH, slot_count=SLOT_COUNT, slot_size=SLOT_SIZE):
+        self.path = path
+        size = _HEADER_SIZE + slot_count * slot_size
+        if path == CACHE_PATH and "PESU_CACHE_PATH" not in os.environ:
+            private_dir(CACHE_DIR)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+        try:
+            _check_private(path, os.fstat(fd))
+        except OSError:
+            os.close(fd)
+            raise
+        self._file = os.fdopen(fd, "r+b")
+        self._lock()
+        try:
+            if os.fstat(fd).st_size < size:
+                self._file.truncate(size)
+            self._map = mmap.mmap(fd, 0)
+            magic, _, existing_slots, existing_size = _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC:
+                _HEADER.pack_into(self._map, 0, _MAGIC, 1, slot_count, slot_size)
+            else:
+                slot_count, slot_size = existing_slots, existing_size
+        finally:
+            self._unlock()
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+
+    def _lock(self):
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock(self):
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _slot_offset(self, key_crc):
+        return _HEADER_SIZE + (key_crc % self.slot_count) * self.slot_size
+
+    def version(self):
+        return _HEADER.unpack_from(self._map, 0)[1]
+
+    def bump_version(self):
+        """Invalidates every cached entry by moving to a new version key."""
+        self._lock()
+        try:
+            magic, version, slots, size = _HEADER.unpack_from(self._map, 0)
+            _HEADER.pack_into(self._map, 0, magic, version + 1, slots, size)
+        finally:
+            self._unlock()
+
+    def get(self, key):
+        """Returns the cached value, or None on a miss, expiry, or torn read."""
+        key_bytes = key.encode()
+        key_crc = zlib.crc32(key_bytes)
+        offset = self._slot_offset(key_crc)
+        for _ in range(3):
+            seq, slot_crc, expires_at, length = _SLOT_HEADER.unpack_from(self._map, offset)
+            if seq % 2 == 1:
+                continue  # a writer is mid-update
+            if seq == 0 or slot_crc != key_crc or expires_at < time.time():
+                return None
+            start = offset + _SLOT_HEADER.size
+            payload = self._map[start:start + length]
+            if _SLOT_HEADER.unpack_from(self._map, offset)[0] != seq:
+                continue  # overwritten while we were copying
+            try:
+                stored_key, value = loads(payload)
+            except ValueError:
+                return None
+            return value if stored_key == key else None
+        return None
+
+    def set(self, key, value, ttl):
+        """Stores a value; silently skips values too large for one slot."""
+        key_bytes = key.encode()
+        key_crc = zlib.crc32(key_bytes)
+        payload = dumps(key, value)
+        if len(payload) > self.slot_size - _SLOT_HEADER.size:
+            return False
+        offset = self._slot_offset(key_crc)
+        self._lock()
+        try:
+            seq = _SLOT_HEADER.unpack_from(self._map, offset)[0]
+            _SLOT_HEADER.pack_into(self._map, offset, seq + 1 if seq % 2 == 0 else seq, 0, 0.0, 0)
+            start = offset + _SLOT_HEADER.size
+            self._map[start:start + len(payload)] = payload
+            next_seq = (seq + 2) if seq % 2 == 0 else (seq + 1)
+            _SLOT_HEADER.pack_into(self._map, offset, next_seq, key_crc, time.time() + ttl, len(payload))
+        finally:
+            self._unlock()
+        return True
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+_cache = None
+_cache_failed = False
+
+
+def _get_cache():
+    global _cache, _cache_failed
+    if CACHE_DISABLED:
+        return None
+    if _cache is None and not _cache_failed:
+        try:
+            _cache = SharedCache()
+        except (OSError, ValueError):
+            _cache_failed = True  # run uncached rather than fail the portal
+    return _cache
+
+
+def get(name):
+    """
+    Looks up `name` under the current version. Returns (value, version); a None
+    value means 'go to the database', then put() the result with this version.
+    """
+    cache = _get_cache()
+    if cache is None:
+        return None, None
+    version = cache.version()
+    return cache.get(f"{name}:v{version}"), version
+
+
+def put(name, value, ttl, version):
+    """Stores `value` under the version get() returned before the database was read."""
+    cache = _get_cache()
+    if cache is not None and version is not None:
+        cache.set(f"{name}:v{version}", value, ttl)
+
+
+def invalidate():
+    """Call after committing any write that changes event listings or ticket types."""
+    cache = _get_cache()
+    if cache is not None:
+        cache.bump_version()
@@ -0,0 +1,56 @@
+"""
+Precomputed per-student registration view.
+
+tbl_student_registrations holds one row per (student, event) registration
+with the event fields my_registrations prints, clustered on
+(user_id, event_end, event_id). "My upcoming registrations" is then a single
+range read of one student's rows that end after NOW(), with no joins.
+
+The rows are written in the same transaction as the change they mirror:
+add() next to every tbl_event_participants insert, remove() next to every
+delete, and refresh_event() whenever an event's name, time or venue changes.
+"""
+
+_INSERT_FROM_PARTICIPANTS = """
+    INSERT IGNORE INTO tbl_student_registrations
+        (user_id, event_end, event_id, event_name, event_date, start_time, venue_name)
+    SELECT p.user_id, CONCAT(e.date, ' ', e.end_time), e.id, e.name, e.date, e.start_time, v.name
+    FROM tbl_event_participants p
+    JOIN tbl_events e ON p.event_id = e.id
+    LEFT JOIN tbl_venues v ON e.location_id = v.id
+"""
+
+BACKFILL_SQL = _INSERT_FROM_PARTICIPANTS
+
+
+def add(cursor, registrations):
+    """Mirrors freshly inserted participant rows; `registrations` is a list of (event_id, user_id)."""
+    cursor.executemany(_INSERT_FROM_PARTICIPANTS + " WHERE p.event_id = %s AND p.user_id = %s", registrations)
+
+
+def remove(cursor, event_id, user_id):
+    cursor.execute("DELETE FROM tbl_student_registrations WHERE user_id = %s AND event_id = %s", (user_id, event_id))
+
+
+def refresh_event(cursor, event_id):
+    """Rewrites every registration row of an event after its name, time or venue changed."""
+    cursor.execute("DELETE FROM tbl_student_registrations WHERE event_id = %s", (event_id,))
+    cursor.execute(_INSERT_FROM_PARTICIPANTS + " WHERE p.event_id = %s", (event_id,))
+
+
+def rebuild(cursor, conn):
+    """Recomputes the whole view from tbl_event_participants."""
+    cursor.execute("DELETE FROM tbl_student_registrations")
+    cursor.execute(BACKFILL_SQL)
+    conn.commit()
+
+
+def upcoming(cursor, user_id):
+    """(event_id, name, date, start_time, venue) for the student's events that have not ended yet."""
+    cursor.execute("""
+        SELECT event_id, event_name, event_date, start_time, venue_name
+        FROM tbl_student_registrations
+        WHERE user_id = %s AND event_end > NOW()
+        ORDER BY event_end
+    """, (user_id,))
+    return cursor.fetchall()
@@ -0,0 +1,243 @@
+"""
+Buffered table rendering for the portal listings.
+
+render() prints a table from any iterable of rows: a fetched list or, for
+large listings, stream(cursor), which pulls rows with fetchmany() so the
+table starts printing before the whole result is in memory. Column widths
+come from the header and the first SAMPLE_ROWS rows, capped per column;
+longer cells are cut so the columns stay aligned. Rows are
+formatted CHUNK_ROWS at a time and written with one write() per chunk
+instead of one print() per row.
+
+When stdout is a terminal and the table is longer than the screen, the
+output goes through a pager: PESU_PAGER, else $PAGER, else "less -FRX".
+PESU_PAGER=off always prints straight through.
+
+Inside `with export_to(path):` the next table rendered in this thread is
+streamed to a file instead of the screen, untruncated. The format follows
+the extension: .csv, .json (one array) or .jsonl (one object per line).
+"""
+import contextlib
+import csv
+import itertools
+import json
+import operator
+import os
+import shutil
+import subprocess
+import sys
+import threading
+
+SAMPLE_ROWS = 200     # rows looked at to size the columns
+CHUNK_ROWS = 500      # rows formatted per write()
+MAX_WIDTH = 40        # default cap on a column's width
+EXPORT_FORMATS = (".csv", ".json", ".jsonl")
+
+_local = threading.local()
+
+
+class Column:
+    """
+    One table column. `value` is the row index to show, or a function of
+    the row; by default a column shows the row item at its own position.
+    """
+    __slots__ = ("title", "value", "max_width")
+
+    def __init__(self, title, value=None, max_width=MAX_WIDTH):
+        self.title = title
+        self.value = value
+        self.max_width = max_width
+
+
+def columns(*specs):
+    """Columns from titles, or from (title, value[, max_width]) tuples."""
+    return [Column(spec) if isinstance(spec, str) else Column(*spec) for spec in specs]
+
+
+def _getters(columns):
+    getters = []
+    for position, column in enumerate(columns):
+        value = position if column.value is None else column.value
+        getters.append(value if callable(value) else operator.itemgetter(value))
+    return getters
+
+
+def _text(value):
+    return "" if value is None else str(value)
+
+
+def stream(cursor, size=CHUNK_ROWS):
+    """Yields the cursor's remaining rows, fetching `size` at a time."""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield from rows
+
+
+def autosize(columns, sample):
+    """Column widths fitting the titles and the sampled cells, within each column's cap."""
+    getters = _getters(columns)
+    widths = []
+    for column, get in zip(columns, getters):
+        longest = max((len(_text(get(row))) for row in sample), default=0)
+        widths.append(min(max(len(column.title), longest), max(column.max_width, len(column.title))))
+    return widths
+
+
+def _row_formatter(columns, widths):
+    """(header line, function formatting one row into a padded, truncated table line)."""
+    getters = _getters(columns)
+    template = " | ".join(f"{{:<{width}.{width}}}" for width in widths)
+    return (template.format(*[column.title for column in columns]),
+            lambda row: template.format(*["" if value is None else str(value)
+                                          for value in [get(row) for get in getters]]))
+
+
+def _pager_command():
+    setting = os.environ.get("PESU_PAGER", "")
+    if setting.lower() in ("off", "0", "false", "none"):
+        return None
+    return setting or os.environ.get("PAGER") or "less -FRX"
+
+
+class _Screen:
+    """Collects output until it outgrows the terminal, then hands it to a pager (or straight to stdout)."""
+
+    def __init__(self):
+        self.pending = []
+        self.lines = 0
+        self.pager = None
+        self.closed = False   # the user quit the pager early
+        isatty = getattr(sys.stdout, "isatty", None)
+        self.command = _pager_command() if isatty and isatty() else None
+        self.limit = shutil.get_terminal_size().lines - 1 if self.command else 0
+
+    def write(self, lines):
+        if self.closed:
+            return
+        text = "\n".join(lines) + "\n"
+        if self.command and self.pager is None:
+            self.pending.append(text)
+            self.lines += len(lines)
+            if self.lines <= self.limit:
+                return
+            try:
+                self.pager = subprocess.Popen(self.command, shell=True, stdin=subprocess.PIPE,
+                                              text=True, encoding="utf-8", errors="replace")
+            except OSError:
+                self.command = None
+            text, self.pending = "".join(self.pending), []
+        target = self.pager.stdin if self.pager else sys.stdout
+        try:
+            target.write(text)
+        except BrokenPipeError:
+            self.closed = True
+
+    def close(self):
+        if self.pending:
+            sys.stdout.write("".join(self.pending))
+        if self.pager:
+            try:
+                self.pager.stdin.close()
+            except BrokenPipeError:
+                pass
+            self.pager.wait()
+        else:
+            sys.stdout.flush()
+
+
+def render(columns, rows, empty_message=None):
+    """
+    Prints `rows` as a table (or exports them, see export_to). Prints
+    `empty_message` if there are none. Returns the number of rows.
+    """
+    rows = iter(rows)
+    sample = list(itertools.islice(rows, SAMPLE_ROWS))
+    if not sample:
+        if empty_message:
+            print(empty_message)
+        return 0
+    if getattr(_local, "export_path", None):
+        path, _local.export_path = _local.export_path, None
+        return export(columns, itertools.chain(sample, rows), path)
+
+    screen = _Screen()
+    count = _write_chunks(screen, columns, sample, rows)
+    screen.close()
+    return count
+
+
+def _write_chunks(out, columns, sample, rows):
+    """Formats the table CHUNK_ROWS rows at a time into out.write(lines). Returns the number of rows."""
+    widths = autosize(columns, sample)
+    header, format_row = _row_formatter(columns, widths)
+    out.write([header, "-" * (sum(widths) + 3 * (len(widths) - 1))])
+    count = 0
+    chunk = sample
+    while chunk:
+        count += len(chunk)
+        if not getattr(out, "closed", False):
+            out.write([format_row(row) for row in chunk])
+        # Keep reading after the pager is quit: an unbuffered cursor must be drained
+        chunk = list(itertools.islice(rows, CHUNK_ROWS))
+    return count
+
+
+class _LineWriter:
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, lines):
+        self.f.write("\n".join(lines) + "\n")
+
+
+def write_table(f, columns, rows, empty_message=None):
+    """render() into an open text file `f` (no pager, no export). Returns the number of rows."""
+    rows = iter(rows)
+    sample = list(itertools.islice(rows, SAMPLE_ROWS))
+    if not sample:
+        if empty_message:
+            f.write(empty_message + "\n")
+        return 0
+    return _write_chunks(_LineWriter(f), columns, sample, rows)
+
+
+def export(columns, rows, path):
+    """Streams rows to a .csv, .json or .jsonl file by column title. Returns the number of rows written."""
+    extension = os.path.splitext(path)[1].lower()
+    getters = _getters(columns)
+    titles = [column.title for column in columns]
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if extension == ".csv":
+            writer = csv.writer(f)
+            writer.writerow(titles)
+            for chunk in iter(lambda: list(itertools.islice(rows, CHUNK_ROWS)), []):
+                writer.writerows([_text(get(row)) for get in getters] for row in chunk)
+                count += len(chunk)
+        elif extension == ".jsonl":
+            for row in rows:
+                f.write(json.dumps(dict(zip(titles, (get(row) for get in getters))), default=str) + "\n")
+                count += 1
+        else:
+            f.write("[")
+            for row in rows:
+                f.write(("\n" if not count else ",\n")
+                        + json.dumps(dict(zip(titles, (get(row) for get in getters))), default=str))
+                count += 1
+            f.write("\n]\n")
+    print(f"Exported {count} rows to {path}")
+    return count
+
+
+@contextlib.contextmanager
+def export_to(path):
+    """Sends the next table rendered in this thread to `path` instead of the screen."""
+    if os.path.splitext(path)[1].lower() not in EXPORT_FORMATS:
+        raise ValueError(f"export file must end in one of {', '.join(EXPORT_FORMATS)}")
+    _local.export_path = path
+    try:
+        yield
+    finally:
+        _local.export_path = None
@@ -0,0 +1,44 @@
+"""
+Shared fixtures: every test gets a fresh, migrated SQLite database (see
+db_backends.SQLiteBackend), so the suite needs no MySQL server.
+"""
+import datetime
+import os
+import sys
+
+os.environ.setdefault("PESU_CACHE_DISABLED", "1")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pytest  # noqa: E402
+
+import audit_log  # noqa: E402
+import db_backends  # noqa: E402
+import migrations  # noqa: E402
+
+
+@pytest.fixture
+def connect(tmp_path, monkeypatch):
+    """A zero-argument callable opening connections to this test's database."""
+    monkeypatch.setattr(audit_log, "AUDIT_LOG_PATH", str(tmp_path / "audit_log.jsonl"))
+    backend = db_backends.SQLiteBackend(str(tmp_path / "pesu_test.sqlite3"))
+    yield backend.connect
+    audit_log.shutdown()
+
+
+@pytest.fixture
+def db(connect):
+    """(cursor, conn) on a migrated database with one venue, host, student and upcoming event."""
+    conn = connect()
+    cursor = conn.cursor()
+    migrations.migrate(cursor, conn)
+    cursor.execute("INSERT INTO tbl_venues (name, building, capacity) VALUES ('Hall A', 'Main', 200)")
+    cursor.execute("INSERT INTO tbl_hosts (name, email) VALUES ('Test Host', 'host@example.com')")
+    cursor.execute("INSERT INTO tbl_students (srn, name, semester) VALUES ('PES2UG23CS001', 'Student One', 5)")
+    cursor.execute("""
+        INSERT INTO tbl_events (name, date, start_time, end_time, location_id, organizer_id)
+        VALUES ('Test Event', %s, '10:00:00', '12:00:00', 1, 1)
+    """, (datetime.date.today() + datetime.timedelta(days=7),))
+    conn.commit()
+    yield cursor, conn
+    cursor.close()
+    conn.close()
@@ -0,0 +1,38 @@
+import audit_log
+
+
+def test_record_queues_and_shutdown_flushes(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit_log, "AUDIT_LOG_PATH", str(tmp_path / "audit_log.jsonl"))
+    try:
+        audit_log.record("cancel_registration", {"event_id": 1}, actor="student:1")
+    finally:
+        audit_log.shutdown()
+    entries = list(audit_log.read_entries())
+    assert [(e["operation"], e["actor"], e["params"]) for e in entries] == [
+        ("cancel_registration", "student:1", {"event_id": 1})]
+    assert audit_log.last_failure() is None
+
+
+def test_unwritable_log_is_reported_not_raised(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit_log, "AUDIT_LOG_PATH", str(tmp_path / "missing" / "audit_log.jsonl"))
+    monkeypatch.setattr(audit_log, "FLUSH_INTERVAL", 0.01)
+    monkeypatch.setattr(audit_log, "_failure", None)
+    try:
+        audit_log.record("cancel_registration", {"event_id": 1})
+        writer = audit_log.start()
+        while audit_log.last_failure() is None and writer.is_alive():
+            writer.join(0.01)
+        assert audit_log.last_failure() is not None
+        assert writer.is_alive()
+    finally:
+        audit_log.shutdown()
+
+
+def test_start_is_a_no_op_while_a_writer_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit_log, "AUDIT_LOG_PATH", str(tmp_path / "audit_log.jsonl"))
+    try:
+        writer = audit_log.start()
+        assert audit_log.start() is writer
+        assert audit_log.start(str(tmp_path / "other.jsonl")) is writer
+    finally:
+        audit_log.shutdown()
@@ -0,0 +1,46 @@
+import threading
+
+import availability_feed
+
+
+def test_changes_coalesce_to_the_latest_value_per_ticket():
+    feed = availability_feed.Feed()
+    after = feed.subscribe()
+    feed.publish({10: (1, 5)})
+    feed.publish({11: (1, 7)})
+    feed.publish({10: (1, 3)})
+
+    assert feed.changes(after, 0) == (3, {10: (1, 3), 11: (1, 7)})
+    assert feed.changes(2, 0) == (3, {10: (1, 3)})
+    assert feed.changes(3, 0) == (3, {})
+
+
+def test_changes_wakes_on_publish_and_returns_none_once_closed():
+    feed = availability_feed.Feed()
+    after = feed.subscribe()
+    threading.Timer(0.05, feed.publish, args=({10: (1, 4)},)).start()
+    assert feed.changes(after, 5) == (1, {10: (1, 4)})
+    feed.close()
+    assert feed.changes(1, 5) is None
+
+
+def test_watcher_deltas_follow_what_it_last_saw():
+    seen = {10: (1, 5), 20: (2, 9)}
+    # a watcher that skipped 5 -> 4 -> 3 still gets a delta that adds up; other events are filtered out
+    updates = availability_feed.watcher_updates(seen, {10: (1, 3), 20: (2, 1)}, {1})
+    assert updates == [{"ticket_id": 10, "event_id": 1, "remaining": 3, "delta": -2}]
+    assert seen == {10: (1, 3), 20: (2, 9)}
+
+    # unchanged values are not resent; a new ticket type starts from 0
+    updates = availability_feed.watcher_updates(seen, {10: (1, 3), 11: (1, 50)}, set())
+    assert updates == [{"ticket_id": 11, "event_id": 1, "remaining": 50, "delta": 50}]
+
+
+def test_feed_server_binds_to_localhost_by_default(monkeypatch, connect):
+    monkeypatch.setenv("PESU_FEED_PORT", "0")
+    monkeypatch.delenv("PESU_FEED_HOST", raising=False)
+    server = availability_feed.server_from_env(connect)
+    try:
+        assert server.httpd.server_address[0] == "127.0.0.1"
+    finally:
+        server.httpd.server_close()
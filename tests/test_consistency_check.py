@@ -0,0 +1,32 @@
+import datetime
+
+import consistency_check
+
+DAY = datetime.datetime(2030, 1, 7)
+
+
+def at(hour):
+    return DAY + datetime.timedelta(hours=hour)
+
+
+def test_peak_usage_treats_touching_bookings_as_sequential():
+    assert consistency_check.peak_usage([(at(9), at(12), 2), (at(12), at(14), 3)]) == (3, at(12))
+    assert consistency_check.peak_usage([(at(9), at(12), 2), (at(11), at(14), 3), (at(13), at(15), 1)]) == (5, at(11))
+    assert consistency_check.peak_usage([]) == (0, None)
+
+
+def test_capacity_and_maintenance_checks(db):
+    cursor, conn = db
+    cursor.execute("INSERT INTO tbl_resources (name, type, quantity) VALUES ('Chairs', 'Furniture', 4)")
+    resource_id = cursor.lastrowid
+    cursor.executemany("INSERT INTO tbl_event_resources (event_id, resource_id, quantity_booked, booking_start, "
+                       "booking_end) VALUES (1, %s, %s, %s, %s)",
+                       [(resource_id, 3, at(9), at(12)), (resource_id, 1, at(12), at(13)),
+                        (resource_id, 2, at(11), at(12))])
+    cursor.execute("INSERT INTO tbl_resource_maintenance (resource_id, maintenance_start, maintenance_end) "
+                   "VALUES (%s, %s, %s)", (resource_id, at(13), at(14)))   # touches the last booking only
+    conn.commit()
+
+    checked, violations = consistency_check._check_resource_capacity(cursor, resource_id, resource_id + 1)
+    assert (checked, violations) == (1, [{"resource_id": resource_id, "capacity": 4, "peak_booked": 5, "at": at(11)}])
+    assert consistency_check._check_resource_maintenance(cursor, resource_id, resource_id + 1) == (1, [])
@@ -0,0 +1,38 @@
+import re
+
+import db_backends
+import migrations
+
+
+def test_placeholders_and_functions_inside_literals_are_left_alone():
+    sql = "SELECT NOW(), 'NOW() at 50%s', \"%s\" FROM t WHERE a = %s AND b = 'it''s %s'"
+    assert db_backends.translate_sql(sql) == (
+        "SELECT datetime('now', 'localtime'), 'NOW() at 50%s', \"%s\" FROM t WHERE a = ? AND b = 'it''s %s'")
+
+
+def test_create_table_moves_inline_indexes_out():
+    statements = db_backends.translate_create_table("""
+        CREATE TABLE IF NOT EXISTS tbl_x (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            status VARCHAR(16) NOT NULL,
+            INDEX idx_x_status (status, id)
+        ) ENGINE=InnoDB
+    """)
+    assert " ".join(statements[0].split()) == (
+        "CREATE TABLE IF NOT EXISTS tbl_x ( id INTEGER PRIMARY KEY AUTOINCREMENT, status VARCHAR(16) NOT NULL )")
+    assert statements[1:] == ["CREATE INDEX IF NOT EXISTS idx_x_status ON tbl_x (status, id)"]
+
+
+def test_migrations_build_the_whole_sqlite_schema(db):
+    cursor, conn = db
+    expected = {name for _, _, statements in migrations.MIGRATIONS for statement in statements
+                for name in re.findall(r"CREATE TABLE IF NOT EXISTS (\w+)", statement)}
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'tbl_%'")
+    assert {row[0] for row in cursor.fetchall()} == expected | {"tbl_schema_migrations"}
+    assert migrations.migrate(cursor, conn) == []
+
+    # LIKE copies keys and indexes but, as in MySQL, not the foreign keys
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tbl_event_feedback_archive'")
+    assert "uq_feedback_event_user_tbl_event_feedback_archive" in {row[0] for row in cursor.fetchall()}
+    cursor.execute("INSERT INTO tbl_event_feedback_archive (event_id, user_id, rating, submitted_at) "
+                   "VALUES (999, 999, 5, CURRENT_TIMESTAMP)")
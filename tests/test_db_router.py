@@ -0,0 +1,67 @@
+import mysql.connector
+import pytest
+
+import db_router
+
+
+@pytest.fixture
+def lag(monkeypatch):
+    """The simulated replica's lag in seconds; re-measured on every read."""
+    monkeypatch.setattr(db_router, "LAG_CHECK_INTERVAL", 0)
+    return {"seconds": 0.0}
+
+
+@pytest.fixture
+def router(db, connect, lag):
+    cursor, _ = db
+    replica = db_router.simulated_replica("replica-1", connect, lambda: lag["seconds"])
+    router = db_router.Router(cursor, [replica], max_staleness=5, read_your_writes=30)
+    yield router
+    router.close()
+
+
+def test_fresh_replica_serves_reads(db, router):
+    cursor, _ = db
+    read = router.read_cursor()
+    assert read is not cursor
+    read.execute("SELECT name FROM tbl_events WHERE id = 1")
+    assert read.fetchone() == ("Test Event",)
+    assert router.stats == {"primary": 0, "replica": 1}
+
+
+def test_stale_replica_falls_back_to_primary(db, router, lag):
+    cursor, _ = db
+    assert router.read_cursor() is not cursor
+    lag["seconds"] = 12.0
+    assert router.read_cursor() is cursor
+    lag["seconds"] = 1.0
+    assert router.read_cursor() is not cursor
+
+
+def test_unreachable_replica_falls_back_to_primary(db, lag):
+    cursor, _ = db
+
+    def down():
+        raise mysql.connector.errors.InterfaceError("2003: Can't connect to MySQL server")
+
+    router = db_router.Router(cursor, [db_router.simulated_replica("down", down, 0)])
+    assert router.read_cursor() is cursor
+    assert router.stats == {"primary": 1, "replica": 0}
+
+
+def test_recent_writer_reads_from_primary(db, router):
+    cursor, _ = db
+    router.note_write(1)
+    assert router.read_cursor(user_id=1) is cursor
+    assert router.read_cursor(user_id=2) is not cursor
+
+
+def test_only_primary_cursors_count_as_primary_reads(db, router):
+    cursor, _ = db
+    assert not db_router.is_replica(cursor)
+    db_router.install(router)
+    try:
+        assert db_router.is_replica(db_router.read_cursor(cursor))
+        assert not db_router.is_replica(cursor)
+    finally:
+        db_router.uninstall()
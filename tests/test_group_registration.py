@@ -0,0 +1,23 @@
+import datetime
+
+import group_registration
+
+
+def test_conflict_in_a_later_chunk_keeps_earlier_chunks_registered(db, monkeypatch):
+    cursor, conn = db
+    monkeypatch.setattr(group_registration, "INSERT_CHUNK", 4)
+    cursor.executemany("INSERT INTO tbl_students (srn, name, semester) VALUES (%s, %s, 5)",
+                       [(f"PES2UG23CS{n:03d}", f"Student {n}") for n in range(2, 11)])
+    # slipped in after already_registered() was checked
+    cursor.execute("INSERT INTO tbl_event_participants (event_id, user_id, registration_time) "
+                   "VALUES (1, 7, CURRENT_TIMESTAMP)")
+    conn.commit()
+
+    user_ids = list(range(1, 11))
+    registered, duplicates = group_registration.insert_registrations(
+        cursor, 1, user_ids, datetime.datetime.now())
+
+    assert duplicates == [7]
+    assert registered == [u for u in user_ids if u != 7]
+    cursor.execute("SELECT COUNT(*) FROM tbl_event_participants WHERE event_id = 1")
+    assert cursor.fetchone() == (10,)
@@ -0,0 +1,84 @@
+import mysql.connector
+import pytest
+
+import kiosk
+
+
+def _offline():
+    raise mysql.connector.errors.InterfaceError("2003: Can't connect to MySQL server")
+
+
+class _CommitLost:
+    """A connection whose commits never reach the server, as if the link dropped at COMMIT."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self):
+        return self.conn.cursor()
+
+    def commit(self):
+        self.conn.rollback()
+        raise mysql.connector.errors.OperationalError("2013: Lost connection to MySQL server during query")
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+
+@pytest.fixture
+def store(db, tmp_path):
+    cursor, conn = db
+    cursor.execute("INSERT INTO tbl_students (srn, name, semester) VALUES ('PES2UG23CS002', 'Student Two', 5)")
+    cursor.executemany("INSERT INTO tbl_event_participants (event_id, user_id, registration_time) "
+                       "VALUES (1, %s, CURRENT_TIMESTAMP)", [(1,), (2,)])
+    conn.commit()
+    store = kiosk.KioskStore(str(tmp_path / "kiosk.sqlite3"))
+    assert store.snapshot(cursor, 1) == 2
+    yield store
+    store.close()
+
+
+def _central(cursor):
+    cursor.execute("SELECT user_id, attendance_status FROM tbl_event_participants WHERE event_id = 1 ORDER BY user_id")
+    attendance = cursor.fetchall()
+    cursor.execute("SELECT user_id, rating FROM tbl_event_feedback WHERE event_id = 1")
+    return attendance, cursor.fetchall()
+
+
+def test_offline_actions_sync_exactly_once_after_reconnect(db, connect, store):
+    cursor, conn = db
+    assert store.mark_attendance(1)
+    assert store.write_feedback(1, 4, "good talk")
+
+    assert kiosk.sync(store, _offline) is None
+    assert kiosk.sync(store, lambda: _CommitLost(connect())) is None
+    assert store.pending_counts() == (1, 1, 0)
+    assert _central(cursor) == ([(1, 0), (2, 0)], [])
+
+    assert kiosk.sync(store, connect) == {"attendance_synced": 1, "feedback_synced": 1, "conflicts": 0}
+    assert kiosk.sync(store, connect) == {"attendance_synced": 0, "feedback_synced": 0, "conflicts": 0}
+    assert store.pending_counts() == (0, 0, 0)
+    conn.rollback()
+    assert _central(cursor) == ([(1, 1), (2, 0)], [(1, 4)])
+
+
+def test_snapshot_refuses_another_event_while_actions_are_pending(db, connect, store):
+    cursor, conn = db
+    cursor.execute("""
+        INSERT INTO tbl_events (name, date, start_time, end_time, location_id, organizer_id)
+        VALUES ('Second Event', '2030-01-01', '10:00:00', '12:00:00', 1, 1)
+    """)
+    conn.commit()
+    store.mark_attendance(2)
+
+    with pytest.raises(ValueError):
+        store.snapshot(cursor, 2)
+    assert store.event_id == 1
+
+    kiosk.sync(store, connect)
+    assert store.snapshot(cursor, 2) == 0
+    assert store.event_id == 2
+    assert store.pending_counts() == (0, 0, 0)
@@ -0,0 +1,19 @@
+import migrations
+
+
+def test_concatenated_templates_are_collected():
+    templates = [sql for module, _, sql in migrations.collect_templates() if module == "student_registrations.py"]
+    assert any(sql.startswith("INSERT IGNORE") and sql.endswith("WHERE p.event_id = %s AND p.user_id = %s")
+               for sql in templates)
+    assert any(sql.startswith("INSERT IGNORE") and sql.endswith("WHERE p.event_id = %s") for sql in templates)
+
+
+
+def test_pending_migrations_is_read_only_and_empty_after_migrate(connect):
+    conn = connect()
+    cursor = conn.cursor()
+    assert [version for version, _ in migrations.pending_migrations(cursor)] == [v for v, _, _ in migrations.MIGRATIONS]
+    assert not conn.table_exists("tbl_schema_migrations")
+    migrations.migrate(cursor, conn)
+    assert migrations.pending_migrations(cursor) == []
+    conn.close()
@@ -0,0 +1,86 @@
+import datetime
+
+import pytest
+
+import outbox
+
+
+class _Sender:
+    """Records messages; fails the calls listed in `fail_on` (1-based) with an OSError."""
+
+    def __init__(self, fail_on=()):
+        self.calls, self.sent, self.fail_on = 0, [], set(fail_on)
+
+    def send(self, messages):
+        self.calls += 1
+        if self.calls in self.fail_on:
+            raise OSError("421 service not available")
+        self.sent.extend(message["user_id"] for message in messages)
+
+
+@pytest.fixture
+def row_id(db, monkeypatch):
+    cursor, conn = db
+    monkeypatch.setattr(outbox, "SEND_BATCH", 2)
+    cursor.executemany("INSERT INTO tbl_students (srn, name, semester) VALUES (%s, %s, 5)",
+                       [(f"PES2UG23CS{n:03d}", f"Student {n}") for n in range(2, 6)])
+    cursor.executemany("INSERT INTO tbl_event_participants (event_id, user_id, registration_time) "
+                       "VALUES (1, %s, CURRENT_TIMESTAMP)", [(n,) for n in range(1, 6)])
+    outbox_id = outbox.enqueue(cursor, "venue_closed", 1, {"event_name": "Test Event", "venue": "Hall A"})
+    conn.commit()
+    return outbox_id
+
+
+def _status(cursor, outbox_id):
+    cursor.execute("SELECT status, attempts, claimed_by FROM tbl_outbox WHERE id = %s", (outbox_id,))
+    return cursor.fetchone()
+
+
+def test_claimed_row_is_not_claimed_twice_until_its_lease_expires(db, row_id):
+    cursor, conn = db
+    assert [row[0] for row in outbox.claim(cursor, conn, "outbox-0")] == [row_id]
+    assert outbox.claim(cursor, conn, "outbox-1") == []
+
+    cursor.execute("UPDATE tbl_outbox SET claimed_until = %s WHERE id = %s",
+                   (datetime.datetime.now() - datetime.timedelta(seconds=1), row_id))
+    conn.commit()
+    assert [row[0] for row in outbox.claim(cursor, conn, "outbox-1")] == [row_id]
+    assert _status(cursor, row_id) == ("Sending", 0, "outbox-1")
+
+
+def test_worker_that_lost_its_lease_stops_sending(db, row_id):
+    cursor, conn = db
+    (row,) = outbox.claim(cursor, conn, "outbox-0")
+    cursor.execute("UPDATE tbl_outbox SET claimed_by = 'outbox-1' WHERE id = %s", (row_id,))
+    conn.commit()
+
+    sender = _Sender()
+    assert outbox.process_due(cursor, conn, sender, "outbox-0") == 0  # nothing left to claim
+    with pytest.raises(outbox.LeaseLost):
+        outbox.deliver(cursor, conn, sender, row, "outbox-0")
+    assert sender.sent == []
+    assert _status(cursor, row_id) == ("Sending", 0, "outbox-1")
+
+
+def test_retry_only_sends_to_recipients_not_yet_reached(db, row_id):
+    cursor, conn = db
+    first = _Sender(fail_on={2})
+    assert outbox.process_due(cursor, conn, first, "outbox-0") == 1
+    assert first.sent == [1, 2]
+    assert _status(cursor, row_id) == ("Pending", 1, "outbox-0")
+
+    cursor.execute("UPDATE tbl_outbox SET next_attempt_at = %s WHERE id = %s", (datetime.datetime.now(), row_id))
+    conn.commit()
+    second = _Sender()
+    assert outbox.process_due(cursor, conn, second, "outbox-1") == 1
+    assert second.sent == [3, 4, 5]
+    assert _status(cursor, row_id)[0] == "Sent"
+
+
+def test_bad_payload_fails_the_row_instead_of_the_worker(db, row_id):
+    cursor, conn = db
+    cursor.execute("UPDATE tbl_outbox SET kind = 'event_relocated' WHERE id = %s", (row_id,))  # no 'old_venue'
+    conn.commit()
+    assert outbox.process_due(cursor, conn, _Sender(), "outbox-0") == 1
+    cursor.execute("SELECT status, attempts, last_error FROM tbl_outbox WHERE id = %s", (row_id,))
+    assert cursor.fetchone() == ("Pending", 1, "'old_venue'")
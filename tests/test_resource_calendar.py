@@ -0,0 +1,55 @@
+import datetime
+
+import resource_calendar
+
+DAY = datetime.datetime(2030, 1, 7)
+
+
+def at(hour, day=0):
+    return DAY + datetime.timedelta(days=day, hours=hour)
+
+
+def test_touching_bookings_do_not_overlap():
+    steps = resource_calendar.sweep(5, [(at(9), at(12), 2), (at(12), at(14), 3)], at(0), at(24))
+    assert steps == [(at(0), 5), (at(9), 3), (at(12), 2), (at(14), 5)]
+
+    # equal quantities back to back leave no zero-length step at the seam
+    steps = resource_calendar.sweep(5, [(at(9), at(12), 2), (at(12), at(14), 2)], at(0), at(24))
+    assert steps == [(at(0), 5), (at(9), 3), (at(14), 5)]
+
+
+def test_maintenance_takes_the_resource_out_over_bookings():
+    intervals = [(at(8), at(16), 2), (at(10), at(12), None)]
+    steps = resource_calendar.sweep(5, intervals, at(0), at(24))
+    assert steps == [(at(0), 5), (at(8), 3), (at(10), 0), (at(12), 3), (at(16), 5)]
+    assert resource_calendar.min_free(steps, at(12), at(16)) == 3
+    assert resource_calendar.min_free(steps, at(11), at(13)) == 0
+
+
+def test_intervals_are_clipped_to_the_range():
+    steps = resource_calendar.sweep(4, [(at(-3), at(2), 1), (at(23), at(30), 4), (at(-5), at(0), 4)], at(0), at(24))
+    assert steps == [(at(0), 3), (at(2), 4), (at(23), 0)]
+
+
+def test_daily_minimum_over_single_and_multi_step_days():
+    boundaries = resource_calendar.day_starts(DAY.date(), 3)
+    assert resource_calendar.daily_minimum([(at(0), 5)], boundaries) == [5, 5, 5]
+
+    # day 0 dips to 3; day 1 is a single step carried over from day 0; day 2 starts at 0 exactly at midnight
+    steps = [(at(0), 5), (at(9), 3), (at(12), 4), (at(0, day=2), 0), (at(6, day=2), 5)]
+    assert resource_calendar.daily_minimum(steps, boundaries) == [3, 4, 0]
+
+
+def test_availability_reads_bookings_and_maintenance(db):
+    cursor, conn = db
+    cursor.execute("INSERT INTO tbl_resources (name, type, quantity) VALUES ('Projector', 'AV', 5)")
+    resource_id = cursor.lastrowid
+    cursor.execute("INSERT INTO tbl_event_resources (event_id, resource_id, quantity_booked, booking_start, booking_end) "
+                   "VALUES (1, %s, 2, %s, %s)", (resource_id, at(9), at(12)))
+    cursor.execute("INSERT INTO tbl_resource_maintenance (resource_id, maintenance_start, maintenance_end) "
+                   "VALUES (%s, %s, %s)", (resource_id, at(12), at(13)))
+    conn.commit()
+
+    calendar, resources = resource_calendar.availability(cursor, at(0), at(24), [resource_id])
+    assert resources == {resource_id: ("Projector", "AV", 5)}
+    assert calendar[resource_id] == [(at(0), 5), (at(9), 3), (at(12), 0), (at(13), 5)]
@@ -0,0 +1,44 @@
+import ticket_holds
+import ticket_inventory
+
+
+def _add_ticket(cursor, conn, quantity):
+    cursor.execute("INSERT INTO tbl_tickets (event_id, ticket_type, price, quantity) VALUES (1, 'General', 0, %s)",
+                   (quantity,))
+    ticket_id = cursor.lastrowid
+    ticket_inventory.init_slots(cursor, ticket_id, quantity)
+    conn.commit()
+    return ticket_id
+
+
+def _claim(cursor, conn, ticket_id, hold_id, how_many):
+    assert ticket_holds.claim_hold(cursor, hold_id)
+    for _ in range(how_many):
+        cursor.execute("""
+            INSERT INTO tbl_orders (ticket_id, user_id, order_time, payment_status)
+            VALUES (%s, 1, CURRENT_TIMESTAMP, 'Completed')
+        """, (ticket_id,))
+    conn.commit()
+
+
+def test_rebalance_keeps_held_units_out_of_stock(db):
+    cursor, conn = db
+    ticket_id = _add_ticket(cursor, conn, 20)
+    hold_id, _ = ticket_holds.place_hold(cursor, conn, ticket_id, 1, 1, 3)
+
+    assert ticket_inventory.rebalance(cursor, ticket_id, 10) == (0, 7)
+    conn.commit()
+    _claim(cursor, conn, ticket_id, hold_id, 3)
+
+    # issued = sold + remaining once the hold has been claimed
+    assert ticket_inventory.available(cursor, [ticket_id]) == {ticket_id: 7}
+
+
+def test_rebalance_refuses_to_issue_fewer_than_sold_plus_held(db):
+    cursor, conn = db
+    ticket_id = _add_ticket(cursor, conn, 20)
+    ticket_holds.place_hold(cursor, conn, ticket_id, 1, 1, 3)
+
+    assert ticket_inventory.rebalance(cursor, ticket_id, 2) is None
+    conn.rollback()
+    assert ticket_inventory.rebalance(cursor, ticket_id, 3) == (0, 0)
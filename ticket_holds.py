@@ -0,0 +1,151 @@
+"""
+Hold-then-confirm ticket reservations.
+
+place_hold() takes stock out of the ticket slots and records a hold with an
+expiry in one short transaction, so no row lock is held while the operator
+answers the payment prompt. claim_hold() turns the hold into orders inside the
+caller's booking transaction, release_hold() gives the stock back, and
+HoldSweeper returns expired holds to inventory in the background. Each of
+them announces the new stock to availability_feed once committed.
+"""
+import datetime
+import threading
+
+import mysql.connector
+
+import audit_log
+import availability_feed
+import ticket_inventory
+
+HOLD_TTL_SECONDS = 300
+SWEEP_INTERVAL = 30       # seconds between sweeper passes
+SWEEP_BATCH_SIZE = 500    # holds expired per transaction
+
+
+def place_hold(cursor, conn, ticket_id, event_id, user_id, how_many, ttl=HOLD_TTL_SECONDS):
+    """
+    Reserves `how_many` tickets and records a hold, committing immediately.
+    Returns (hold_id, expires_at), or None if the stock ran out.
+    """
+    try:
+        if ticket_inventory.reserve(cursor, ticket_id, how_many) is None:
+            conn.rollback()
+            return None
+        now = datetime.datetime.now()
+        expires_at = now + datetime.timedelta(seconds=ttl)
+        cursor.execute("""
+            INSERT INTO tbl_ticket_holds (ticket_id, event_id, user_id, quantity, created_at, expires_at, status)
+            VALUES (%s, %s, %s, %s, %s, %s, 'Held')
+        """, (ticket_id, event_id, user_id, how_many, now, expires_at))
+        hold_id = cursor.lastrowid
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    availability_feed.announce(cursor, conn, [ticket_id])
+    return hold_id, expires_at
+
+
+def claim_hold(cursor, hold_id):
+    """
+    Marks a live hold as confirmed inside the caller's transaction.
+    Returns True if the hold was still live; False if it expired or was
+    already released (its stock is back in inventory, so nothing may be booked).
+    """
+    cursor.execute(
+        "UPDATE tbl_ticket_holds SET status = 'Confirmed' WHERE id = %s AND status = 'Held' AND expires_at > %s",
+        (hold_id, datetime.datetime.now()),
+    )
+    return cursor.rowcount == 1
+
+
+def release_hold(cursor, conn, hold_id):
+    """Cancels a live hold and returns its tickets to inventory. Returns True if released."""
+    try:
+        cursor.execute("SELECT ticket_id, quantity FROM tbl_ticket_holds WHERE id = %s AND status = 'Held' FOR UPDATE", (hold_id,))
+        hold = cursor.fetchone()
+        if hold is None:
+            conn.rollback()
+            return False
+        cursor.execute("UPDATE tbl_ticket_holds SET status = 'Released' WHERE id = %s", (hold_id,))
+        ticket_inventory.release(cursor, hold[0], hold[1])
+        conn.commit()
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    availability_feed.announce(cursor, conn, [hold[0]])
+    return True
+
+
+def sweep_expired(cursor, conn, batch_size=SWEEP_BATCH_SIZE):
+    """
+    Expires holds past their TTL in batches, returning their stock to the
+    ticket slots. Each batch is its own short transaction; SKIP LOCKED lets
+    the sweeper pass over holds a buyer is confirming right now.
+    Returns the number of holds expired.
+    """
+    expired = 0
+    while True:
+        cursor.execute("""
+            SELECT id, ticket_id, quantity FROM tbl_ticket_holds
+            WHERE status = 'Held' AND expires_at <= %s
+            ORDER BY expires_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (datetime.datetime.now(), batch_size))
+        batch = cursor.fetchall()
+        if not batch:
+            conn.rollback()
+            break
+
+        placeholders = ", ".join(["%s"] * len(batch))
+        cursor.execute(f"UPDATE tbl_ticket_holds SET status = 'Expired' WHERE id IN ({placeholders})",
+                       tuple(row[0] for row in batch))
+        per_ticket = {}
+        for _, ticket_id, quantity in batch:
+            per_ticket[ticket_id] = per_ticket.get(ticket_id, 0) + quantity
+        for ticket_id, quantity in per_ticket.items():
+            ticket_inventory.release(cursor, ticket_id, quantity)
+        conn.commit()
+        availability_feed.announce(cursor, conn, per_ticket)
+
+        audit_log.record("expire_ticket_holds", {"hold_ids": [row[0] for row in batch]},
+                         after={"tickets_returned": per_ticket}, actor="system:hold-sweeper")
+        expired += len(batch)
+        if len(batch) < batch_size:
+            break
+    return expired
+
+
+class HoldSweeper(threading.Thread):
+    """Background thread that periodically expires stale holds on its own connection."""
+
+    def __init__(self, connect, interval=SWEEP_INTERVAL):
+        super().__init__(name="hold-sweeper", daemon=True)
+        self.connect = connect
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        conn = None
+        while not self._stop_event.is_set():
+            try:
+                if conn is None:
+                    conn = self.connect()
+                cursor = conn.cursor()
+                sweep_expired(cursor, conn)
+                cursor.close()
+            except Exception:
+                # Drop the connection and try again on the next pass; a bug in one pass must not stop the thread
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except mysql.connector.Error:
+                        pass
+                conn = None
+            self._stop_event.wait(self.interval)
+        if conn is not None:
+            conn.close()
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,134 @@
+"""
+Sharded ticket inventory.
+
+Remaining stock for each ticket type is split across N rows of
+tbl_ticket_slots so concurrent buyers lock different rows instead of all
+queueing on the single tbl_tickets row. tbl_tickets.quantity is the total
+number of tickets *issued*; remaining = SUM(slot quantities), and
+sold = number of tbl_orders rows for the ticket that still hold stock
+(Expired/Failed orders have had their ticket returned).
+"""
+import random
+
+DEFAULT_SLOTS = 8
+RELEASED_STATUSES = ('Expired', 'Failed')   # order statuses whose ticket went back to stock
+
+
+def split_quantity(total, slots):
+    """Splits `total` into `slots` near-equal parts (earlier slots get the remainder)."""
+    base, extra = divmod(max(total, 0), slots)
+    return [base + (1 if i < extra else 0) for i in range(slots)]
+
+
+def init_slots(cursor, ticket_id, remaining, slots=DEFAULT_SLOTS):
+    """(Re)creates the slot rows for a ticket holding `remaining` units in total."""
+    cursor.execute("DELETE FROM tbl_ticket_slots WHERE ticket_id = %s", (ticket_id,))
+    rows = [(ticket_id, i, q) for i, q in enumerate(split_quantity(remaining, slots))]
+    cursor.executemany("INSERT INTO tbl_ticket_slots (ticket_id, slot_no, quantity) VALUES (%s, %s, %s)", rows)
+
+
+def backfill_slots(cursor, conn, slots=DEFAULT_SLOTS):
+    """
+    Creates slots for tickets that predate sharding. Before sharding,
+    tbl_tickets.quantity held the *remaining* stock, so it is moved into the
+    slots and quantity is rewritten as remaining + sold (= issued).
+    Returns the number of tickets converted.
+    """
+    cursor.execute("""
+        SELECT t.id, t.quantity,
+               (SELECT COUNT(*) FROM tbl_orders o WHERE o.ticket_id = t.id AND o.payment_status NOT IN (%s, %s))
+        FROM tbl_tickets t
+        WHERE NOT EXISTS (SELECT 1 FROM tbl_ticket_slots s WHERE s.ticket_id = t.id)
+    """, RELEASED_STATUSES)
+    legacy = cursor.fetchall()
+    for ticket_id, remaining, sold in legacy:
+        init_slots(cursor, ticket_id, remaining, slots)
+        cursor.execute("UPDATE tbl_tickets SET quantity = %s WHERE id = %s", (remaining + sold, ticket_id))
+    if legacy:
+        conn.commit()
+    return len(legacy)
+
+
+def available(cursor, ticket_ids):
+    """Returns {ticket_id: remaining units} summed over all slots."""
+    if not ticket_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(ticket_ids))
+    cursor.execute(
+        f"SELECT ticket_id, SUM(quantity) FROM tbl_ticket_slots WHERE ticket_id IN ({placeholders}) GROUP BY ticket_id",
+        tuple(ticket_ids),
+    )
+    totals = {ticket_id: 0 for ticket_id in ticket_ids}
+    for ticket_id, remaining in cursor.fetchall():
+        totals[ticket_id] = int(remaining or 0)
+    return totals
+
+
+def reserve(cursor, ticket_id, how_many, max_passes=3):
+    """
+    Takes `how_many` units from randomly chosen slots that have stock, inside
+    the caller's transaction. Each decrement is conditional (quantity >= n), so
+    a slot emptied by a concurrent buyer is simply skipped.
+    Returns a list of (slot_no, units_taken), or None if there was not enough
+    stock; the caller must roll back in that case.
+    """
+    needed = how_many
+    taken = []
+    for _ in range(max_passes):
+        cursor.execute("SELECT slot_no, quantity FROM tbl_ticket_slots WHERE ticket_id = %s AND quantity > 0", (ticket_id,))
+        slots = cursor.fetchall()
+        if not slots:
+            break
+        random.shuffle(slots)
+        for slot_no, quantity in slots:
+            take = min(needed, quantity)
+            cursor.execute(
+                "UPDATE tbl_ticket_slots SET quantity = quantity - %s WHERE ticket_id = %s AND slot_no = %s AND quantity >= %s",
+                (take, ticket_id, slot_no, take),
+            )
+            if cursor.rowcount == 1:
+                taken.append((slot_no, take))
+                needed -= take
+                if needed == 0:
+                    return taken
+    return None
+
+
+def release(cursor, ticket_id, how_many):
+    """Returns `how_many` units to a random slot of the ticket (caller commits)."""
+    if how_many <= 0:
+        return
+    cursor.execute("SELECT slot_no FROM tbl_ticket_slots WHERE ticket_id = %s", (ticket_id,))
+    slot_nos = [row[0] for row in cursor.fetchall()]
+    if not slot_nos:
+        init_slots(cursor, ticket_id, how_many, 1)
+        return
+    cursor.execute(
+        "UPDATE tbl_ticket_slots SET quantity = quantity + %s WHERE ticket_id = %s AND slot_no = %s",
+        (how_many, ticket_id, random.choice(slot_nos)),
+    )
+
+
+def rebalance(cursor, ticket_id, new_issued, slots=DEFAULT_SLOTS):
+    """
+    Sets the ticket's issued total and spreads the resulting remaining stock
+    (issued - sold - held) evenly across the slots. Locks the slot rows and
+    the ticket's live holds for the duration of the caller's transaction, so
+    no hold can be placed, claimed or expired while the stock is rewritten.
+    Returns (sold, remaining), or None if new_issued is below what is already
+    sold or held.
+    """
+    cursor.execute("SELECT slot_no FROM tbl_ticket_slots WHERE ticket_id = %s FOR UPDATE", (ticket_id,))
+    cursor.fetchall()
+    cursor.execute("SELECT quantity FROM tbl_ticket_holds WHERE ticket_id = %s AND status = 'Held' FOR UPDATE",
+                   (ticket_id,))
+    held = sum(row[0] for row in cursor.fetchall())
+    cursor.execute("SELECT COUNT(*) FROM tbl_orders WHERE ticket_id = %s AND payment_status NOT IN (%s, %s)",
+                   (ticket_id,) + RELEASED_STATUSES)
+    sold = cursor.fetchone()[0]
+    if new_issued < sold + held:
+        return None
+    remaining = new_issued - sold - held
+    init_slots(cursor, ticket_id, remaining, slots)
+    cursor.execute("UPDATE tbl_tickets SET quantity = %s WHERE id = %s", (new_issued, ticket_id))
+    return sold, remaining